@@ -32,5 +32,15 @@ def get_db():
     finally:
         db.close()
 
+def dialect_insert(bind):
+    """INSERT construct supporting ON CONFLICT upserts (PostgreSQL or SQLite)"""
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Bring the schema up to date (see app/migrations.py)"""
+    from app.migrations import run_migrations
+    return run_migrations()
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+In-process pub/sub for per-user server-sent events
+
+Each open `/user/events` stream is a coroutine waiting on its own bounded
+asyncio queue (no thread per connection), so thousands of idle streams cost
+little more than their sockets. Publishing is thread-safe: code running in
+the threadpool hands messages to the event loop with call_soon_threadsafe.
+
+Events only reach streams served by the same worker process.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+import itertools
+import os
+import orjson
+
+# Messages buffered per stream; a stream that falls behind drops its oldest messages
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+
+# Idle streams get a comment line this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Concurrent streams allowed per user (e.g. browser tabs)
+SSE_MAX_STREAMS_PER_USER = int(os.getenv("SSE_MAX_STREAMS_PER_USER", "5"))
+
+Message = Tuple[int, str, Any]
+
+
+class TooManyStreamsError(Exception):
+    """Raised when a user already has SSE_MAX_STREAMS_PER_USER open streams"""
+
+
+class EventBroker:
+    """Fan out per-user messages to that user's open streams"""
+    
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+    
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """Open a stream for a user (call from the event loop)"""
+        if len(self._subscribers.get(user_id, ())) >= SSE_MAX_STREAMS_PER_USER:
+            raise TooManyStreamsError(f"At most {SSE_MAX_STREAMS_PER_USER} event streams per user")
+        
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+    
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+    
+    def has_subscribers(self, user_id: int) -> bool:
+        """Cheap check to skip building messages nobody will receive"""
+        return user_id in self._subscribers
+    
+    def publish(self, user_id: int, event: str, data: Any):
+        """Send a message to every stream of a user (safe to call from any thread)"""
+        loop = self._loop
+        if loop is None or not self.has_subscribers(user_id):
+            return
+        
+        message = (next(self._ids), event, data)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        
+        if running is loop:
+            self._deliver(user_id, message)
+        else:
+            loop.call_soon_threadsafe(self._deliver, user_id, message)
+    
+    def _deliver(self, user_id: int, message: Message):
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+    
+    def stream_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+def format_sse(message: Message) -> bytes:
+    """Encode a message in the text/event-stream format"""
+    event_id, event, data = message
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), orjson.dumps(data))
+
+
+event_broker = EventBroker()
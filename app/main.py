@@ -1,7 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import init_db
-from app.routes import auth_router, quests_router, user_router, leaderboard_router
+from app.database import engine
+from app.migrations import check_schema_version
+from app.monitoring import (
+    TracingMiddleware,
+    QueryStatsMiddleware,
+    instrument_engine,
+    instrument_query_stats,
+)
+from app.routes import auth_router, quests_router, user_router, leaderboard_router, admin_router
 
 # Create FastAPI app
 app = FastAPI(
@@ -17,8 +24,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Queue-Wait-Ms", "Idempotent-Replayed"],
 )
 
+# Request tracing (no-op unless TRACING_ENABLED is set)
+app.add_middleware(TracingMiddleware)
+instrument_engine(engine)
+
+# Per-request SQL statistics (no-op unless QUERY_STATS_MODE is set)
+app.add_middleware(QueryStatsMiddleware)
+instrument_query_stats(engine)
+
 from fastapi.staticfiles import StaticFiles
 import os
 
@@ -33,13 +49,14 @@ app.include_router(auth_router)
 app.include_router(quests_router)
 app.include_router(user_router)
 app.include_router(leaderboard_router)
+app.include_router(admin_router)
 
 
 @app.on_event("startup")
 def startup_event():
-    """Initialize database on startup"""
-    init_db()
-    print("✅ Database initialized")
+    """Verify the database schema is current (migrations run separately via init_db.py)"""
+    version = check_schema_version()
+    print(f"✅ Database schema at version {version}")
 
 
 @app.get("/")
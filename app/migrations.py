@@ -0,0 +1,221 @@
+"""
+Ordered, idempotent schema migrations
+
+Migrations run once, as an explicit step (`python init_db.py`), and each
+applied version is recorded in the schema_version table. At startup the API
+only compares the recorded version with SCHEMA_VERSION instead of running
+create_all.
+
+To change the schema, append a function decorated with @migration using the
+next version number. Migrations must be safe to re-run against a database
+created from the current models (create tables with checkfirst, add columns
+only if missing).
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, select, func
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+from app.database import engine
+from app.models import (
+    User, Level, Quest, Submission, Badge, UserBadge, SchemaVersion, CatalogueVersion,
+    XPEvent, PeriodXP, PeriodLeaderboardSnapshot, BestSubmission,
+    UserProgress, IdempotencyKey, SubmissionArchive
+)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+
+
+def migration(version: int, description: str):
+    """Register a migration function"""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return decorator
+
+
+def _create_tables(connection: Connection, *models):
+    for model in models:
+        model.__table__.create(bind=connection, checkfirst=True)
+
+
+def _add_column_if_missing(connection: Connection, model, column_name: str):
+    table = model.__table__
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    if column_name in existing:
+        return
+    
+    column = table.columns[column_name]
+    column_type = column.type.compile(dialect=connection.dialect)
+    default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_name} {column_type}{default}")
+
+
+def _create_indexes(connection: Connection, model, *index_names):
+    for index in model.__table__.indexes:
+        if index.name in index_names:
+            index.create(bind=connection, checkfirst=True)
+
+
+def _submissions_before_evaluation_ms() -> Select:
+    """
+    The submissions columns that exist from the baseline on
+    
+    For migrations that aggregate submissions before migration 7 added
+    evaluation_ms (and 10 submission_archive): the current models and
+    submission_history select columns these databases do not have yet.
+    """
+    return select(
+        Submission.id, Submission.user_id, Submission.quest_id, Submission.submission_date,
+        Submission.score, Submission.passed, Submission.xp_awarded,
+    )
+
+
+# ===== Migrations =====
+@migration(1, "Baseline schema")
+def _baseline(connection: Connection):
+    _create_tables(connection, User, Level, Quest, Submission, Badge, UserBadge)
+
+
+@migration(2, "Quest catalogue version")
+def _catalogue_version(connection: Connection):
+    _create_tables(connection, CatalogueVersion)
+    if connection.execute(select(CatalogueVersion.id)).first() is None:
+        connection.execute(CatalogueVersion.__table__.insert().values(id=1, version=1))
+
+
+@migration(3, "Leaderboard and submission history indexes")
+def _pagination_indexes(connection: Connection):
+    _create_indexes(connection, User, "ix_users_xp_id")
+    _create_indexes(
+        connection, Submission, "ix_submissions_user_quest_date", "ix_submissions_user_passed_quest"
+    )
+
+
+@migration(4, "XP event log and period leaderboards")
+def _xp_events(connection: Connection):
+    from app.services.xp_service import rebuild_period_xp
+    
+    _create_tables(connection, XPEvent, PeriodXP, PeriodLeaderboardSnapshot)
+    
+    # Backfill the log from first-pass submissions, then the period totals
+    if connection.execute(select(XPEvent.id)).first() is None:
+        connection.execute(
+            XPEvent.__table__.insert().from_select(
+                ["user_id", "quest_id", "submission_id", "amount", "created_at"],
+                select(
+                    Submission.user_id, Submission.quest_id, Submission.id,
+                    Submission.xp_awarded, func.coalesce(Submission.submission_date, func.current_timestamp())
+                ).where(Submission.xp_awarded > 0).order_by(Submission.id)
+            )
+        )
+    rebuild_period_xp(connection)
+
+
+@migration(5, "Best submission per user and quest")
+def _best_submission(connection: Connection):
+    from app.services.quest_service import rebuild_best_submissions
+    
+    _create_tables(connection, BestSubmission)
+    rebuild_best_submissions(connection, _submissions_before_evaluation_ms())
+
+
+@migration(6, "Per-user progress counters")
+def _user_progress(connection: Connection):
+    from app.services.progress_service import rebuild_user_progress
+    
+    _create_tables(connection, UserProgress)
+    rebuild_user_progress(connection, _submissions_before_evaluation_ms())
+
+
+@migration(7, "Submission evaluation time and per-quest index")
+def _evaluation_ms(connection: Connection):
+    _add_column_if_missing(connection, Submission, "evaluation_ms")
+    _create_indexes(connection, Submission, "ix_submissions_quest_id")
+
+
+@migration(8, "Idempotency keys for submissions")
+def _idempotency_keys(connection: Connection):
+    _create_tables(connection, IdempotencyKey)
+
+
+@migration(9, "Structured evaluation metrics and stage timings")
+def _submission_metrics(connection: Connection):
+    from app.services.quest_service import backfill_submission_metrics
+    
+    _add_column_if_missing(connection, Submission, "metrics")
+    _add_column_if_missing(connection, Submission, "stage_timings")
+    backfill_submission_metrics(connection)
+
+
+@migration(10, "Submission archive")
+def _submission_archive(connection: Connection):
+    _create_tables(connection, SubmissionArchive)
+
+
+@migration(11, "Leaderboard tie-break column and index on users")
+def _user_completed_quests(connection: Connection):
+    from app.services.progress_service import sync_user_completed_quests
+    
+    _add_column_if_missing(connection, User, "completed_quests")
+    sync_user_completed_quests(connection)
+    _create_indexes(connection, User, "ix_users_leaderboard")
+
+
+SCHEMA_VERSION = max(version for version, _, _ in MIGRATIONS)
+
+
+# ===== Runner =====
+def get_schema_version(connection: Connection) -> int:
+    """Highest applied migration, or 0 for a database that was never migrated"""
+    if not inspect(connection).has_table(SchemaVersion.__tablename__):
+        return 0
+    return connection.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def run_migrations() -> int:
+    """
+    Apply all pending migrations, each in its own transaction
+    
+    Returns:
+        The schema version after migrating
+    """
+    with engine.begin() as connection:
+        _create_tables(connection, SchemaVersion)
+        current = get_schema_version(connection)
+    
+    for version, description, apply in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        
+        with engine.begin() as connection:
+            apply(connection)
+            connection.execute(
+                SchemaVersion.__table__.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                )
+            )
+        print(f"   - Applied migration {version}: {description}")
+        current = version
+    
+    return current
+
+
+def check_schema_version() -> int:
+    """
+    Verify the database schema matches the code (one cheap query at startup)
+    
+    Raises:
+        RuntimeError: if migrations are pending
+    """
+    with engine.connect() as connection:
+        current = get_schema_version(connection)
+    
+    if current < SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {current}, code expects {SCHEMA_VERSION}. "
+            f"Run `python init_db.py` to apply migrations."
+        )
+    
+    return current
+
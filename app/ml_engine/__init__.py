@@ -1,3 +1,20 @@
-from .evaluator import MLEvaluator
+"""
+ML evaluation engine
 
-__all__ = ["MLEvaluator"]
\ No newline at end of file
+MLEvaluator is imported lazily: pulling in pandas, numpy and scikit-learn is
+deferred until the first evaluation, so API workers that never evaluate a
+model don't pay for it at startup or in memory. SandboxedEvaluator runs the
+same evaluation in a resource-limited child process (see sandbox.py).
+"""
+
+__all__ = ["MLEvaluator", "SandboxedEvaluator"]
+
+
+def __getattr__(name):
+    if name == "MLEvaluator":
+        from .evaluator import MLEvaluator
+        return MLEvaluator
+    if name == "SandboxedEvaluator":
+        from .sandbox import SandboxedEvaluator
+        return SandboxedEvaluator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
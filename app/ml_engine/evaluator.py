@@ -11,8 +11,28 @@ from sklearn.metrics import (
     recall_score
 )
 from sklearn.model_selection import train_test_split
-from typing import Dict, Any, Tuple
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+import math
 import os
+import time
+from app.monitoring import start_span
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], stage: str):
+    """Record the wall-clock milliseconds of a stage in `timings`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def _finite(value) -> Optional[float]:
+    """Metric value as a JSON-safe float (None for nan/inf)"""
+    value = float(value)
+    return value if math.isfinite(value) else None
 
 
 class MLEvaluator:
@@ -20,7 +40,7 @@ class MLEvaluator:
     
     def __init__(self, datasets_path: str = "./datasets"):
         self.datasets_path = datasets_path
-        
+    
     def load_dataset(self, dataset_name: str, config: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]:
         """
         Load and split dataset into train/test sets
@@ -28,17 +48,11 @@ class MLEvaluator:
         Args:
             dataset_name: Name of the dataset file
             config: Configuration dict with target_column, test_size, etc.
-            
+        
         Returns:
             X_train, X_test, y_train, y_test
         """
-        dataset_path = os.path.join(self.datasets_path, dataset_name)
-        
-        if not os.path.exists(dataset_path):
-            raise FileNotFoundError(f"Dataset {dataset_name} not found at {dataset_path}")
-        
-        # Load dataset
-        df = pd.read_csv(dataset_path)
+        df = self.read_dataset(dataset_name)
         
         # Extract target column
         target_column = config.get("target_column", df.columns[-1])
@@ -56,6 +70,17 @@ class MLEvaluator:
         
         return X_train, X_test, y_train, y_test
     
+    def read_dataset(self, dataset_name: str) -> pd.DataFrame:
+        """Read a dataset file (CSV or Parquet) from the datasets directory"""
+        dataset_path = os.path.join(self.datasets_path, dataset_name)
+        
+        if not os.path.exists(dataset_path):
+            raise FileNotFoundError(f"Dataset {dataset_name} not found at {dataset_path}")
+        
+        if dataset_name.endswith(".parquet"):
+            return pd.read_parquet(dataset_path)
+        return pd.read_csv(dataset_path)
+    
     def load_model(self, model_path: str):
         """
         Load a trained ML model from file
@@ -90,40 +115,61 @@ class MLEvaluator:
             dataset_name: Name of the dataset
             metric_name: Metric to evaluate ("accuracy", "r2_score", "f1_score")
             config: Dataset configuration
-            
+        
         Returns:
-            Dict with score, passed status, and logs
+            Dict with score, success, metrics ({name: value}, including the
+            primary metric), stage_timings ({stage: milliseconds}, also for
+            the stages reached before a failure) and logs (the failure
+            message, None on success)
         """
+        timings: Dict[str, float] = {}
         try:
             # Load model
-            model = self.load_model(model_path)
+            with start_span("evaluator.load_model", model_path=model_path), _timed(timings, "load_model"):
+                model = self.load_model(model_path)
             
             # Load dataset
-            X_train, X_test, y_train, y_test = self.load_dataset(dataset_name, config)
+            with start_span("evaluator.load_dataset", dataset=dataset_name) as span, _timed(timings, "load_dataset"):
+                X_train, X_test, y_train, y_test = self.load_dataset(dataset_name, config)
+                span.set_attribute("dataset.test_rows", len(X_test))
             
             # Make predictions
-            y_pred = model.predict(X_test)
+            with start_span("evaluator.predict"), _timed(timings, "predict"):
+                y_pred = model.predict(X_test)
             
             # Calculate metric
-            score = self._calculate_metric(y_test, y_pred, metric_name)
-            
-            # Additional metrics for logging
-            additional_metrics = self._calculate_additional_metrics(y_test, y_pred, metric_name)
+            with start_span("evaluator.metrics", metric=metric_name), _timed(timings, "metrics"):
+                score = self._calculate_metric(y_test, y_pred, metric_name)
+                
+                # Additional metrics
+                additional_metrics = self._calculate_additional_metrics(y_test, y_pred, metric_name)
             
-            logs = f"Metric: {metric_name}\nScore: {score:.4f}\n"
-            logs += f"Additional metrics: {additional_metrics}"
+            metrics = {name: _finite(value) for name, value in additional_metrics.items()}
+            metrics[metric_name] = _finite(score)
             
             return {
                 "score": float(score),
-                "logs": logs,
-                "success": True
+                "logs": None,
+                "success": True,
+                "metrics": metrics,
+                "stage_timings": timings
+            }
+        
+        except MemoryError:
+            return {
+                "score": 0.0,
+                "logs": "Evaluation failed: out of memory",
+                "success": False,
+                "metrics": None,
+                "stage_timings": timings
             }
-            
         except Exception as e:
             return {
                 "score": 0.0,
                 "logs": f"Evaluation failed: {str(e)}",
-                "success": False
+                "success": False,
+                "metrics": None,
+                "stage_timings": timings
             }
     
     def _calculate_metric(self, y_true, y_pred, metric_name: str) -> float:
@@ -151,7 +197,7 @@ class MLEvaluator:
             if primary_metric in ["accuracy", "f1_score", "precision", "recall"]:
                 metrics["accuracy"] = accuracy_score(y_true, y_pred)
                 metrics["f1_score"] = f1_score(y_true, y_pred, average='weighted')
-                
+            
             # For regression tasks
             elif primary_metric in ["r2_score", "mse"]:
                 metrics["r2_score"] = r2_score(y_true, y_pred)
@@ -0,0 +1,430 @@
+"""
+Run model evaluations in a resource-limited child process
+
+Submitted models are arbitrary pickles: loading one runs its code, and its
+`predict` may allocate without bound or never return. SandboxedEvaluator
+keeps all of that out of the API process. Each evaluation runs in a fresh
+`python -m app.ml_engine.sandbox` child that
+
+- caps its address space (RLIMIT_AS), CPU time (RLIMIT_CPU) and file writes
+  (RLIMIT_FSIZE) before any user code is loaded,
+- is killed with its whole process group after a wall-clock timeout,
+- runs in its own, empty network namespace, which also covers any process
+  the model spawns. The child creates it through an unprivileged user
+  namespace, so the API needs no extra capabilities. If the kernel refuses
+  (e.g. Docker's default seccomp profile), the evaluation fails instead of
+  running with network access, unless EVALUATION_NETWORK_ISOLATION is
+  `external` because the deployment already blocks egress. An audit hook
+  additionally turns socket connects, binds and DNS lookups into a clear
+  error,
+- runs in an empty temporary working directory with a minimal environment
+  (no SECRET_KEY or DATABASE_URL), and receives the model and dataset as
+  file descriptors opened by the parent,
+- switches to EVALUATION_SANDBOX_USER (default `nobody`) before loading the
+  model when the API runs as root, so the model cannot read `.env`, the
+  SQLite database or other files of the app. The app tree must not be
+  world-readable for this to hold (the Dockerfile removes those bits). When
+  the API does not run as root, the model can read whatever its user can.
+
+Protocol: one JSON request line on stdin, one JSON result line
+(`{"score", "logs", "success", "metrics", "stage_timings"}`) on stdout. Anything the model prints goes
+to stderr, of which only the tail is kept. While the API worker is being
+profiled, the request carries the sampling interval and the result adds the
+child's collapsed stacks (`"profile": {stack: count}`).
+
+The ML stack is only imported in the child.
+"""
+from typing import Any, Dict, Optional, Tuple
+from app.monitoring import start_span
+from app.monitoring.profiler import StackSampler, active_sampler
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+
+# Evaluations run in a sandboxed child process unless set to 0
+EVALUATION_SANDBOX = os.getenv("EVALUATION_SANDBOX", "1") != "0"
+
+# Address space limit for the child, including the ML libraries (~500 MB)
+EVALUATION_MEMORY_MB = int(os.getenv("EVALUATION_MEMORY_MB", "2048"))
+
+# CPU time limit for the child
+EVALUATION_CPU_SECONDS = int(os.getenv("EVALUATION_CPU_SECONDS", "60"))
+
+# Wall-clock limit, also covering time spent blocked (sleeping, waiting on locks)
+EVALUATION_TIMEOUT_SECONDS = float(os.getenv("EVALUATION_TIMEOUT_SECONDS", "120"))
+
+# Largest result line read back, and largest file the child may write
+MAX_RESULT_BYTES = 1024 * 1024
+MAX_FILE_BYTES = 64 * 1024 * 1024
+
+# Evaluation logs are truncated to this many characters
+MAX_LOG_CHARS = 16 * 1024
+
+# Entries kept from the child's metrics and stage timings
+MAX_RESULT_ENTRIES = 32
+
+# Bytes of collapsed stacks a profiled child returns (within MAX_RESULT_BYTES)
+MAX_PROFILE_BYTES = 512 * 1024
+
+# Unprivileged user evaluations run as when the API runs as root
+EVALUATION_SANDBOX_USER = os.getenv("EVALUATION_SANDBOX_USER", "nobody")
+
+# "namespace": evaluations fail unless the child gets an empty network namespace.
+# "external": the deployment itself blocks egress (e.g. a firewall or
+# NetworkPolicy), so evaluations also run where namespaces are refused
+EVALUATION_NETWORK_ISOLATION = os.getenv("EVALUATION_NETWORK_ISOLATION", "namespace")
+
+# Environment variables passed through to the child
+CHILD_ENV_KEYS = ("PATH", "LANG", "LC_ALL", "TZ")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CLONE_NEWNET = 0x40000000
+CLONE_NEWUSER = 0x10000000
+
+BLOCKED_AUDIT_EVENTS = frozenset({
+    "socket.bind",
+    "socket.connect",
+    "socket.getaddrinfo",
+    "socket.gethostbyname",
+    "socket.sendmsg",
+    "socket.sendto",
+})
+
+
+def _failure(reason: str) -> Dict[str, Any]:
+    return {
+        "score": 0.0,
+        "logs": f"Evaluation failed: {reason}",
+        "success": False,
+        "metrics": None,
+        "stage_timings": None,
+    }
+
+
+class SandboxedEvaluator:
+    """Drop-in replacement for MLEvaluator.evaluate_model that evaluates in a limited child process"""
+    
+    def __init__(
+        self,
+        datasets_path: str = "./datasets",
+        memory_mb: int = EVALUATION_MEMORY_MB,
+        cpu_seconds: int = EVALUATION_CPU_SECONDS,
+        timeout_seconds: float = EVALUATION_TIMEOUT_SECONDS
+    ):
+        self.datasets_path = os.path.abspath(datasets_path)
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.timeout_seconds = timeout_seconds
+    
+    def _child_env(self, workdir: str) -> Dict[str, str]:
+        env = {key: os.environ[key] for key in CHILD_ENV_KEYS if key in os.environ}
+        # The working directory is not the project root, so the app package is found through PYTHONPATH
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, (PROJECT_ROOT, os.environ.get("PYTHONPATH"))))
+        # One BLAS/OpenMP thread: scheduler workers already run evaluations in parallel
+        env.update(OMP_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1", MKL_NUM_THREADS="1")
+        env.update(PYTHONDONTWRITEBYTECODE="1", HOME=workdir, TMPDIR=workdir)
+        return env
+    
+    def _open_inputs(self, model_path: str, dataset_name: str) -> Tuple[int, int]:
+        """Descriptors of the model and dataset files, for the child to read without access to their paths"""
+        dataset_path = os.path.join(self.datasets_path, dataset_name)
+        try:
+            model_fd = os.open(model_path, os.O_RDONLY)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Model not found at {model_path}")
+        try:
+            return model_fd, os.open(dataset_path, os.O_RDONLY)
+        except FileNotFoundError:
+            os.close(model_fd)
+            raise FileNotFoundError(f"Dataset {dataset_name} not found at {dataset_path}")
+    
+    def evaluate_model(
+        self,
+        model_path: str,
+        dataset_name: str,
+        metric_name: str,
+        config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a trained model on a dataset in a sandboxed child process
+        
+        Returns:
+            Dict shaped like MLEvaluator.evaluate_model's; limit violations
+            and crashes are reported in the logs
+        """
+        try:
+            model_fd, dataset_fd = self._open_inputs(model_path, dataset_name)
+        except OSError as e:
+            return _failure(str(e))
+        
+        sampler = active_sampler()
+        request = json.dumps({
+            "model_fd": model_fd,
+            "dataset_fd": dataset_fd,
+            "model_name": os.path.basename(model_path),
+            "dataset_name": dataset_name,
+            "metric_name": metric_name,
+            "config": config,
+            "memory_mb": self.memory_mb,
+            "cpu_seconds": self.cpu_seconds,
+            "user": EVALUATION_SANDBOX_USER,
+            "network_isolation": EVALUATION_NETWORK_ISOLATION,
+            "profile_interval": sampler.interval if sampler is not None else None,
+        }).encode() + b"\n"
+        
+        with start_span("evaluator.sandbox", metric=metric_name) as span, \
+                tempfile.TemporaryDirectory(prefix="evaluation-") as workdir, \
+                tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            try:
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "app.ml_engine.sandbox"],
+                    stdin=subprocess.PIPE,
+                    stdout=stdout,
+                    stderr=stderr,
+                    cwd=workdir,
+                    env=self._child_env(workdir),
+                    pass_fds=(model_fd, dataset_fd),
+                    start_new_session=True  # own process group, so the kill reaches anything it spawned
+                )
+            finally:
+                os.close(model_fd)
+                os.close(dataset_fd)
+            
+            timed_out = False
+            try:
+                process.communicate(request, timeout=self.timeout_seconds)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+            finally:
+                _kill_group(process)
+                process.wait()
+            
+            span.set_attribute("sandbox.exit_code", process.returncode)
+            
+            if timed_out:
+                return _failure(f"exceeded the time limit of {self.timeout_seconds:g} s")
+            
+            stdout.seek(0)
+            result = _parse_result(stdout.read(MAX_RESULT_BYTES))
+            if process.returncode == 0 and result is not None:
+                profile = result.pop("profile")
+                if sampler is not None and profile:
+                    sampler.merge(profile, f"{threading.current_thread().name};sandbox child")
+                return result
+            
+            stderr.seek(0, os.SEEK_END)
+            stderr.seek(max(0, stderr.tell() - 4096))
+            return _failure(self._describe_exit(process.returncode, stderr.read()))
+    
+    def _describe_exit(self, returncode: int, stderr_tail: bytes) -> str:
+        """Explain why the child produced no result"""
+        if returncode == -signal.SIGXCPU:
+            return f"exceeded the CPU time limit of {self.cpu_seconds} s"
+        if returncode == -signal.SIGKILL:
+            return f"process was killed (CPU limit of {self.cpu_seconds} s or memory limit of {self.memory_mb} MB exceeded)"
+        if returncode < 0:
+            return f"process crashed ({signal.Signals(-returncode).name})"
+        if returncode == 0:
+            return "process returned no result"
+        
+        lines = stderr_tail.decode(errors="replace").strip().splitlines()
+        detail = f": {lines[-1][:500]}" if lines else ""
+        return f"process exited with code {returncode}{detail}"
+
+
+def _kill_group(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _parse_result(raw: bytes) -> Optional[Dict[str, Any]]:
+    """Validate the child's result line; anything malformed counts as no result"""
+    try:
+        result = json.loads(raw.split(b"\n", 1)[0])
+        logs = result["logs"]
+        return {
+            "score": float(result["score"]),
+            "logs": None if logs is None else str(logs)[:MAX_LOG_CHARS],
+            "success": result["success"] is True,
+            "metrics": _parse_numbers(result.get("metrics")),
+            "stage_timings": _parse_numbers(result.get("stage_timings")),
+            "profile": _parse_profile(result.get("profile")),
+        }
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def _parse_numbers(value) -> Optional[Dict[str, Optional[float]]]:
+    """{name: number} map from the child, with finite floats (or None) only"""
+    if value is None:
+        return None
+    numbers = {}
+    for name, number in list(value.items())[:MAX_RESULT_ENTRIES]:
+        number = None if number is None else float(number)
+        numbers[str(name)[:64]] = number if number is None or math.isfinite(number) else None
+    return numbers
+
+
+def _parse_profile(value) -> Dict[str, int]:
+    """{collapsed stack: sample count} from a profiled child, positive integer counts only"""
+    if not isinstance(value, dict):
+        return {}
+    return {
+        str(stack): count
+        for stack, count in value.items()
+        if isinstance(count, int) and not isinstance(count, bool) and count > 0
+    }
+
+
+# Child process
+
+
+def _apply_limits(memory_mb: int, cpu_seconds: int):
+    import resource
+    
+    memory = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    # SIGXCPU at the soft limit, SIGKILL one second later
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_FILE_BYTES, MAX_FILE_BYTES))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _unshare(flags: int) -> bool:
+    import ctypes
+    
+    unshare = getattr(os, "unshare", None)  # Python 3.12+
+    if unshare is None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        
+        def unshare(flags):
+            if libc.unshare(flags) != 0:
+                raise OSError(ctypes.get_errno(), "unshare failed")
+    
+    try:
+        unshare(flags)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+def _drop_privileges(user: str):
+    """Switch to an unprivileged user if running as root (also drops all capabilities)"""
+    import pwd
+    
+    if os.geteuid() != 0:
+        return
+    
+    account = pwd.getpwnam(user)
+    os.chown(".", account.pw_uid, account.pw_gid)  # the working directory stays writable
+    os.setgroups([])
+    os.setgid(account.pw_gid)
+    os.setuid(account.pw_uid)
+
+
+def _descriptor_evaluator(model_fd: int, dataset_fd: int):
+    """MLEvaluator reading the model and dataset from descriptors opened by the parent"""
+    from app.ml_engine.evaluator import MLEvaluator
+    import joblib
+    import pandas as pd
+    import pickle
+    
+    class DescriptorEvaluator(MLEvaluator):
+        def read_dataset(self, dataset_name: str) -> pd.DataFrame:
+            with os.fdopen(dataset_fd, "rb") as file:
+                if dataset_name.endswith(".parquet"):
+                    return pd.read_parquet(file)
+                return pd.read_csv(file)
+        
+        def load_model(self, model_path: str):
+            with os.fdopen(model_fd, "rb") as file:
+                try:
+                    return joblib.load(file)
+                except Exception:
+                    file.seek(0)
+                    return pickle.load(file)
+    
+    return DescriptorEvaluator()
+
+
+def _start_sampler(interval: Optional[float]) -> Optional[Tuple[StackSampler, threading.Thread]]:
+    """Sample this process while the parent worker is being profiled"""
+    if not interval:
+        return None
+    sampler = StackSampler(EVALUATION_TIMEOUT_SECONDS, interval)
+    thread = threading.Thread(target=sampler.run, name="profiler", daemon=True)
+    thread.start()
+    return sampler, thread
+
+
+def _stop_sampler(sampling: Tuple[StackSampler, threading.Thread]) -> Dict[str, int]:
+    """The sampled stacks, most frequent first, within MAX_PROFILE_BYTES"""
+    sampler, thread = sampling
+    sampler.stop()
+    thread.join()
+    
+    stacks, size = {}, 0
+    for stack, count in sampler.stacks.most_common():
+        size += len(stack) + 16
+        if size > MAX_PROFILE_BYTES:
+            break
+        stacks[stack] = count
+    return stacks
+
+
+def _block_network_calls(event: str, args):
+    if event in BLOCKED_AUDIT_EVENTS:
+        raise PermissionError("Network access is disabled during evaluation")
+
+
+def main():
+    request = json.loads(sys.stdin.buffer.readline())
+    
+    # Keep the protocol stream for ourselves; model output goes to stderr
+    protocol = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    
+    _apply_limits(request["memory_mb"], request["cpu_seconds"])
+    # Everything from the app tree is imported before the user switch
+    evaluator = _descriptor_evaluator(request["model_fd"], request["dataset_fd"])
+    
+    # The network namespace is created inside an unprivileged user namespace,
+    # after the switch to the sandbox user (no capabilities needed or kept)
+    _drop_privileges(request["user"])
+    isolated = _unshare(CLONE_NEWUSER | CLONE_NEWNET)
+    if not isolated and request["network_isolation"] != "external":
+        _respond(protocol, _failure("network isolation is unavailable (creating a network namespace was refused)"))
+    sys.addaudithook(_block_network_calls)
+    
+    # Started only now: creating a user namespace requires a single-threaded process
+    sampling = _start_sampler(request["profile_interval"])
+    result = evaluator.evaluate_model(
+        model_path=request["model_name"],
+        dataset_name=request["dataset_name"],
+        metric_name=request["metric_name"],
+        config=request["config"]
+    )
+    if result["logs"] is not None:
+        result["logs"] = result["logs"][:MAX_LOG_CHARS]
+    if sampling is not None:
+        result["profile"] = _stop_sampler(sampling)
+    _respond(protocol, result)
+
+
+def _respond(protocol, result: Dict[str, Any]):
+    protocol.write(json.dumps(result) + "\n")
+    protocol.flush()
+    # Skip interpreter teardown: finalizers in the model's objects never run
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
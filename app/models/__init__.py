@@ -4,5 +4,29 @@ from .quest import Quest
 from .submission import Submission
 from .badge import Badge
 from .user_badge import UserBadge
+from .schema_version import SchemaVersion
+from .catalogue_version import CatalogueVersion
+from .xp_event import XPEvent
+from .period_xp import PeriodXP, PeriodLeaderboardSnapshot
+from .best_submission import BestSubmission
+from .user_progress import UserProgress
+from .idempotency_key import IdempotencyKey
+from .submission_archive import SubmissionArchive
 
-__all__ = ["User", "Level", "Quest", "Submission", "Badge", "UserBadge"]
\ No newline at end of file
+__all__ = [
+    "User",
+    "Level",
+    "Quest",
+    "Submission",
+    "Badge",
+    "UserBadge",
+    "SchemaVersion",
+    "CatalogueVersion",
+    "XPEvent",
+    "PeriodXP",
+    "PeriodLeaderboardSnapshot",
+    "BestSubmission",
+    "UserProgress",
+    "IdempotencyKey",
+    "SubmissionArchive",
+]
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, Float, Boolean, DateTime, Index
+from app.database import Base
+
+
+class BestSubmission(Base):
+    __tablename__ = "best_submission"
+    __table_args__ = (
+        # Per-quest top-K and rank lookups
+        Index("ix_best_submission_ranking", "quest_id", "score", "submitted_at", "user_id"),
+    )
+    
+    # Each user's best attempt per quest, upserted with every submission
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    quest_id = Column(Integer, ForeignKey("quests.id"), primary_key=True)
+    score = Column(Float, nullable=True)
+    submission_id = Column(Integer, ForeignKey("submissions.id"), nullable=True)
+    submitted_at = Column(DateTime, nullable=True)
+    passed = Column(Boolean, nullable=False, default=False)  # passed in any attempt
+    attempts = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class CatalogueVersion(Base):
+    __tablename__ = "catalogue_version"
+    
+    # Single row (id=1); version bumps on every quest or level write
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
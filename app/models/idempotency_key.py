@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Index
+from datetime import datetime
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Purging expired keys
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+    
+    # Client-supplied Idempotency-Key of a submit request and its stored result
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # hash of the quest and the uploaded file
+    submission_id = Column(Integer, nullable=True)  # no foreign key: submissions may be archived
+    response = Column(JSON, nullable=True)  # null while the request is in flight
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Index
+from app.database import Base
+
+
+class PeriodXP(Base):
+    __tablename__ = "period_xp"
+    __table_args__ = (
+        # Top-K and rank lookups within one period
+        Index("ix_period_xp_ranking", "period", "period_start", "xp", "user_id"),
+    )
+    
+    # XP earned per user in each daily, weekly and monthly period (UTC)
+    period = Column(String, primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    xp = Column(Integer, nullable=False, default=0)
+
+
+class PeriodLeaderboardSnapshot(Base):
+    __tablename__ = "period_leaderboard_snapshots"
+    
+    # Top of a period's leaderboard, frozen once the period has ended
+    period = Column(String, primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    xp = Column(Integer, nullable=False)
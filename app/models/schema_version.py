@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    
+    # One row per applied migration; the highest version is the current schema
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Boolean, DateTime, Text, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -6,7 +7,15 @@ from app.database import Base
 
 class Submission(Base):
     __tablename__ = "submissions"
-
+    __table_args__ = (
+        # Keyset pagination of a user's history (newest first)
+        Index("ix_submissions_user_quest_date", "user_id", "quest_id", "submission_date", "id"),
+        # Completed quest counts per user
+        Index("ix_submissions_user_passed_quest", "user_id", "passed", "quest_id"),
+        # Incremental per-quest analytics (new rows since a submission id)
+        Index("ix_submissions_quest_id", "quest_id", "id"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     quest_id = Column(Integer, ForeignKey("quests.id"), nullable=False)
@@ -18,7 +27,10 @@ class Submission(Base):
     # Evaluation results
     score = Column(Float, nullable=True)
     passed = Column(Boolean, default=False)
-    evaluation_logs = Column(Text, nullable=True)
+    evaluation_logs = Column(Text, nullable=True)  # failure message; None on success
+    evaluation_ms = Column(Integer, nullable=True)  # wall-clock evaluation time
+    metrics = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # {"accuracy": 0.93, "f1_score": 0.92}
+    stage_timings = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # {"predict": 12.5, ...} in ms
     
     # Rewards given
     xp_awarded = Column(Integer, default=0)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Float, Boolean, DateTime, LargeBinary, Index
+from datetime import datetime
+from app.database import Base
+
+
+class SubmissionArchive(Base):
+    __tablename__ = "submission_archive"
+    __table_args__ = (
+        Index("ix_submission_archive_user_quest", "user_id", "quest_id"),
+        # Per-quest analytics read archived rows by id too
+        Index("ix_submission_archive_quest_id", "quest_id", "id"),
+    )
+    
+    # Submissions moved out of `submissions` by the retention job (same ids).
+    # Columns aggregates are computed from stay plain; the rest is compressed.
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    quest_id = Column(Integer, nullable=False)
+    submission_date = Column(DateTime, nullable=True)
+    score = Column(Float, nullable=True)
+    passed = Column(Boolean, nullable=False, default=False)
+    xp_awarded = Column(Integer, nullable=False, default=0)
+    evaluation_ms = Column(Integer, nullable=True)
+    payload = Column(LargeBinary, nullable=False)  # zlib-compressed JSON: model_path, logs, metrics, timings
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -6,7 +6,11 @@ from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
-
+    __table_args__ = (
+        # Leaderboard ordering and keyset pagination
+        Index("ix_users_xp_id", "xp", "id"),
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -15,6 +19,8 @@ class User(Base):
     # Game stats
     xp = Column(Integer, default=0)
     level = Column(Integer, default=1)
+    # Copy of user_progress.completed_quests, so the leaderboard tie-break is indexed
+    completed_quests = Column(Integer, default=0, server_default="0")
     current_streak = Column(Integer, default=0)
     last_activity_date = Column(DateTime, nullable=True)
     
@@ -38,7 +44,7 @@ class User(Base):
         """Add XP and recalculate level"""
         self.xp += amount
         self.calculate_level()
-        
+    
     def update_streak(self):
         """Update daily streak"""
         today = datetime.utcnow().date()
@@ -56,5 +62,9 @@ class User(Base):
         else:
             # First activity
             self.current_streak = 1
-            
-        self.last_activity_date = datetime.utcnow()
\ No newline at end of file
+        
+        self.last_activity_date = datetime.utcnow()
+
+
+# Leaderboard order (xp, completed quests, id); keyset pages seek straight into it
+Index("ix_users_leaderboard", User.xp.desc(), User.completed_quests.desc(), User.id)
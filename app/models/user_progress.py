@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class UserProgress(Base):
+    __tablename__ = "user_progress"
+    
+    # Counters maintained with every submission (rebuild with check_consistency.py)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    completed_quests = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    perfect_scores = Column(Integer, nullable=False, default=0)
+    last_passed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class XPEvent(Base):
+    __tablename__ = "xp_events"
+    __table_args__ = (
+        Index("ix_xp_events_user_created", "user_id", "created_at"),
+    )
+    
+    # Append-only log of every XP award
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    quest_id = Column(Integer, ForeignKey("quests.id"), nullable=True)
+    submission_id = Column(Integer, ForeignKey("submissions.id"), nullable=True)
+    amount = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,20 @@
+from .tracing import (
+    start_span,
+    current_span,
+    traced,
+    trace_methods,
+    instrument_engine,
+    TracingMiddleware,
+)
+from .query_stats import QueryStatsMiddleware, instrument_query_stats
+
+__all__ = [
+    "start_span",
+    "current_span",
+    "traced",
+    "trace_methods",
+    "instrument_engine",
+    "TracingMiddleware",
+    "QueryStatsMiddleware",
+    "instrument_query_stats",
+]
@@ -0,0 +1,125 @@
+"""
+On-demand statistical stack sampler
+
+Periodically snapshots the stacks of every thread in the current process
+(request threads, the event loop, scheduler workers) and aggregates them
+into collapsed stacks that flamegraph.pl / speedscope can render.
+
+Model evaluations run in sandbox child processes by default. While a
+profile is running, each child started meanwhile samples itself at the same
+interval and returns its stacks with the result; they are merged under the
+worker thread that waited for it (`evaluation-0;sandbox child;...`).
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Bounds keeping sampling overhead predictable
+MIN_INTERVAL_SECONDS = 0.005
+MAX_DURATION_SECONDS = 60.0
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is already running in this worker"""
+
+
+class StackSampler:
+    """Sample all thread stacks at a fixed interval for a fixed duration (or until stopped)"""
+    
+    _lock = threading.Lock()
+    _active: Optional["StackSampler"] = None
+    
+    def __init__(self, duration: float, interval: float = 0.01):
+        self.duration = min(max(duration, 0.1), MAX_DURATION_SECONDS)
+        self.interval = max(interval, MIN_INTERVAL_SECONDS)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self._stacks_lock = threading.Lock()
+        self._stopped = threading.Event()
+    
+    def run(self) -> "StackSampler":
+        """
+        Sample the process, blocking the calling thread for the duration
+        
+        Raises:
+            ProfilerBusyError: if another profile is in progress
+        """
+        if not StackSampler._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running on this worker")
+        
+        StackSampler._active = self
+        try:
+            own_thread = threading.get_ident()
+            deadline = time.monotonic() + self.duration
+            next_sample = time.monotonic()
+            
+            while next_sample < deadline and not self._stopped.is_set():
+                started = time.perf_counter()
+                self._sample(own_thread)
+                self.sampling_seconds += time.perf_counter() - started
+                
+                next_sample += self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    self._stopped.wait(delay)
+                else:
+                    # Sampling fell behind; skip missed ticks instead of bursting
+                    next_sample = time.monotonic()
+        finally:
+            StackSampler._active = None
+            StackSampler._lock.release()
+        
+        return self
+    
+    def stop(self):
+        """End a running profile before its duration is up"""
+        self._stopped.set()
+    
+    def merge(self, stacks: Dict[str, int], root: str):
+        """Add stacks sampled elsewhere (a sandbox child) under the `root` frames"""
+        with self._stacks_lock:
+            for stack, count in stacks.items():
+                self.stacks[f"{root};{stack}"] += count
+    
+    def _sample(self, own_thread: int):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            
+            frames = []
+            while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            
+            frames.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            with self._stacks_lock:
+                self.stacks[";".join(reversed(frames))] += 1
+        
+        self.samples += 1
+    
+    def collapsed(self) -> str:
+        """Render samples in Brendan Gregg's collapsed stack format"""
+        with self._stacks_lock:
+            stacks = self.stacks.most_common()
+        return "\n".join(f"{stack} {count}" for stack, count in stacks) + "\n"
+    
+    def summary(self) -> Dict[str, float]:
+        """Sampling statistics, including the overhead spent in the sampler"""
+        return {
+            "samples": self.samples,
+            "duration_seconds": self.duration,
+            "interval_seconds": self.interval,
+            "sampling_overhead_seconds": round(self.sampling_seconds, 4),
+        }
+
+
+def active_sampler() -> Optional[StackSampler]:
+    """The profile running in this process, if any"""
+    return StackSampler._active
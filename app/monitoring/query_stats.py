@@ -0,0 +1,140 @@
+"""
+Per-request SQL statistics: statement count, DB time, slow-query log and
+repeated-statement (N+1) detection
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import List, Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# "off", "log" (production: slow-query and N+1 warnings only) or
+# "debug" (development: also report stats in a response header)
+QUERY_STATS_MODE = os.getenv("QUERY_STATS_MODE", "off").lower()
+QUERY_STATS_ENABLED = QUERY_STATS_MODE in ("log", "debug")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+QUERY_STATS_HEADER = "X-DB-Stats"
+
+_whitespace = re.compile(r"\s+")
+_in_list = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_literal = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_current_stats: contextvars.ContextVar[Optional["QueryStats"]] = contextvars.ContextVar(
+    "query_stats", default=None
+)
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeated queries with different values compare equal"""
+    shape = _whitespace.sub(" ", statement).strip()
+    shape = _literal.sub("?", shape)
+    return _in_list.sub("(?)", shape)
+
+
+class QueryStats:
+    """Statements executed while handling one request"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slow = 0
+        self.shapes: Counter = Counter()
+    
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+    
+    @property
+    def repeated(self) -> List[tuple]:
+        """Statement shapes executed more than N_PLUS_ONE_THRESHOLD times"""
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count > N_PLUS_ONE_THRESHOLD
+        ]
+    
+    def header_value(self) -> str:
+        repeated = self.repeated
+        value = f"count={self.count}; time_ms={self.total_seconds * 1000:.1f}; slow={self.slow}"
+        if repeated:
+            value += f"; n_plus_one={len(repeated)}; max_repeat={repeated[0][1]}"
+        return value
+
+
+def _redact(parameters) -> str:
+    """Describe parameters without leaking their values"""
+    if parameters is None:
+        return "none"
+    if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        return f"<{len(parameters)} parameter sets redacted>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: ?" for key in parameters) + "}"
+    return f"<{len(parameters)} parameters redacted>"
+
+
+def instrument_query_stats(engine):
+    """Time every statement and attribute it to the active request"""
+    if not QUERY_STATS_ENABLED:
+        return
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_start
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            if stats is not None:
+                stats.slow += 1
+            logger.warning(
+                "Slow query (%.1f ms): %s -- params: %s",
+                elapsed * 1000,
+                _whitespace.sub(" ", statement).strip(),
+                _redact(parameters),
+            )
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware collecting QueryStats per request and reporting them in a header"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                if QUERY_STATS_MODE == "debug":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (QUERY_STATS_HEADER.lower().encode(), stats.header_value().encode())
+                    ]
+                repeated = stats.repeated
+                if repeated:
+                    shape, count = repeated[0]
+                    logger.warning(
+                        "Possible N+1 on %s %s: %d statements, %d shapes repeated; top (%dx): %s",
+                        scope["method"], scope["path"], stats.count, len(repeated), count, shape,
+                    )
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
@@ -0,0 +1,372 @@
+"""
+Lightweight request tracing
+
+Spans are collected in memory per trace and handed to a background exporter
+as OTLP-style JSON once the root span (normally the HTTP request) finishes.
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "file")  # "file" or "otlp"
+TRACING_FILE = os.getenv("TRACING_FILE", "./traces/spans.jsonl")
+TRACING_ENDPOINT = os.getenv("TRACING_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "ml-game-platform")
+MAX_SPANS_PER_TRACE = 1000
+MAX_STATEMENT_LENGTH = 1000
+
+# OTLP enum values
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+class _Trace:
+    """Spans belonging to one trace"""
+    
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List["Span"] = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+    
+    def add(self, span: "Span"):
+        with self.lock:
+            if len(self.spans) < MAX_SPANS_PER_TRACE:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+class Span:
+    """A single timed operation within a trace"""
+    
+    def __init__(
+        self,
+        name: str,
+        trace: _Trace,
+        parent: Optional["Span"] = None,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+    
+    @property
+    def is_root(self) -> bool:
+        return self.parent_id is None
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    def record_error(self, exc: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+    
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        self.trace.add(self)
+        if self.is_root:
+            _exporter.submit(self.trace)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled so callers never need to check"""
+    
+    def set_attribute(self, key: str, value: Any):
+        pass
+    
+    def record_error(self, exc: BaseException):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+def to_otlp_payload(trace: _Trace) -> Dict[str, Any]:
+    """Build an OTLP/JSON ExportTraceServiceRequest for one trace"""
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [_otlp_attribute("service.name", TRACING_SERVICE_NAME)],
+            },
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [span.to_otlp() for span in trace.spans],
+            }],
+        }]
+    }
+
+
+# ===== Exporters =====
+class FileSpanExporter:
+    """Append one OTLP/JSON payload per line to a local file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def export(self, payload: Dict[str, Any]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """POST OTLP/JSON payloads to a collector (or any stand-in accepting JSON)"""
+    
+    def __init__(self, endpoint: str, timeout: float = 2.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+    
+    def export(self, payload: Dict[str, Any]):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload, separators=(",", ":")).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class _BackgroundExporter:
+    """Hands finished traces to the exporter off the request path"""
+    
+    def __init__(self, max_queue: int = 1000):
+        self._queue: "queue.Queue[_Trace]" = queue.Queue(maxsize=max_queue)
+        self._exporter = None
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if TRACING_EXPORTER == "otlp":
+                self._exporter = OTLPHttpSpanExporter(TRACING_ENDPOINT)
+            else:
+                self._exporter = FileSpanExporter(TRACING_FILE)
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+    
+    def submit(self, trace: _Trace):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            logger.warning("Span export queue full, dropping trace %s", trace.trace_id)
+    
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                self._exporter.export(to_otlp_payload(trace))
+            except Exception as e:
+                logger.warning("Span export failed: %s", e)
+
+
+_exporter = _BackgroundExporter()
+
+
+# ===== Public API =====
+def current_span() -> Optional[Span]:
+    """Get the active span, if any"""
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, kind: str = "internal", **attributes):
+    """
+    Open a span as a child of the active span (or as a new trace root)
+    
+    Usage:
+        with start_span("evaluator.load_model", path=model_path) as span:
+            ...
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+    
+    parent = _current_span.get()
+    trace = parent.trace if parent else _Trace()
+    span = Span(name, trace, parent=parent, kind=kind, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.record_error(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping a function (sync or async) in a span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    
+    return decorator
+
+
+def trace_methods(cls):
+    """Class decorator tracing every method defined on the class"""
+    if not TRACING_ENABLED:
+        return cls
+    
+    for attr_name, attr in list(vars(cls).items()):
+        if attr_name.startswith("__"):
+            continue
+        span_name = f"{cls.__name__}.{attr_name}"
+        if isinstance(attr, staticmethod):
+            setattr(cls, attr_name, staticmethod(traced(span_name)(attr.__func__)))
+        elif isinstance(attr, classmethod):
+            setattr(cls, attr_name, classmethod(traced(span_name)(attr.__func__)))
+        elif inspect.isfunction(attr):
+            setattr(cls, attr_name, traced(span_name)(attr))
+    return cls
+
+
+def instrument_engine(engine):
+    """Record a client span for every statement executed on the engine"""
+    if not TRACING_ENABLED:
+        return
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = Span(
+            "db.query",
+            parent.trace,
+            parent=parent,
+            kind="client",
+            attributes={
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+                "db.executemany": executemany,
+            },
+        )
+        context._trace_span = span
+    
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+    
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        span = getattr(exception_context.execution_context, "_trace_span", None)
+        if span is not None:
+            span.record_error(exception_context.original_exception)
+            span.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root server span for each HTTP request"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        with start_span(
+            f"{method} {scope['path']}",
+            kind="server",
+            **{"http.method": method, "http.target": scope["path"]}
+        ) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = STATUS_ERROR
+                await send(message)
+            
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None and hasattr(route, "path"):
+                    span.name = f"{method} {route.path}"
+                    span.set_attribute("http.route", route.path)
@@ -0,0 +1,33 @@
+"""
+Opaque cursors for keyset pagination
+
+A cursor encodes the sort key of the last row of a page. The next page seeks
+past that key with an index range scan, so deep pages cost the same as the
+first one (unlike OFFSET, which reads and discards every skipped row).
+"""
+from typing import Any, List
+import base64
+import orjson
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page"""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Raises:
+        ValueError: if the cursor is malformed or has the wrong number of values
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, orjson.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    
+    return values
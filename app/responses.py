@@ -0,0 +1,54 @@
+"""
+Fast JSON responses
+
+List endpoints build plain dicts straight from query rows and return them
+through ORJSONResponse, skipping FastAPI's response_model validation and
+jsonable_encoder pass. Routes keep `response_model` so the OpenAPI docs are
+unchanged.
+"""
+from typing import Any, Optional
+import hashlib
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (handles datetimes natively)"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag derived from a hash of JSON-serializable parts"""
+    payload = orjson.dumps(parts, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return f'W/"{hashlib.blake2b(payload, digest_size=12).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def conditional_response(request: Request, content: Any, etag: str, cache_control: str) -> Response:
+    """
+    Return 304 Not Modified if the client already has this ETag, else the JSON body
+    
+    Args:
+        request: Incoming request (for If-None-Match)
+        content: JSON-serializable body, only rendered on a miss
+        etag: Entity tag identifying `content`
+        cache_control: Cache-Control header value
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    return ORJSONResponse(content, headers=headers)
@@ -2,5 +2,6 @@ from .auth import router as auth_router
 from .quests import router as quests_router
 from .user import router as user_router
 from .leaderboard import router as leaderboard_router
+from .admin import router as admin_router
 
-__all__ = ["auth_router", "quests_router", "user_router", "leaderboard_router"]
\ No newline at end of file
+__all__ = ["auth_router", "quests_router", "user_router", "leaderboard_router", "admin_router"]
\ No newline at end of file
@@ -0,0 +1,176 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Literal, Optional
+from datetime import datetime
+from app.database import get_db
+from app.models import User
+from app.monitoring.profiler import StackSampler, ProfilerBusyError
+from app.responses import ORJSONResponse
+from app.routes.dependencies import get_current_admin
+from app.services import AnalyticsService, quest_catalogue
+from app.services.evaluation_scheduler import evaluation_scheduler
+from app.services.export_service import (
+    SUBMISSION_EXPORT_COLUMNS,
+    LEADERBOARD_EXPORT_COLUMNS,
+    iter_submissions,
+    iter_leaderboard,
+    encode_ndjson,
+    encode_csv,
+    gzip_chunks,
+)
+import os
+import time
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+def profile_worker(
+    seconds: float = Query(10, gt=0, le=60, description="Sampling duration in seconds"),
+    interval_ms: float = Query(10, ge=5, le=1000, description="Sampling interval in milliseconds"),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Sample stack traces of every thread in the worker serving this request
+    
+    Returns collapsed stacks (one `frame;frame;frame count` line per unique
+    stack), ready for `flamegraph.pl` or speedscope. Only one profile can run
+    per worker at a time. Sandboxed evaluations started meanwhile are
+    sampled in their child process and merged under the worker thread that
+    waits for them.
+    """
+    # Don't hold a pooled connection while sampling
+    db.close()
+    
+    try:
+        sampler = StackSampler(seconds, interval_ms / 1000).run()
+    except ProfilerBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    summary = sampler.summary()
+    filename = f"profile-{os.getpid()}-{int(time.time())}.collapsed"
+    
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(summary["samples"]),
+            "X-Profile-Overhead-Seconds": str(summary["sampling_overhead_seconds"]),
+        }
+    )
+
+
+@router.get("/analytics/quests")
+def get_quests_analytics(
+    refresh: bool = Query(False, description="Read new submissions even if the cache is fresh"),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Submission analytics for every quest
+    
+    See `GET /admin/analytics/quests/{quest_id}`.
+    """
+    _, quests = quest_catalogue.get_quests(db)
+    analytics = AnalyticsService(db).get_all_quest_analytics([quest["id"] for quest in quests], refresh=refresh)
+    
+    return ORJSONResponse(analytics)
+
+
+@router.get("/analytics/quests/{quest_id}")
+def get_quest_analytics(
+    quest_id: int,
+    refresh: bool = Query(False, description="Read new submissions even if the cache is fresh"),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Pass rates, score histogram, attempts-to-pass distribution and
+    median/p95 evaluation time for a quest
+    
+    Aggregates are cached per worker and advanced with only the submissions
+    added since the previous refresh (at most every ANALYTICS_REFRESH_SECONDS).
+    """
+    _, quest = quest_catalogue.get_quest(db, quest_id)
+    if not quest:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quest not found"
+        )
+    
+    return ORJSONResponse(AnalyticsService(db).get_quest_analytics(quest_id, refresh=refresh))
+
+
+@router.get("/evaluations/queue")
+def get_evaluation_queue(
+    top_users: int = Query(50, ge=1, le=1000, description="Maximum number of users listed"),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    Evaluation scheduler state for the worker serving this request
+    
+    Queue depth by priority, running evaluations and, per user, how many
+    submissions were queued or rejected and their mean/max queue wait.
+    Users with evaluations in flight are listed first.
+    """
+    return ORJSONResponse(evaluation_scheduler.stats(top_users=top_users))
+
+
+def _export_response(name: str, rows: Iterable[dict], columns: List[str], fmt: str, compress: bool) -> StreamingResponse:
+    """Stream rows as an NDJSON or CSV download, optionally gzipped"""
+    chunks = encode_ndjson(rows) if fmt == "ndjson" else encode_csv(rows, columns)
+    filename = f"{name}-{datetime.utcnow():%Y%m%dT%H%M%S}.{fmt}"
+    media_type = EXPORT_MEDIA_TYPES[fmt]
+    
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/export/submissions")
+def export_submissions(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Output format"),
+    gzip: bool = Query(False, description="Gzip the output"),
+    quest_id: Optional[int] = Query(None, description="Only this quest"),
+    since: Optional[datetime] = Query(None, description="Submitted at or after (UTC)"),
+    until: Optional[datetime] = Query(None, description="Submitted before (UTC)"),
+    passed: Optional[bool] = Query(None, description="Only passed (true) or failed (false) submissions"),
+    include_archived: bool = Query(True, description="Include submissions moved to the archive by retention"),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    Stream submissions (without logs or model paths) in id order, archived ones included
+    
+    Rows are read through a server-side cursor and written as they arrive,
+    so memory stays flat regardless of the export size.
+    """
+    rows = iter_submissions(
+        quest_id=quest_id, since=since, until=until, passed=passed, include_archived=include_archived
+    )
+    return _export_response("submissions", rows, SUBMISSION_EXPORT_COLUMNS, fmt, gzip)
+
+
+@router.get("/export/leaderboard")
+def export_leaderboard(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Output format"),
+    gzip: bool = Query(False, description="Gzip the output"),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    Stream every user in leaderboard order (XP, completed quests, user ID)
+    """
+    return _export_response("leaderboard", iter_leaderboard(), LEADERBOARD_EXPORT_COLUMNS, fmt, gzip)
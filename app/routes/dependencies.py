@@ -1,10 +1,19 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.database import get_db
+from typing import Optional
+from app.database import get_db, SessionLocal
 from app.services import AuthService
+from app.models import User
+import os
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Comma-separated usernames allowed to use /admin endpoints
+ADMIN_USERNAMES = {
+    name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
 
 
 def get_current_user(
@@ -24,4 +33,43 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
\ No newline at end of file
+    return user
+
+
+def get_current_admin(current_user: User = Depends(get_current_user)):
+    """
+    Dependency restricting an endpoint to users listed in ADMIN_USERNAMES
+    """
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    
+    return current_user
+
+
+def get_stream_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    token: Optional[str] = Query(None, description="JWT, for clients that cannot set headers (EventSource)")
+) -> int:
+    """
+    Dependency authenticating a long-lived stream
+    
+    Uses a short-lived session instead of get_db so the stream does not hold
+    a pooled connection while it stays open.
+    """
+    token = credentials.credentials if credentials else token
+    user = None
+    if token:
+        with SessionLocal() as db:
+            user = AuthService.get_current_user(db, token)
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return user.id
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional, Literal
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.schemas import LeaderboardResponse
-from app.services import LeaderboardService
+from app.schemas import LeaderboardResponse, PeriodLeaderboardResponse
+from app.responses import ORJSONResponse
+from app.pagination import encode_cursor, decode_cursor
+from app.services import LeaderboardService, XPService, leaderboard_cache
+from app.services.xp_service import period_start, shift_period
 from app.models import User
 from app.routes.dependencies import get_current_user
 
@@ -12,6 +17,7 @@ router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
 @router.get("/", response_model=LeaderboardResponse)
 def get_leaderboard(
     limit: int = Query(100, ge=1, le=500, description="Maximum number of entries"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -25,14 +31,64 @@ def get_leaderboard(
     - Level
     - Completed quests
     
-    Also includes current user's rank
+    Also includes current user's rank. The first page comes from a shared
+    snapshot refreshed every few seconds or after XP awards; pass
+    `next_cursor` back as `cursor` to fetch the following page.
     """
     leaderboard_service = LeaderboardService(db)
     
-    leaderboard = leaderboard_service.get_leaderboard(limit=limit)
+    if cursor is None:
+        leaderboard = leaderboard_cache.get_leaderboard(db, limit=limit)
+    else:
+        try:
+            after = decode_cursor(cursor, 4)
+            if not all(isinstance(value, int) for value in after):
+                raise ValueError("Invalid cursor")
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        leaderboard = leaderboard_service.get_leaderboard(limit=limit, after=after)
+    
     user_rank = leaderboard_service.get_user_rank(current_user.id)
     
-    return LeaderboardResponse(
-        leaderboard=leaderboard,
-        user_rank=user_rank
-    )
\ No newline at end of file
+    next_cursor = None
+    if len(leaderboard) == limit:
+        last = leaderboard[-1]
+        next_cursor = encode_cursor(last["xp"], last["completed_quests"], last["user_id"], last["rank"])
+    
+    return ORJSONResponse({
+        "leaderboard": leaderboard,
+        "user_rank": user_rank,
+        "next_cursor": next_cursor
+    })
+
+
+@router.get("/{period}", response_model=PeriodLeaderboardResponse)
+def get_period_leaderboard(
+    period: Literal["daily", "weekly", "monthly"],
+    ago: int = Query(0, ge=0, le=366, description="Periods before the current one (0 = current)"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of entries"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the leaderboard of XP earned in a day, week (Monday to Sunday) or month (UTC)
+    
+    The current period is ranked from running per-period totals; ended
+    periods are served from a snapshot frozen after they end.
+    """
+    xp_service = XPService(db)
+    start = shift_period(period, period_start(period, datetime.utcnow()), -ago)
+    
+    if ago == 0:
+        leaderboard = leaderboard_cache.get_leaderboard(db, limit=limit, period=period)
+    else:
+        leaderboard = xp_service.get_frozen_leaderboard(period, start, limit=limit)
+    
+    return ORJSONResponse({
+        "period": period,
+        "period_start": start,
+        "period_end": shift_period(period, start, 1) - timedelta(days=1),
+        "frozen": ago > 0,
+        "leaderboard": leaderboard,
+        **xp_service.get_user_standing(current_user.id, period, start)
+    })
@@ -1,60 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status, UploadFile, File
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional, Tuple, Union
+from datetime import datetime
+import asyncio
 from app.database import get_db
-from app.schemas import QuestResponse, QuestDetailResponse, SubmissionResponse
-from app.services import QuestService, BadgeService
+from app.schemas import (
+    QuestResponse, QuestDetailResponse, SubmissionResponse, SubmissionSummary, QuestLeaderboardResponse
+)
+from app.responses import ORJSONResponse, conditional_response, make_etag
+from app.pagination import encode_cursor, decode_cursor
+from app.services import QuestService, BadgeService, LeaderboardService, quest_catalogue
+from app.services.evaluation_scheduler import (
+    evaluation_scheduler,
+    QueueFullError,
+    PRIORITY_FIRST_ATTEMPT,
+    PRIORITY_RESUBMISSION,
+)
+from app.services.idempotency_service import (
+    IdempotencyService,
+    IdempotencyConflictError,
+    IdempotencyMismatchError,
+    MAX_KEY_LENGTH,
+    fingerprint_upload,
+    in_flight_requests,
+)
+from app.events import event_broker
 from app.models import User
 from app.routes.dependencies import get_current_user
 
 router = APIRouter(prefix="/quests", tags=["Quests"])
 
+# Responses include the per-user overlay, so only the client may cache them,
+# and it must revalidate (cheap 304s via ETag) on every use
+CATALOGUE_CACHE_CONTROL = "private, no-cache"
+
+
+def _with_overlay(quest: dict, status_info: dict) -> dict:
+    """Copy a shared catalogue entry and add the user's completion status"""
+    return {
+        **quest,
+        "user_completed": status_info["completed"] if status_info else False,
+        "best_score": status_info["best_score"] if status_info else None,
+    }
+
 
 @router.get("/", response_model=List[QuestDetailResponse])
 def get_quests(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get all available quests with user completion status
+    
+    Supports conditional requests: send the previous `ETag` in
+    `If-None-Match` to get `304 Not Modified` when nothing changed.
     """
-    quest_service = QuestService(db)
-    quests = quest_service.get_all_quests()
+    version, quests = quest_catalogue.get_quests(db)
+    overlay = QuestService(db).get_user_quest_overlay(current_user.id)
     
-    result = []
-    for quest in quests:
-        status = quest_service.get_user_quest_status(current_user.id, quest.id)
-        
-        quest_detail = QuestDetailResponse(
-            id=quest.id,
-            title=quest.title,
-            description=quest.description,
-            task_type=quest.task_type,
-            xp_reward=quest.xp_reward,
-            metric_name=quest.metric_name,
-            threshold=quest.threshold,
-            level_id=quest.level_id,
-            order=quest.order,
-            level=quest.level,
-            user_completed=status["completed"],
-            best_score=status["best_score"]
-        )
-        result.append(quest_detail)
+    etag = make_etag("quests", version, current_user.id, overlay)
+    result = [_with_overlay(quest, overlay.get(quest["id"])) for quest in quests]
     
-    return result
+    return conditional_response(request, result, etag, CATALOGUE_CACHE_CONTROL)
 
 
 @router.get("/{quest_id}", response_model=QuestDetailResponse)
 def get_quest(
     quest_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get details of a specific quest
+    Get details of a specific quest (supports `If-None-Match`)
     """
-    quest_service = QuestService(db)
-    quest = quest_service.get_quest_by_id(quest_id)
+    version, quest = quest_catalogue.get_quest(db, quest_id)
     
     if not quest:
         raise HTTPException(
@@ -62,28 +84,22 @@ def get_quest(
             detail="Quest not found"
         )
     
-    status_info = quest_service.get_user_quest_status(current_user.id, quest.id)
-    
-    return QuestDetailResponse(
-        id=quest.id,
-        title=quest.title,
-        description=quest.description,
-        task_type=quest.task_type,
-        xp_reward=quest.xp_reward,
-        metric_name=quest.metric_name,
-        threshold=quest.threshold,
-        level_id=quest.level_id,
-        order=quest.order,
-        level=quest.level,
-        user_completed=status_info["completed"],
-        best_score=status_info["best_score"]
-    )
+    overlay = QuestService(db).get_user_quest_overlay(current_user.id, quest_id)
+    status_info = overlay.get(quest_id)
+    
+    etag = make_etag("quest", version, current_user.id, quest_id, status_info)
+    
+    return conditional_response(request, _with_overlay(quest, status_info), etag, CATALOGUE_CACHE_CONTROL)
 
 
 @router.post("/{quest_id}/submit", response_model=SubmissionResponse)
 async def submit_quest(
     quest_id: int,
     model_file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", max_length=MAX_KEY_LENGTH,
+        description="Client-generated key; retries with the same key return the original result"
+    ),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -92,6 +108,17 @@ async def submit_quest(
     
     - **quest_id**: ID of the quest to submit for
     - **model_file**: Trained model file (.pkl or .joblib)
+    
+    Evaluations are queued per user and served round-robin, first attempts
+    before resubmissions of passed quests. With too many evaluations already
+    waiting the response is `429` with a `Retry-After` estimate. The time
+    spent queued is returned in `X-Queue-Wait-Ms`.
+    
+    With an `Idempotency-Key` header, retrying the request returns the
+    original result (marked `Idempotent-Replayed: true`) instead of
+    evaluating again; a retry arriving while the first request is still
+    running waits for it. Reusing a key for a different quest or file is
+    rejected with `422`. Failed requests are not stored and can be retried.
     """
     # Validate file extension
     if not (model_file.filename.endswith('.pkl') or model_file.filename.endswith('.joblib')):
@@ -100,45 +127,223 @@ async def submit_quest(
             detail="Model file must be .pkl or .joblib format"
         )
     
+    if idempotency_key is None:
+        content, wait_seconds = await _run_submission(db, current_user, quest_id, model_file)
+        return ORJSONResponse(content, headers={"X-Queue-Wait-Ms": f"{wait_seconds * 1000:.0f}"})
+    
+    user_id = current_user.id
+    fingerprint = await run_in_threadpool(fingerprint_upload, quest_id, model_file.file)
+    
+    # A duplicate of a request this worker is still processing shares its result
+    in_flight = in_flight_requests.get(user_id, idempotency_key)
+    if in_flight is not None:
+        in_flight_fingerprint, future = in_flight
+        if in_flight_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="Idempotency-Key was already used for a different submission"
+            )
+        content, _ = await asyncio.shield(future)
+        return ORJSONResponse(content, headers={"Idempotent-Replayed": "true"})
+    
+    # Registered before the first await, so duplicates arriving from now on attach to this request
+    in_flight_requests.start(user_id, idempotency_key, fingerprint)
+    idempotency_service = IdempotencyService(db)
+    claimed = False
+    try:
+        try:
+            stored = await run_in_threadpool(idempotency_service.claim, user_id, idempotency_key, fingerprint)
+        except IdempotencyMismatchError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e))
+        except IdempotencyConflictError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e), headers={"Retry-After": "5"})
+        
+        if stored is not None:
+            in_flight_requests.finish(user_id, idempotency_key, (stored, None))
+            return ORJSONResponse(stored, headers={"Idempotent-Replayed": "true"})
+        
+        claimed = True
+        content, wait_seconds = await _run_submission(db, current_user, quest_id, model_file)
+        await run_in_threadpool(idempotency_service.complete, user_id, idempotency_key, content["id"], content)
+    except BaseException as e:
+        if claimed:
+            await run_in_threadpool(idempotency_service.release, user_id, idempotency_key)
+        in_flight_requests.fail(user_id, idempotency_key, e)
+        raise
+    
+    in_flight_requests.finish(user_id, idempotency_key, (content, wait_seconds))
+    return ORJSONResponse(content, headers={"X-Queue-Wait-Ms": f"{wait_seconds * 1000:.0f}"})
+
+
+def _submission_content(submission) -> dict:
+    return {
+        "id": submission.id,
+        "quest_id": submission.quest_id,
+        "score": submission.score,
+        "passed": submission.passed,
+        "xp_awarded": submission.xp_awarded,
+        "submission_date": submission.submission_date,
+        "evaluation_logs": submission.evaluation_logs,
+        "evaluation_ms": submission.evaluation_ms,
+        "metrics": submission.metrics,
+        "stage_timings": submission.stage_timings,
+    }
+
+
+async def _run_submission(db: Session, user: User, quest_id: int, model_file: UploadFile) -> Tuple[dict, float]:
+    """
+    Queue, evaluate and record a submission, then award badges and notify event streams
+    
+    Returns:
+        The response content and the seconds spent queued
+    """
     quest_service = QuestService(db)
     badge_service = BadgeService(db)
+    user_id = user.id
+    
+    status_info = await run_in_threadpool(quest_service.get_user_quest_status, user_id, quest_id)
+    priority = PRIORITY_RESUBMISSION if status_info["completed"] else PRIORITY_FIRST_ATTEMPT
     
     try:
-        # Submit and evaluate
-        submission = quest_service.submit_quest(
-            user_id=current_user.id,
-            quest_id=quest_id,
-            model_file=model_file
+        job = evaluation_scheduler.submit(
+            user_id,
+            priority,
+            quest_service.submit_quest,
+            kwargs={"user_id": user_id, "quest_id": quest_id, "model_file": model_file},
+            on_start=lambda: event_broker.publish(
+                user_id, "submission", {"quest_id": quest_id, "state": "evaluating"}
+            )
         )
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    event_broker.publish(user_id, "submission", {"quest_id": quest_id, "state": "queued"})
+    
+    try:
+        # Submit and evaluate on a scheduler worker (off the event loop, so open event streams stay responsive)
+        submission = await asyncio.wrap_future(job.future)
         
         # Check for new badges
+        new_badges = []
         if submission.passed:
-            badge_service.check_and_award_badges(current_user.id)
+            new_badges = await run_in_threadpool(badge_service.check_and_award_badges, user_id)
         
-        return submission
+        await run_in_threadpool(_publish_submission_events, db, user, submission, new_badges)
+        
+        return _submission_content(submission), job.wait_seconds
     
     except ValueError as e:
+        event_broker.publish(user_id, "submission", {"quest_id": quest_id, "state": "failed", "detail": str(e)})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
+        event_broker.publish(user_id, "submission", {"quest_id": quest_id, "state": "failed", "detail": "Submission failed"})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Submission failed: {str(e)}"
         )
 
 
-@router.get("/{quest_id}/submissions", response_model=List[SubmissionResponse])
+def _publish_submission_events(db: Session, user: User, submission, new_badges):
+    """Push the evaluation result, new badges and the new rank to the user's event streams (runs in the threadpool)"""
+    if not event_broker.has_subscribers(user.id):
+        return
+    
+    event_broker.publish(user.id, "submission", {
+        "state": "evaluated",
+        "id": submission.id,
+        "quest_id": submission.quest_id,
+        "score": submission.score,
+        "passed": submission.passed,
+        "xp_awarded": submission.xp_awarded,
+    })
+    
+    for badge in new_badges:
+        event_broker.publish(user.id, "badge", {
+            "id": badge.id,
+            "name": badge.name,
+            "description": badge.description,
+            "icon": badge.icon,
+        })
+    
+    if submission.xp_awarded:
+        event_broker.publish(user.id, "rank", {
+            "rank": LeaderboardService(db).get_user_rank(user.id),
+            "xp": user.xp,
+            "level": user.level,
+        })
+
+
+@router.get("/{quest_id}/leaderboard", response_model=QuestLeaderboardResponse)
+def get_quest_leaderboard(
+    quest_id: int,
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of entries"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Rank users by their best score on a quest
+    
+    Also includes the current user's best score and rank.
+    """
+    _, quest = quest_catalogue.get_quest(db, quest_id)
+    if not quest:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quest not found"
+        )
+    
+    quest_service = QuestService(db)
+    status_info = quest_service.get_user_quest_status(current_user.id, quest_id)
+    
+    return ORJSONResponse({
+        "quest_id": quest_id,
+        "leaderboard": quest_service.get_quest_leaderboard(quest_id, limit=limit),
+        "user_best_score": status_info["best_score"],
+        "user_rank": quest_service.get_user_quest_rank(current_user.id, quest_id)
+    })
+
+
+@router.get("/{quest_id}/submissions", response_model=Union[List[SubmissionSummary], List[SubmissionResponse]])
 def get_quest_submissions(
     quest_id: int,
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of submissions"),
+    cursor: Optional[str] = Query(None, description="`X-Next-Cursor` from the previous page"),
+    detail: Literal["summary", "full"] = Query("summary", description="`full` adds logs, metrics and stage timings"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get all submissions for a specific quest by current user
+    Get current user's submissions for a specific quest, newest first
+    
+    When more submissions exist, the response has an `X-Next-Cursor` header;
+    pass it back as `cursor` to fetch the next page.
+    
+    Rows are slim summaries by default; `detail=full` adds failure logs,
+    evaluation time, all metrics and per-stage timings.
     """
+    after = None
+    if cursor is not None:
+        try:
+            submission_date, submission_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(submission_date), int(submission_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    
     quest_service = QuestService(db)
-    submissions = quest_service.get_user_submissions(current_user.id, quest_id)
+    submissions = quest_service.get_user_submission_rows(
+        current_user.id, quest_id, limit=limit, after=after, detail=detail == "full"
+    )
+    
+    headers = {}
+    if len(submissions) == limit:
+        last = submissions[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["submission_date"], last["id"])
     
-    return submissions
\ No newline at end of file
+    return ORJSONResponse(submissions, headers=headers)
\ No newline at end of file
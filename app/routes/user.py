@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import asyncio
 from app.database import get_db
-from app.schemas import UserResponse, UserProgress, BadgeResponse
-from app.services import QuestService, BadgeService
+from app.schemas import UserResponse, UserProgress
+from app.responses import ORJSONResponse
+from app.services import ProgressService, quest_catalogue
 from app.models import User
-from app.routes.dependencies import get_current_user
+from app.routes.dependencies import get_current_user, get_stream_user_id
+from app.events import event_broker, format_sse, TooManyStreamsError, SSE_HEARTBEAT_SECONDS
 
 router = APIRouter(prefix="/user", tags=["User"])
 
@@ -27,41 +31,82 @@ def get_user_progress(
     
     Includes:
     - User profile
-    - Completed quests count
+    - Completed quests count, attempts, perfect scores and last pass time
     - Total available quests
     - Earned badges
     """
-    quest_service = QuestService(db)
-    badge_service = BadgeService(db)
+    # Counters maintained with every submission (one row read)
+    progress = ProgressService(db).get_progress(current_user.id)
     
-    # Get quest completion stats
-    completed_quests = quest_service.get_quest_completion_count(current_user.id)
-    
-    from app.models import Quest, Badge, UserBadge
-    total_quests = db.query(Quest).count()
+    from app.models import Badge, UserBadge
+    total_quests = quest_catalogue.count(db)
     
     # Get earned badges with earned_at timestamps
-    user_badges_with_time = (
-        db.query(Badge, UserBadge.earned_at)
-        .join(UserBadge)
-        .filter(UserBadge.user_id == current_user.id)
-        .all()
-    )
-    
     badges = [
-        BadgeResponse(
-            id=badge.id,
-            name=badge.name,
-            description=badge.description,
-            icon=badge.icon,
-            earned_at=earned_at
+        row._asdict()
+        for row in (
+            db.query(Badge.id, Badge.name, Badge.description, Badge.icon, UserBadge.earned_at)
+            .join(UserBadge)
+            .filter(UserBadge.user_id == current_user.id)
+            .all()
         )
-        for badge, earned_at in user_badges_with_time
     ]
     
-    return UserProgress(
-        user=current_user,
-        completed_quests=completed_quests,
-        total_quests=total_quests,
-        badges=badges
-    )
\ No newline at end of file
+    return ORJSONResponse({
+        "user": {
+            "id": current_user.id,
+            "username": current_user.username,
+            "email": current_user.email,
+            "xp": current_user.xp,
+            "level": current_user.level,
+            "current_streak": current_user.current_streak,
+            "created_at": current_user.created_at,
+        },
+        "completed_quests": progress["completed_quests"],
+        "total_quests": total_quests,
+        "attempts": progress["attempts"],
+        "perfect_scores": progress["perfect_scores"],
+        "last_passed_at": progress["last_passed_at"],
+        "badges": badges
+    })
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def stream_user_events(
+    request: Request,
+    user_id: int = Depends(get_stream_user_id)
+):
+    """
+    Server-sent event stream of the current user's updates
+    
+    Events:
+    - `submission`: evaluation started (`state: evaluating`), finished
+      (`state: evaluated` with score, passed, xp_awarded) or failed
+    - `badge`: a newly awarded badge
+    - `rank`: new global rank and XP after an XP award
+    
+    Browsers can pass the JWT as `?token=` since EventSource cannot set headers.
+    """
+    try:
+        queue = event_broker.subscribe(user_id)
+    except TooManyStreamsError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    
+    async def stream():
+        try:
+            yield b"retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_sse(message)
+        finally:
+            event_broker.unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
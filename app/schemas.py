@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Literal, Dict
+from datetime import datetime, date
 
 
 # ===== Auth Schemas =====
@@ -45,6 +45,9 @@ class UserProgress(BaseModel):
     user: UserResponse
     completed_quests: int
     total_quests: int
+    attempts: int = 0
+    perfect_scores: int = 0
+    last_passed_at: Optional[datetime] = None
     badges: List["BadgeResponse"]
     
     class Config:
@@ -97,19 +100,25 @@ class SubmissionCreate(BaseModel):
     quest_id: int
 
 
-class SubmissionResponse(BaseModel):
+class SubmissionSummary(BaseModel):
     id: int
     quest_id: int
     score: Optional[float]
     passed: bool
     xp_awarded: int
     submission_date: datetime
-    evaluation_logs: Optional[str]
     
     class Config:
         from_attributes = True
 
 
+class SubmissionResponse(SubmissionSummary):
+    evaluation_logs: Optional[str]  # failure message
+    evaluation_ms: Optional[int] = None
+    metrics: Optional[Dict[str, Optional[float]]] = None
+    stage_timings: Optional[Dict[str, float]] = None  # milliseconds per evaluation stage
+
+
 # ===== Badge Schemas =====
 class BadgeBase(BaseModel):
     name: str
@@ -128,6 +137,7 @@ class BadgeResponse(BadgeBase):
 # ===== Leaderboard Schemas =====
 class LeaderboardEntry(BaseModel):
     rank: int
+    user_id: int
     username: str
     xp: int
     level: int
@@ -136,4 +146,38 @@ class LeaderboardEntry(BaseModel):
 
 class LeaderboardResponse(BaseModel):
     leaderboard: List[LeaderboardEntry]
+    user_rank: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class QuestLeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    score: float
+    submitted_at: Optional[datetime]
+    attempts: int
+
+
+class QuestLeaderboardResponse(BaseModel):
+    quest_id: int
+    leaderboard: List[QuestLeaderboardEntry]
+    user_best_score: Optional[float] = None
+    user_rank: Optional[int] = None
+
+
+class PeriodLeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    xp: int
+
+
+class PeriodLeaderboardResponse(BaseModel):
+    period: Literal["daily", "weekly", "monthly"]
+    period_start: date
+    period_end: date
+    frozen: bool
+    leaderboard: List[PeriodLeaderboardEntry]
+    user_xp: int = 0
     user_rank: Optional[int] = None
\ No newline at end of file
@@ -2,5 +2,22 @@ from .auth_service import AuthService
 from .quest_service import QuestService
 from .badge_service import BadgeService
 from .leaderboard_service import LeaderboardService
+from .catalogue_service import QuestCatalogue, quest_catalogue
+from .xp_service import XPService
+from .progress_service import ProgressService
+from .analytics_service import AnalyticsService
+from .leaderboard_cache import LeaderboardCache, leaderboard_cache
 
-__all__ = ["AuthService", "QuestService", "BadgeService", "LeaderboardService"]
\ No newline at end of file
+__all__ = [
+    "AuthService",
+    "QuestService",
+    "BadgeService",
+    "LeaderboardService",
+    "XPService",
+    "ProgressService",
+    "AnalyticsService",
+    "QuestCatalogue",
+    "quest_catalogue",
+    "LeaderboardCache",
+    "leaderboard_cache",
+]
@@ -0,0 +1,249 @@
+from sqlalchemy.orm import Session
+from app.monitoring import trace_methods
+from app.services.retention_service import submission_history
+from typing import Dict, Any, List, Optional, Set
+from datetime import datetime
+import os
+import threading
+import time
+
+# Dashboards polling more often than this get the cached result without a query
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "10"))
+
+# Rows fetched per round trip when catching up
+ANALYTICS_BATCH_ROWS = 100_000
+
+# Ids below the highest one seen that are re-read on every catch-up: concurrent
+# transactions can commit a lower id after a higher one was already read
+ANALYTICS_LATE_WINDOW_IDS = int(os.getenv("ANALYTICS_LATE_WINDOW_IDS", "10000"))
+
+SCORE_BINS = 20
+MAX_ATTEMPTS_BUCKET = 10  # attempts-to-pass of 10 or more share the last bucket
+
+
+def _evaluation_ms_edges():
+    """Log-spaced evaluation time buckets from 1 ms to 10 minutes"""
+    import numpy as np
+    return np.geomspace(1, 600_000, 81)
+
+
+def _histogram_quantile(edges, counts, q: float) -> Optional[float]:
+    """Estimate a quantile from histogram counts (geometric interpolation within the bucket)"""
+    import numpy as np
+    
+    total = counts.sum()
+    if not total:
+        return None
+    
+    cumulative = np.cumsum(counts)
+    target = q * total
+    index = int(np.searchsorted(cumulative, target))
+    below = cumulative[index - 1] if index else 0
+    fraction = (target - below) / counts[index]
+    low, high = edges[index], edges[index + 1]
+    return float(low * (high / low) ** fraction)
+
+
+class QuestAnalytics:
+    """
+    Running aggregates for one quest, advanced by the submissions added since
+    the last refresh (tracked by the highest submission id seen)
+    
+    Ids are not committed in order, so the ids seen within
+    ANALYTICS_LATE_WINDOW_IDS below the highest are remembered: a catch-up
+    re-reads that window and folds in only rows not counted yet. A late row
+    is counted as the user's latest attempt for attempts-to-pass.
+    
+    Memory is bounded by the number of distinct users, not submissions:
+    scores and evaluation times are kept as fixed histograms.
+    """
+    
+    def __init__(self, quest_id: int):
+        import numpy as np
+        
+        self.quest_id = quest_id
+        self.lock = threading.Lock()
+        self.last_submission_id = 0
+        self.recent_ids: Set[int] = set()  # ids seen within the late window
+        self.checked_at = 0.0  # monotonic time of the last catch-up
+        self.refreshed_at: Optional[datetime] = None
+        
+        self.submissions = 0
+        self.passed = 0
+        self.score_edges = np.linspace(0.0, 1.0, SCORE_BINS + 1)
+        self.score_counts = np.zeros(SCORE_BINS, dtype=np.int64)
+        self.scores_below = 0  # e.g. negative r2
+        self.scores_above = 0  # e.g. error metrics
+        self.time_edges = _evaluation_ms_edges()
+        self.time_counts = np.zeros(len(self.time_edges) - 1, dtype=np.int64)
+        
+        self.attempts_to_pass = np.zeros(MAX_ATTEMPTS_BUCKET + 1, dtype=np.int64)
+        self.pending_attempts: Dict[int, int] = {}  # users who have not passed yet
+        self.passed_users = set()
+    
+    def unseen(self, ids):
+        """Mask of the ids not folded in yet (only ids within the late window can have been)"""
+        import numpy as np
+        return np.fromiter((id not in self.recent_ids for id in ids.tolist()), dtype=bool, count=len(ids))
+    
+    def forget_before(self, first_id: int):
+        """Drop remembered ids that have fallen out of the late window"""
+        self.recent_ids = {id for id in self.recent_ids if id >= first_id}
+    
+    def add_batch(self, ids, user_ids, scores, passed, evaluation_ms):
+        """Fold a batch of submissions (arrays ordered by id, none seen before) into the aggregates"""
+        import numpy as np
+        
+        self.submissions += len(ids)
+        self.passed += int(passed.sum())
+        self.last_submission_id = max(self.last_submission_id, int(ids[-1]))
+        self.recent_ids.update(ids.tolist())
+        
+        scored = scores[~np.isnan(scores)]
+        self.scores_below += int((scored < 0).sum())
+        self.scores_above += int((scored > 1).sum())
+        self.score_counts += np.histogram(scored, bins=self.score_edges)[0]
+        
+        timed = evaluation_ms[~np.isnan(evaluation_ms)]
+        self.time_counts += np.histogram(np.clip(timed, 1, 600_000), bins=self.time_edges)[0]
+        
+        self._add_attempts(user_ids, passed)
+    
+    def _add_attempts(self, user_ids, passed):
+        import numpy as np
+        
+        # Group rows by user, keeping id order within each user
+        order = np.argsort(user_ids, kind="stable")
+        users, starts, counts = np.unique(user_ids[order], return_index=True, return_counts=True)
+        group = np.repeat(np.arange(len(users)), counts)
+        position = np.arange(len(order)) - starts[group]
+        
+        # Position of each user's first pass in this batch
+        never = np.iinfo(np.int64).max
+        first_pass = np.full(len(users), never, dtype=np.int64)
+        passed_rows = passed[order]
+        np.minimum.at(first_pass, group[passed_rows], position[passed_rows])
+        
+        for user_id, count, first in zip(users.tolist(), counts.tolist(), first_pass.tolist()):
+            if user_id in self.passed_users:
+                continue
+            prior = self.pending_attempts.pop(user_id, 0)
+            if first == never:
+                self.pending_attempts[user_id] = prior + count
+            else:
+                self.attempts_to_pass[min(prior + first + 1, MAX_ATTEMPTS_BUCKET)] += 1
+                self.passed_users.add(user_id)
+    
+    def summary(self) -> Dict[str, Any]:
+        import numpy as np
+        
+        users_passed = len(self.passed_users)
+        users = users_passed + len(self.pending_attempts)
+        buckets = np.arange(len(self.attempts_to_pass))
+        
+        return {
+            "quest_id": self.quest_id,
+            "submissions": self.submissions,
+            "passed_submissions": self.passed,
+            "pass_rate": self.passed / self.submissions if self.submissions else None,
+            "users": users,
+            "users_passed": users_passed,
+            "user_pass_rate": users_passed / users if users else None,
+            "score_histogram": {
+                "edges": self.score_edges.round(4).tolist(),
+                "counts": self.score_counts.tolist(),
+                "below": self.scores_below,
+                "above": self.scores_above,
+            },
+            "attempts_to_pass": {
+                (f"{n}+" if n == MAX_ATTEMPTS_BUCKET else str(n)): int(count)
+                for n, count in zip(buckets[1:], self.attempts_to_pass[1:])
+            },
+            "mean_attempts_to_pass": (
+                float((buckets * self.attempts_to_pass).sum() / users_passed) if users_passed else None
+            ),
+            "evaluation_ms": {
+                "samples": int(self.time_counts.sum()),
+                "median": _histogram_quantile(self.time_edges, self.time_counts, 0.5),
+                "p95": _histogram_quantile(self.time_edges, self.time_counts, 0.95),
+            },
+            "last_submission_id": self.last_submission_id,
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+_analytics: Dict[int, QuestAnalytics] = {}
+_analytics_lock = threading.Lock()
+
+
+@trace_methods
+class AnalyticsService:
+    """Service for per-quest submission analytics (cached per worker)"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def _catch_up(self, analytics: QuestAnalytics):
+        """
+        Fetch submissions (archived ones included) not counted yet, in id order and in batches
+        
+        Reading starts ANALYTICS_LATE_WINDOW_IDS below the highest id seen, so
+        rows committed late with a lower id are picked up; rows already
+        counted are skipped.
+        """
+        import numpy as np
+        
+        history = submission_history().subquery()
+        after_id = max(0, analytics.last_submission_id - ANALYTICS_LATE_WINDOW_IDS)
+        while True:
+            rows = (
+                self.db.query(history.c.id, history.c.user_id, history.c.score, history.c.passed, history.c.evaluation_ms)
+                .filter(history.c.quest_id == analytics.quest_id, history.c.id > after_id)
+                .order_by(history.c.id)
+                .limit(ANALYTICS_BATCH_ROWS)
+                .all()
+            )
+            if not rows:
+                break
+            
+            ids, user_ids, scores, passed, evaluation_ms = zip(*rows)
+            ids = np.asarray(ids, dtype=np.int64)
+            after_id = int(ids[-1])
+            
+            unseen = analytics.unseen(ids)
+            if unseen.any():
+                analytics.add_batch(
+                    ids[unseen],
+                    np.asarray(user_ids, dtype=np.int64)[unseen],
+                    np.asarray(scores, dtype=np.float64)[unseen],  # None becomes nan
+                    np.asarray(passed, dtype=bool)[unseen],
+                    np.asarray(evaluation_ms, dtype=np.float64)[unseen],
+                )
+            
+            if len(rows) < ANALYTICS_BATCH_ROWS:
+                break
+        
+        analytics.forget_before(analytics.last_submission_id - ANALYTICS_LATE_WINDOW_IDS)
+    
+    def get_quest_analytics(self, quest_id: int, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Pass rates, score histogram, attempts-to-pass distribution and evaluation times
+        
+        Only submissions added since the previous call are read, at most every
+        ANALYTICS_REFRESH_SECONDS unless `refresh` is set.
+        """
+        with _analytics_lock:
+            analytics = _analytics.get(quest_id)
+            if analytics is None:
+                analytics = _analytics[quest_id] = QuestAnalytics(quest_id)
+        
+        with analytics.lock:
+            if refresh or time.monotonic() - analytics.checked_at >= ANALYTICS_REFRESH_SECONDS:
+                self._catch_up(analytics)
+                analytics.checked_at = time.monotonic()
+                analytics.refreshed_at = datetime.utcnow()
+            return analytics.summary()
+    
+    def get_all_quest_analytics(self, quest_ids: List[int], refresh: bool = False) -> List[Dict[str, Any]]:
+        """Analytics for several quests (see get_quest_analytics)"""
+        return [self.get_quest_analytics(quest_id, refresh=refresh) for quest_id in quest_ids]
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import Badge, UserBadge, User, Submission
-from typing import List
+from app.models import Badge, UserBadge, User
+from app.monitoring import trace_methods
+from app.services.progress_service import ProgressService
+from typing import List, Dict, Any
 
 
+@trace_methods
 class BadgeService:
     """Service for managing badges and achievements"""
     
@@ -38,6 +40,7 @@ class BadgeService:
         all_badges = self.get_all_badges()
         user_badges = self.get_user_badges(user_id)
         user_badge_ids = {badge.id for badge in user_badges}
+        progress = ProgressService(self.db).get_progress(user_id)
         
         newly_awarded = []
         
@@ -47,42 +50,26 @@ class BadgeService:
                 continue
             
             # Check if user meets badge condition
-            if self._check_badge_condition(user_id, badge):
+            if self._check_badge_condition(user, progress, badge):
                 self._award_badge(user_id, badge.id)
                 newly_awarded.append(badge)
         
         return newly_awarded
     
-    def _check_badge_condition(self, user_id: int, badge: Badge) -> bool:
-        """Check if user meets the condition for a badge"""
-        user = self.db.query(User).filter(User.id == user_id).first()
-        
+    def _check_badge_condition(self, user: User, progress: Dict[str, Any], badge: Badge) -> bool:
+        """Check if user meets the condition for a badge (progress from ProgressService)"""
         if badge.condition_type == "xp_threshold":
             return user.xp >= badge.condition_value
         
         elif badge.condition_type == "quest_completion":
-            completed_quests = (
-                self.db.query(func.count(func.distinct(Submission.quest_id)))
-                .filter(Submission.user_id == user_id, Submission.passed == True)
-                .scalar()
-            )
-            return completed_quests >= badge.condition_value
+            return progress["completed_quests"] >= badge.condition_value
         
         elif badge.condition_type == "streak":
             return user.current_streak >= badge.condition_value
         
         elif badge.condition_type == "perfect_score":
-            # Check if user has achieved perfect score (1.0) on any quest
-            perfect_submissions = (
-                self.db.query(Submission)
-                .filter(
-                    Submission.user_id == user_id,
-                    Submission.score >= 0.99,  # Allow for floating point precision
-                    Submission.passed == True
-                )
-                .count()
-            )
-            return perfect_submissions >= badge.condition_value
+            # Passed submissions with a perfect score (1.0, allowing for floating point precision)
+            return progress["perfect_scores"] >= badge.condition_value
         
         return False
     
@@ -0,0 +1,106 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, update, select
+from app.models import Quest, Level, CatalogueVersion
+from app.services.quest_service import QuestService
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+import itertools
+import os
+import threading
+import time
+
+# How often other workers' catalogue writes are picked up (local writes apply immediately)
+CATALOGUE_REFRESH_SECONDS = float(os.getenv("CATALOGUE_REFRESH_SECONDS", "5"))
+
+
+class QuestCatalogue:
+    """
+    In-memory copy of the quest and level catalogue
+    
+    The catalogue is tagged with the version stored in the catalogue_version
+    table. Writes to quests or levels bump that version (see the session
+    hooks below); each worker re-reads the version at most every
+    CATALOGUE_REFRESH_SECONDS and only reloads quests when it changed.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._quests: List[Dict[str, Any]] = []
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._checked_at = 0.0
+        self._stale = True
+    
+    def _refresh(self, db: Session):
+        if not self._stale and time.monotonic() - self._checked_at < CATALOGUE_REFRESH_SECONDS:
+            return
+        
+        with self._lock:
+            if not self._stale and time.monotonic() - self._checked_at < CATALOGUE_REFRESH_SECONDS:
+                return
+            
+            version = db.execute(
+                select(CatalogueVersion.version).where(CatalogueVersion.id == 1)
+            ).scalar() or 0
+            
+            if self._stale or version != self._version:
+                quests = QuestService(db).get_quest_rows()
+                self._by_id = {quest["id"]: quest for quest in quests}
+                self._quests = quests
+                self._version = version
+            
+            self._checked_at = time.monotonic()
+            self._stale = False
+    
+    def get_quests(self, db: Session) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Get the catalogue version and all quests (ordered by level and quest order)
+        
+        The returned dicts are shared; copy them before adding per-user fields.
+        """
+        self._refresh(db)
+        return self._version, self._quests
+    
+    def get_quest(self, db: Session, quest_id: int) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Get the catalogue version and a single quest (shared dict, see get_quests)"""
+        self._refresh(db)
+        return self._version, self._by_id.get(quest_id)
+    
+    def count(self, db: Session) -> int:
+        """Number of quests in the catalogue"""
+        self._refresh(db)
+        return len(self._quests)
+    
+    def invalidate(self):
+        """Force a reload on next access"""
+        self._stale = True
+
+
+quest_catalogue = QuestCatalogue()
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_catalogue_version(session, flush_context, instances):
+    """Bump the catalogue version in the same transaction as any quest or level write"""
+    if session.info.get("catalogue_changed"):
+        return
+    
+    changed = itertools.chain(session.new, session.dirty, session.deleted)
+    if any(isinstance(obj, (Quest, Level)) for obj in changed):
+        session.connection().execute(
+            update(CatalogueVersion)
+            .where(CatalogueVersion.id == 1)
+            .values(version=CatalogueVersion.version + 1, updated_at=datetime.utcnow())
+        )
+        session.info["catalogue_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalogue(session):
+    if session.info.pop("catalogue_changed", False):
+        quest_catalogue.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalogue_change(session):
+    session.info.pop("catalogue_changed", None)
@@ -0,0 +1,268 @@
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional
+import math
+import os
+import threading
+import time
+
+# Evaluations run at once in this worker process
+EVALUATION_WORKERS = int(os.getenv("EVALUATION_WORKERS", str(os.cpu_count() or 2)))
+
+# Evaluations one user may have running at once
+EVALUATION_USER_CONCURRENCY = int(os.getenv("EVALUATION_USER_CONCURRENCY", "1"))
+
+# Evaluations one user may have waiting; further submissions get 429
+EVALUATION_USER_QUEUE_LIMIT = int(os.getenv("EVALUATION_USER_QUEUE_LIMIT", "3"))
+
+# Evaluations waiting across all users
+EVALUATION_QUEUE_LIMIT = int(os.getenv("EVALUATION_QUEUE_LIMIT", "500"))
+
+# Users whose wait statistics are kept (least recently active are dropped)
+EVALUATION_STATS_USERS = 1000
+
+PRIORITY_FIRST_ATTEMPT = 0  # quest not passed yet
+PRIORITY_RESUBMISSION = 1  # quest already passed
+PRIORITIES = (PRIORITY_FIRST_ATTEMPT, PRIORITY_RESUBMISSION)
+
+
+class QueueFullError(Exception):
+    """Raised when a submission cannot be queued; retry_after is a wait estimate in seconds"""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class EvaluationJob:
+    __slots__ = ("user_id", "priority", "func", "args", "kwargs", "on_start", "future", "enqueued_at", "wait_seconds")
+    
+    def __init__(self, user_id, priority, func, args, kwargs, on_start):
+        self.user_id = user_id
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_start = on_start
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        self.wait_seconds: Optional[float] = None
+
+
+class _UserQueue:
+    __slots__ = ("jobs", "running")
+    
+    def __init__(self):
+        self.jobs: List[Deque[EvaluationJob]] = [deque() for _ in PRIORITIES]
+        self.running = 0
+    
+    def queued(self) -> int:
+        return sum(len(jobs) for jobs in self.jobs)
+
+
+class _WaitStats:
+    __slots__ = ("submitted", "rejected", "started", "total_wait", "max_wait")
+    
+    def __init__(self):
+        self.submitted = 0
+        self.rejected = 0
+        self.started = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class EvaluationScheduler:
+    """
+    Fair-share scheduler for model evaluations
+    
+    Each user has their own queue. Workers serve users round-robin, one job
+    per turn, so a user with many uploads waits behind everyone else's next
+    job rather than in front of it. First attempts are always served before
+    resubmissions of already-passed quests. A user never has more than
+    EVALUATION_USER_CONCURRENCY evaluations running, and submissions beyond
+    EVALUATION_USER_QUEUE_LIMIT waiting are rejected with QueueFullError.
+    """
+    
+    def __init__(
+        self,
+        workers: int = EVALUATION_WORKERS,
+        user_concurrency: int = EVALUATION_USER_CONCURRENCY,
+        user_queue_limit: int = EVALUATION_USER_QUEUE_LIMIT,
+        queue_limit: int = EVALUATION_QUEUE_LIMIT
+    ):
+        self.workers = workers
+        self.user_concurrency = user_concurrency
+        self.user_queue_limit = user_queue_limit
+        self.queue_limit = queue_limit
+        
+        self._condition = threading.Condition()
+        # Per priority, users with jobs waiting at that priority, in turn order
+        self._rings: List["OrderedDict[int, None]"] = [OrderedDict() for _ in PRIORITIES]
+        self._users: Dict[int, _UserQueue] = {}
+        self._stats: "OrderedDict[int, _WaitStats]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._avg_seconds = 5.0  # moving average of evaluation time, for Retry-After
+    
+    def _user_stats(self, user_id: int) -> _WaitStats:
+        stats = self._stats.pop(user_id, None) or _WaitStats()
+        self._stats[user_id] = stats
+        while len(self._stats) > EVALUATION_STATS_USERS:
+            self._stats.popitem(last=False)
+        return stats
+    
+    def _retry_after(self, jobs_ahead: float) -> int:
+        return max(1, math.ceil(self._avg_seconds * jobs_ahead))
+    
+    def submit(
+        self,
+        user_id: int,
+        priority: int,
+        func: Callable[..., Any],
+        args: tuple = (),
+        kwargs: Optional[dict] = None,
+        on_start: Optional[Callable[[], None]] = None
+    ) -> EvaluationJob:
+        """
+        Queue `func(*args, **kwargs)` for a user
+        
+        Args:
+            priority: PRIORITY_FIRST_ATTEMPT or PRIORITY_RESUBMISSION
+            on_start: Called in the worker thread when the job starts
+        
+        Returns:
+            The queued job; await `asyncio.wrap_future(job.future)` for the result
+        
+        Raises:
+            QueueFullError: if the user's queue or the global queue is full
+        """
+        with self._condition:
+            stats = self._user_stats(user_id)
+            queue = self._users.get(user_id) or _UserQueue()
+            
+            if queue.queued() >= self.user_queue_limit:
+                stats.rejected += 1
+                ahead = (queue.queued() + queue.running) / self.user_concurrency
+                raise QueueFullError(
+                    f"You already have {queue.queued()} evaluations waiting; retry when one finishes",
+                    self._retry_after(ahead)
+                )
+            if self._queued >= self.queue_limit:
+                stats.rejected += 1
+                raise QueueFullError("Evaluation queue is full", self._retry_after(self._queued / self.workers))
+            
+            job = EvaluationJob(user_id, priority, func, args, kwargs or {}, on_start)
+            self._users[user_id] = queue
+            queue.jobs[priority].append(job)
+            self._rings[priority].setdefault(user_id, None)
+            self._queued += 1
+            stats.submitted += 1
+            
+            self._ensure_workers()
+            self._condition.notify()
+        
+        return job
+    
+    def _ensure_workers(self):
+        """Start worker threads on first use (called with the condition held)"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name=f"evaluation-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+    
+    def _next_job(self) -> Optional[EvaluationJob]:
+        """Pop the next job in fair-share order (called with the condition held)"""
+        for priority, ring in enumerate(self._rings):
+            chosen = next(
+                (user_id for user_id in ring if self._users[user_id].running < self.user_concurrency),
+                None
+            )
+            if chosen is None:
+                continue
+            
+            jobs = self._users[chosen].jobs[priority]
+            job = jobs.popleft()
+            if jobs:
+                ring.move_to_end(chosen)
+            else:
+                del ring[chosen]
+            return job
+        
+        return None
+    
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                
+                queue = self._users[job.user_id]
+                queue.running += 1
+                self._queued -= 1
+                self._running += 1
+                
+                job.wait_seconds = time.monotonic() - job.enqueued_at
+                stats = self._user_stats(job.user_id)
+                stats.started += 1
+                stats.total_wait += job.wait_seconds
+                stats.max_wait = max(stats.max_wait, job.wait_seconds)
+            
+            started = time.monotonic()
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    if job.on_start is not None:
+                        job.on_start()
+                    job.future.set_result(job.func(*job.args, **job.kwargs))
+            except BaseException as e:
+                job.future.set_exception(e)
+            finally:
+                with self._condition:
+                    queue.running -= 1
+                    self._running -= 1
+                    self._completed += 1
+                    self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.monotonic() - started)
+                    if not queue.running and not queue.queued():
+                        del self._users[job.user_id]
+                    # A per-user concurrency slot is free again
+                    self._condition.notify_all()
+    
+    def stats(self, top_users: int = 50) -> Dict[str, Any]:
+        """Queue depth, throughput and per-user wait times"""
+        with self._condition:
+            users = []
+            for user_id, stats in self._stats.items():
+                queue = self._users.get(user_id)
+                users.append({
+                    "user_id": user_id,
+                    "queued": queue.queued() if queue else 0,
+                    "running": queue.running if queue else 0,
+                    "submitted": stats.submitted,
+                    "rejected": stats.rejected,
+                    "mean_wait_ms": round(stats.total_wait / stats.started * 1000, 1) if stats.started else None,
+                    "max_wait_ms": round(stats.max_wait * 1000, 1),
+                })
+            users.sort(key=lambda user: (user["queued"] + user["running"], user["max_wait_ms"]), reverse=True)
+            
+            return {
+                "workers": self.workers,
+                "user_concurrency": self.user_concurrency,
+                "user_queue_limit": self.user_queue_limit,
+                "running": self._running,
+                "queued": self._queued,
+                "queued_by_priority": {
+                    "first_attempt": sum(len(q.jobs[PRIORITY_FIRST_ATTEMPT]) for q in self._users.values()),
+                    "resubmission": sum(len(q.jobs[PRIORITY_RESUBMISSION]) for q in self._users.values()),
+                },
+                "completed": self._completed,
+                "avg_evaluation_seconds": round(self._avg_seconds, 3),
+                "users": users[:top_users],
+            }
+
+
+evaluation_scheduler = EvaluationScheduler()
@@ -0,0 +1,119 @@
+from sqlalchemy import select, union_all
+from sqlalchemy.sql import Select
+from app.database import SessionLocal
+from app.models import User, Submission, SubmissionArchive
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+from datetime import datetime
+import csv
+import io
+import zlib
+import orjson
+
+# Rows fetched per server-side cursor round trip
+EXPORT_BATCH_ROWS = 5000
+
+# Output is buffered and flushed in chunks of about this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+SUBMISSION_EXPORT_COLUMNS = [
+    "id", "user_id", "quest_id", "submission_date", "score", "passed", "xp_awarded", "evaluation_ms",
+]
+LEADERBOARD_EXPORT_COLUMNS = ["rank", "user_id", "username", "xp", "level", "completed_quests"]
+
+
+def _submission_rows(model, quest_id, since, until, passed) -> Select:
+    """Export columns of Submission or SubmissionArchive, filtered"""
+    query = select(*(getattr(model, column) for column in SUBMISSION_EXPORT_COLUMNS))
+    
+    if quest_id is not None:
+        query = query.where(model.quest_id == quest_id)
+    if since is not None:
+        query = query.where(model.submission_date >= since)
+    if until is not None:
+        query = query.where(model.submission_date < until)
+    if passed is not None:
+        query = query.where(model.passed == passed)
+    
+    return query
+
+
+def iter_submissions(
+    quest_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    passed: Optional[bool] = None,
+    include_archived: bool = True
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream submissions in id order through a server-side cursor
+    
+    With `include_archived`, submissions moved to submission_archive by
+    retention are included (they keep their original ids).
+    
+    Opens its own session, since streaming outlives the request's session.
+    """
+    with SessionLocal() as db:
+        rows = _submission_rows(Submission, quest_id, since, until, passed)
+        if include_archived:
+            rows = union_all(rows, _submission_rows(SubmissionArchive, quest_id, since, until, passed))
+        rows = rows.subquery()
+        
+        statement = select(rows).order_by(rows.c.id).execution_options(yield_per=EXPORT_BATCH_ROWS)
+        for row in db.execute(statement):
+            yield row._asdict()
+
+
+def iter_leaderboard() -> Iterator[Dict[str, Any]]:
+    """Stream every user in leaderboard order through a server-side cursor"""
+    with SessionLocal() as db:
+        query = (
+            db.query(User.id, User.username, User.xp, User.level, User.completed_quests)
+            .order_by(User.xp.desc(), User.completed_quests.desc(), User.id)
+        )
+        
+        for rank, row in enumerate(query.yield_per(EXPORT_BATCH_ROWS), start=1):
+            yield {
+                "rank": rank,
+                "user_id": row.id,
+                "username": row.username,
+                "xp": row.xp,
+                "level": row.level,
+                "completed_quests": row.completed_quests,
+            }
+
+
+def encode_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """One JSON object per line, flushed in ~EXPORT_CHUNK_BYTES chunks"""
+    buffer = bytearray()
+    for row in rows:
+        buffer += orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def encode_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    """CSV with a header row, flushed in ~EXPORT_CHUNK_BYTES chunks"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,149 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from app.models import IdempotencyKey
+from app.monitoring import trace_methods
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import os
+import orjson
+
+# Completed requests are replayed for this long
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# A key still in flight after this long is treated as abandoned (e.g. its worker died)
+IDEMPOTENCY_PENDING_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "600"))
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when the key is in flight in another worker process"""
+
+
+class IdempotencyMismatchError(Exception):
+    """Raised when the key was already used for a different quest or file"""
+
+
+def fingerprint_upload(quest_id: int, file: BinaryIO, chunk_size: int = 1024 * 1024) -> str:
+    """Hash of the quest and the uploaded file (the file is rewound afterwards)"""
+    digest = hashlib.blake2b(b"%d:" % quest_id, digest_size=32)
+    file.seek(0)
+    for chunk in iter(lambda: file.read(chunk_size), b""):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+@trace_methods
+class IdempotencyService:
+    """Service for stored results of idempotent submit requests"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def claim(self, user_id: int, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Reserve a key for a new request, or find its stored response
+        
+        Returns:
+            The stored response if the key's request already completed,
+            otherwise None and the key is now claimed (call complete or release)
+        
+        Raises:
+            IdempotencyMismatchError: if the key was used for a different request
+            IdempotencyConflictError: if the key's request is still in flight
+        """
+        now = datetime.utcnow()
+        row = self.db.get(IdempotencyKey, (user_id, key))
+        
+        if row is not None:
+            expired = row.created_at < now - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+            abandoned = row.response is None and row.created_at < now - timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS)
+            if not (expired or abandoned):
+                if row.fingerprint != fingerprint:
+                    raise IdempotencyMismatchError("Idempotency-Key was already used for a different submission")
+                if row.response is None:
+                    raise IdempotencyConflictError("A request with this Idempotency-Key is still being processed")
+                return row.response
+            self.db.delete(row)
+            self.db.flush()
+        
+        try:
+            self.db.add(IdempotencyKey(user_id=user_id, key=key, fingerprint=fingerprint, created_at=now))
+            self.db.commit()
+        except IntegrityError:
+            # Claimed concurrently by another worker
+            self.db.rollback()
+            raise IdempotencyConflictError("A request with this Idempotency-Key is still being processed")
+        
+        return None
+    
+    def complete(self, user_id: int, key: str, submission_id: int, response: Dict[str, Any]):
+        """Store the response of a claimed key"""
+        response = orjson.loads(orjson.dumps(response))  # datetimes to ISO strings
+        self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(submission_id=submission_id, response=response)
+        )
+        self.db.commit()
+    
+    def release(self, user_id: int, key: str):
+        """Drop a claimed key whose request failed, so the client can retry with it"""
+        self.db.rollback()  # whatever the failed request left in the session
+        self.db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.response.is_(None))
+        )
+        self.db.commit()
+    
+    def purge_expired(self) -> int:
+        """
+        Delete keys past IDEMPOTENCY_KEY_TTL_HOURS
+        
+        Returns:
+            Number of keys deleted
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+        result = self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff))
+        self.db.commit()
+        return result.rowcount
+
+
+class InFlightRequests:
+    """
+    Idempotent requests being processed by this worker, so duplicates
+    arriving meanwhile await the same result instead of starting their own
+    
+    Only used from the event loop, so no locking is needed.
+    """
+    
+    def __init__(self):
+        self._requests: Dict[Tuple[int, str], Tuple[str, asyncio.Future]] = {}
+    
+    def get(self, user_id: int, key: str) -> Optional[Tuple[str, asyncio.Future]]:
+        """(fingerprint, future) of an in-flight request"""
+        return self._requests.get((user_id, key))
+    
+    def start(self, user_id: int, key: str, fingerprint: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._requests[(user_id, key)] = (fingerprint, future)
+        return future
+    
+    def finish(self, user_id: int, key: str, result: Any):
+        _, future = self._requests.pop((user_id, key))
+        future.set_result(result)
+    
+    def fail(self, user_id: int, key: str, error: BaseException):
+        _, future = self._requests.pop((user_id, key))
+        if isinstance(error, Exception):
+            future.set_exception(error)
+            future.exception()  # retrieved: no "never retrieved" warning without duplicates
+        else:
+            future.cancel()
+
+
+in_flight_requests = InFlightRequests()
@@ -0,0 +1,142 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from app.models import User
+from app.services.leaderboard_service import LeaderboardService
+from app.services.xp_service import XPService, period_start
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+import itertools
+import os
+import threading
+import time
+
+# Maximum age of a cached leaderboard (XP awards in this worker refresh it sooner)
+LEADERBOARD_CACHE_SECONDS = float(os.getenv("LEADERBOARD_CACHE_SECONDS", "10"))
+
+# Requested limits are rounded up to one of these and the snapshot is sliced
+LIMIT_BUCKETS = (10, 50, 100, 250, 500)
+
+
+class _Snapshot:
+    __slots__ = ("rows", "generation", "computed_at")
+    
+    def __init__(self, rows: List[Dict[str, Any]], generation: int, computed_at: float):
+        self.rows = rows
+        self.generation = generation
+        self.computed_at = computed_at
+
+
+class LeaderboardCache:
+    """
+    Shared top-N leaderboard snapshots, one per leaderboard and limit bucket
+    
+    The all-time leaderboard and the current daily, weekly and monthly ones
+    are cached; ended periods are served from their frozen snapshot.
+    
+    A snapshot is fresh until it is LEADERBOARD_CACHE_SECONDS old or an XP
+    award invalidates it. Only one request per bucket recomputes at a time:
+    while it runs, other requests get the stale snapshot, or wait for the
+    result if there is none yet.
+    """
+    
+    def __init__(self, ttl: float = LEADERBOARD_CACHE_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshots: Dict[Tuple, _Snapshot] = {}
+        self._inflight: Dict[Tuple, threading.Event] = {}
+        self._generation = 0
+    
+    @staticmethod
+    def bucket_for(limit: int) -> int:
+        """Smallest bucket holding `limit` entries"""
+        return next((bucket for bucket in LIMIT_BUCKETS if bucket >= limit), limit)
+    
+    def _is_fresh(self, snapshot: _Snapshot) -> bool:
+        return (
+            snapshot.generation == self._generation
+            and time.monotonic() - snapshot.computed_at < self.ttl
+        )
+    
+    def get_leaderboard(self, db: Session, limit: int = 100, period: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get leaderboard rankings, recomputing the snapshot if needed
+        
+        Args:
+            db: Session used if this request has to recompute
+            limit: Maximum number of entries to return
+            period: "daily", "weekly" or "monthly" for the current period, None for all-time
+        """
+        bucket = self.bucket_for(limit)
+        start = period_start(period, datetime.utcnow()) if period else None
+        key = (period, start, bucket)
+        
+        while True:
+            with self._lock:
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None and self._is_fresh(snapshot):
+                    return snapshot.rows[:limit]
+                
+                done = self._inflight.get(key)
+                if done is None:
+                    # This request recomputes the bucket
+                    done = self._inflight[key] = threading.Event()
+                    generation = self._generation
+                    break
+                
+                if snapshot is not None:
+                    # Stale while revalidating
+                    return snapshot.rows[:limit]
+            
+            # Cold miss: wait for the in-flight computation instead of repeating it
+            done.wait()
+        
+        try:
+            if period is None:
+                rows = LeaderboardService(db).get_leaderboard(limit=bucket)
+            else:
+                rows = XPService(db).get_live_leaderboard(period, start, limit=bucket)
+            
+            with self._lock:
+                # Drop snapshots of periods that have ended
+                for stale_key in [k for k in self._snapshots if k[0] == period and k[1] != start]:
+                    del self._snapshots[stale_key]
+                # Tagged with the generation seen before computing, so an award
+                # committed meanwhile leaves the snapshot stale
+                self._snapshots[key] = _Snapshot(rows, generation, time.monotonic())
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            done.set()
+        
+        return rows[:limit]
+    
+    def invalidate(self):
+        """Mark all snapshots stale (they are still served while being recomputed)"""
+        with self._lock:
+            self._generation += 1
+
+
+leaderboard_cache = LeaderboardCache()
+
+
+@event.listens_for(Session, "before_flush")
+def _detect_xp_change(session, flush_context, instances):
+    """Note XP awards and new users, which can change the rankings"""
+    if session.info.get("leaderboard_changed"):
+        return
+    
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, User) and (obj in session.new or inspect(obj).attrs.xp.history.has_changes()):
+            session.info["leaderboard_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_leaderboard(session):
+    if session.info.pop("leaderboard_changed", False):
+        leaderboard_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_leaderboard_change(session):
+    session.info.pop("leaderboard_changed", None)
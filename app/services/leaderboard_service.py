@@ -1,46 +1,67 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.models import User, Submission
-from typing import List, Dict, Any, Optional
+from sqlalchemy import func, and_, or_
+from app.models import User
+from app.monitoring import trace_methods
+from typing import List, Dict, Any, Optional, Sequence
 
 
+@trace_methods
 class LeaderboardService:
     """Service for managing leaderboard"""
     
     def __init__(self, db: Session):
         self.db = db
     
-    def get_leaderboard(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_leaderboard(self, limit: int = 100, after: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
         """
-        Get leaderboard rankings
+        Get leaderboard rankings, ordered by XP, completed quests, then user ID
+        
+        Pages are fetched by seeking past the last entry of the previous page
+        (keyset pagination), so deep pages cost the same as the first one.
         
         Args:
             limit: Maximum number of entries to return
-            
+            after: (xp, completed_quests, user_id, rank) of the last entry on the previous page
+        
         Returns:
-            List of leaderboard entries with rank, username, xp, level, completed quests
+            List of leaderboard entries with rank, user ID, username, xp, level, completed quests
         """
-        # Get users with their completed quest counts
-        leaderboard_query = (
-            self.db.query(
-                User.id,
-                User.username,
-                User.xp,
-                User.level,
-                func.count(func.distinct(Submission.quest_id)).label('completed_quests')
+        # Every sort key is a users column, so ix_users_leaderboard serves the order without a sort
+        query = self.db.query(
+            User.id,
+            User.username,
+            User.xp,
+            User.level,
+            User.completed_quests
+        )
+        
+        start_rank = 1
+        if after is not None:
+            xp, completed, user_id, rank = after
+            query = query.filter(
+                # Sargable leading bound: the index scan starts at the cursor's xp
+                User.xp <= xp,
+                or_(
+                    User.xp < xp,
+                    User.completed_quests < completed,
+                    and_(User.completed_quests == completed, User.id > user_id),
+                ),
             )
-            .outerjoin(Submission, (Submission.user_id == User.id) & (Submission.passed == True))
-            .group_by(User.id)
-            .order_by(desc(User.xp), desc('completed_quests'))
+            start_rank = rank + 1
+        
+        leaderboard_query = (
+            query
+            .order_by(User.xp.desc(), User.completed_quests.desc(), User.id)
             .limit(limit)
             .all()
         )
         
         # Format results with rankings
         leaderboard = []
-        for rank, entry in enumerate(leaderboard_query, start=1):
+        for rank, entry in enumerate(leaderboard_query, start=start_rank):
             leaderboard.append({
                 "rank": rank,
+                "user_id": entry.id,
                 "username": entry.username,
                 "xp": entry.xp,
                 "level": entry.level,
@@ -53,20 +74,34 @@ class LeaderboardService:
         """
         Get a user's rank on the leaderboard
         
+        Ranks follow get_leaderboard's ordering (XP, completed quests, then
+        user ID), so tied users get the rank the list shows them at.
+        
         Args:
             user_id: User ID
-            
+        
         Returns:
             User's rank (1-indexed) or None if user not found
         """
-        user = self.db.query(User).filter(User.id == user_id).first()
+        user = (
+            self.db.query(User.xp, User.completed_quests)
+            .filter(User.id == user_id)
+            .first()
+        )
         if not user:
             return None
         
-        # Count users with higher XP
+        # Count users ahead in the leaderboard ordering
         higher_ranked_count = (
             self.db.query(func.count(User.id))
-            .filter(User.xp > user.xp)
+            .filter(
+                User.xp >= user.xp,
+                or_(
+                    User.xp > user.xp,
+                    User.completed_quests > user.completed_quests,
+                    and_(User.completed_quests == user.completed_quests, User.id < user_id),
+                ),
+            )
             .scalar()
         )
         
@@ -79,7 +114,7 @@ class LeaderboardService:
         Args:
             user_id: User ID
             context_size: Number of entries to show above and below user
-            
+        
         Returns:
             Dict with full leaderboard and user's position
         """
@@ -0,0 +1,166 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, select, delete, update, and_, or_
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+from app.database import dialect_insert
+from app.models import Submission, User, UserProgress
+from app.monitoring import trace_methods
+from app.services.retention_service import submission_history
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+
+# Scores counted as perfect (allows for floating point precision)
+PERFECT_SCORE = 0.99
+
+EMPTY_PROGRESS = {"completed_quests": 0, "attempts": 0, "perfect_scores": 0, "last_passed_at": None}
+
+
+def _progress_from_submissions(history: Optional[Select] = None):
+    """Per-user counters aggregated from all submissions (archived ones included), as user_progress columns"""
+    history = (submission_history() if history is None else history).subquery()
+    return (
+        select(
+            history.c.user_id,
+            func.count(func.distinct(case((history.c.passed == True, history.c.quest_id)))).label("completed_quests"),
+            func.count(history.c.id).label("attempts"),
+            func.sum(case((and_(history.c.passed == True, history.c.score >= PERFECT_SCORE), 1), else_=0)).label("perfect_scores"),
+            func.max(case((history.c.passed == True, history.c.submission_date))).label("last_passed_at"),
+        )
+        .group_by(history.c.user_id)
+    )
+
+
+def rebuild_user_progress(connection: Connection, history: Optional[Select] = None) -> int:
+    """
+    Recompute every user's counters from submissions in one set-based statement
+    
+    Migrations pass `history`, a select of the submission columns that
+    existed at their version.
+    
+    Returns:
+        Number of user_progress rows written
+    """
+    connection.execute(delete(UserProgress))
+    result = connection.execute(
+        UserProgress.__table__.insert().from_select(
+            ["user_id", "completed_quests", "attempts", "perfect_scores", "last_passed_at"],
+            _progress_from_submissions(history)
+        )
+    )
+    return result.rowcount
+
+
+def sync_user_completed_quests(connection: Connection) -> int:
+    """
+    Copy user_progress.completed_quests to users (the leaderboard tie-break)
+    
+    Returns:
+        Number of users updated
+    """
+    completed = (
+        select(UserProgress.completed_quests)
+        .where(UserProgress.user_id == User.id)
+        .scalar_subquery()
+    )
+    result = connection.execute(
+        update(User)
+        .values(completed_quests=func.coalesce(completed, 0))
+        .where(func.coalesce(User.completed_quests, -1) != func.coalesce(completed, 0))
+    )
+    return result.rowcount
+
+
+def find_inconsistent_progress(connection: Connection, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Users whose stored counters differ from the counts in submissions
+    
+    Returns:
+        Up to `limit` rows with the user ID and the stored and expected counters
+    """
+    expected = _progress_from_submissions().subquery()
+    
+    rows = connection.execute(
+        select(
+            expected.c.user_id,
+            UserProgress.completed_quests, expected.c.completed_quests.label("expected_completed_quests"),
+            UserProgress.attempts, expected.c.attempts.label("expected_attempts"),
+            UserProgress.perfect_scores, expected.c.perfect_scores.label("expected_perfect_scores"),
+            User.completed_quests.label("leaderboard_completed_quests"),
+        )
+        .outerjoin(UserProgress, UserProgress.user_id == expected.c.user_id)
+        .join(User, User.id == expected.c.user_id)
+        .where(or_(
+            UserProgress.user_id.is_(None),
+            UserProgress.completed_quests != expected.c.completed_quests,
+            func.coalesce(User.completed_quests, -1) != expected.c.completed_quests,
+            UserProgress.attempts != expected.c.attempts,
+            UserProgress.perfect_scores != expected.c.perfect_scores,
+        ))
+        .limit(limit)
+    )
+    
+    return [dict(row._mapping) for row in rows]
+
+
+@trace_methods
+class ProgressService:
+    """Service for per-user progress counters"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_progress(self, user_id: int) -> Dict[str, Any]:
+        """Completed quests, attempts, perfect scores and last pass time (one row read)"""
+        progress = self.db.query(UserProgress).filter(UserProgress.user_id == user_id).first()
+        if not progress:
+            return dict(EMPTY_PROGRESS)
+        
+        return {
+            "completed_quests": progress.completed_quests,
+            "attempts": progress.attempts,
+            "perfect_scores": progress.perfect_scores,
+            "last_passed_at": progress.last_passed_at,
+        }
+    
+    def record_submission(self, submission: Submission, first_pass: bool):
+        """
+        Add a submission to the user's counters (atomic upsert in the caller's transaction)
+        
+        A first pass also increments users.completed_quests, the leaderboard's copy.
+        
+        Args:
+            submission: The new, flushed submission
+            first_pass: True if this is the user's first pass of the quest
+        """
+        passed = bool(submission.passed)
+        perfect = passed and (submission.score or 0.0) >= PERFECT_SCORE
+        passed_at = (submission.submission_date or datetime.utcnow()) if passed else None
+        
+        insert = dialect_insert(self.db.get_bind())
+        statement = insert(UserProgress).values(
+            user_id=submission.user_id,
+            completed_quests=int(first_pass),
+            attempts=1,
+            perfect_scores=int(perfect),
+            last_passed_at=passed_at,
+            updated_at=datetime.utcnow(),
+        )
+        excluded = statement.excluded
+        
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "completed_quests": UserProgress.completed_quests + excluded.completed_quests,
+                "attempts": UserProgress.attempts + 1,
+                "perfect_scores": UserProgress.perfect_scores + excluded.perfect_scores,
+                "last_passed_at": func.coalesce(excluded.last_passed_at, UserProgress.last_passed_at),
+                "updated_at": excluded.updated_at,
+            }
+        ))
+        
+        if first_pass:
+            self.db.execute(
+                update(User)
+                .where(User.id == submission.user_id)
+                .values(completed_quests=func.coalesce(User.completed_quests, 0) + 1)
+            )
@@ -1,18 +1,176 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models import Quest, Submission, User, Level
-from app.ml_engine import MLEvaluator
-from typing import List, Optional, Dict, Any
+from sqlalchemy import func, case, and_, or_, select, update, delete, bindparam
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+from app.database import dialect_insert
+from app.models import Quest, Submission, User, Level, BestSubmission
+from app.monitoring import trace_methods
+from app.services.xp_service import XPService
+from app.services.progress_service import ProgressService
+from app.services.retention_service import submission_history
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+import math
 import os
+import re
 import shutil
+import time
 
+# Free-text evaluation logs written before metrics were stored as JSON
+_LEGACY_METRIC = re.compile(r"^Metric: (\w+)\s*$", re.MULTILINE)
+_LEGACY_SCORE = re.compile(r"^Score: (\S+)", re.MULTILINE)
+_LEGACY_ADDITIONAL = re.compile(r"'(\w+)': (?:np\.float64\()?([-+.\w]+)")
 
+SUBMISSION_SUMMARY_COLUMNS = (
+    Submission.id, Submission.quest_id, Submission.score, Submission.passed,
+    Submission.xp_awarded, Submission.submission_date,
+)
+SUBMISSION_DETAIL_COLUMNS = SUBMISSION_SUMMARY_COLUMNS + (
+    Submission.evaluation_logs, Submission.evaluation_ms, Submission.metrics, Submission.stage_timings,
+)
+
+
+def rebuild_best_submissions(connection: Connection, history: Optional[Select] = None):
+    """
+    Recompute the best_submission table from all submissions, archived ones included (set-based)
+    
+    Migrations pass `history`, a select of the submission columns that
+    existed at their version (see submission_history for the columns used).
+    """
+    connection.execute(delete(BestSubmission))
+    history = (submission_history() if history is None else history).subquery()
+    
+    connection.execute(
+        BestSubmission.__table__.insert().from_select(
+            ["user_id", "quest_id", "score", "passed", "attempts"],
+            select(
+                history.c.user_id,
+                history.c.quest_id,
+                func.max(history.c.score),
+                func.max(case((history.c.passed == True, 1), else_=0)) == 1,
+                func.count(history.c.id),
+            ).group_by(history.c.user_id, history.c.quest_id)
+        )
+    )
+    
+    # Earliest submission reaching the best score
+    best_id = (
+        select(history.c.id)
+        .where(
+            history.c.user_id == BestSubmission.user_id,
+            history.c.quest_id == BestSubmission.quest_id,
+            history.c.score == BestSubmission.score,
+        )
+        .order_by(history.c.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    connection.execute(update(BestSubmission).values(submission_id=best_id))
+    connection.execute(
+        update(BestSubmission).values(
+            submitted_at=select(history.c.submission_date)
+            .where(history.c.id == BestSubmission.submission_id)
+            .scalar_subquery()
+        )
+    )
+
+
+def _legacy_float(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_legacy_logs(logs: str) -> Optional[Dict[str, Optional[float]]]:
+    """
+    Metrics from a `Metric: ...\\nScore: ...\\nAdditional metrics: {...}` log
+    
+    Returns:
+        {name: value}, or None if the log is not in that format
+    """
+    metric, score = _LEGACY_METRIC.search(logs), _LEGACY_SCORE.search(logs)
+    if not (metric and score):
+        return None
+    
+    metrics = {}
+    _, _, additional = logs.partition("Additional metrics:")
+    for name, value in _LEGACY_ADDITIONAL.findall(additional):
+        metrics[name] = _legacy_float(value)
+    # `Score:` was rounded to 4 decimals; the additional metrics kept full precision
+    if metrics.get(metric.group(1)) is None:
+        metrics[metric.group(1)] = _legacy_float(score.group(1))
+    return metrics
+
+
+def backfill_submission_metrics(connection: Connection, batch_size: int = 10000) -> int:
+    """
+    Move metrics out of legacy free-text logs into the metrics column
+    
+    Successful evaluations' logs only repeated the metrics, so they are
+    cleared; failure messages are kept. Runs in id-ordered batches.
+    
+    Returns:
+        Number of submissions converted
+    """
+    table = Submission.__table__
+    statement = (
+        table.update()
+        .where(table.c.id == bindparam("submission_id"))
+        .values(metrics=bindparam("parsed_metrics"), evaluation_logs=None)
+    )
+    
+    last_id, converted = 0, 0
+    while True:
+        rows = connection.execute(
+            select(Submission.id, Submission.evaluation_logs)
+            .where(
+                Submission.id > last_id,
+                Submission.metrics.is_(None),
+                Submission.evaluation_logs.like("Metric:%"),
+            )
+            .order_by(Submission.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return converted
+        last_id = rows[-1].id
+        
+        params = []
+        for submission_id, logs in rows:
+            metrics = parse_legacy_logs(logs)
+            if metrics is not None:
+                params.append({"submission_id": submission_id, "parsed_metrics": metrics})
+        if params:
+            connection.execute(statement, params)
+            converted += len(params)
+
+
+@trace_methods
 class QuestService:
     """Service for managing quests and submissions"""
     
     def __init__(self, db: Session):
         self.db = db
-        self.evaluator = MLEvaluator()
+        self._evaluator = None
+    
+    @property
+    def evaluator(self):
+        """
+        Evaluation engine, created on first use so the ML stack is only imported when needed
+        
+        Models are evaluated in a resource-limited child process unless
+        EVALUATION_SANDBOX=0.
+        """
+        if self._evaluator is None:
+            from app.ml_engine.sandbox import EVALUATION_SANDBOX, SandboxedEvaluator
+            if EVALUATION_SANDBOX:
+                self._evaluator = SandboxedEvaluator()
+            else:
+                from app.ml_engine import MLEvaluator
+                self._evaluator = MLEvaluator()
+        return self._evaluator
     
     def get_all_quests(self) -> List[Quest]:
         """Get all quests ordered by level and quest order"""
@@ -22,25 +180,182 @@ class QuestService:
         """Get a specific quest by ID"""
         return self.db.query(Quest).filter(Quest.id == quest_id).first()
     
+    def get_quest_rows(self, quest_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get quests joined with their level as plain dicts (no ORM objects)
+        
+        Args:
+            quest_id: Only return this quest
+        
+        Returns:
+            Quest dicts with a nested "level" dict, ordered by level and quest order
+        """
+        query = (
+            self.db.query(
+                Quest.id, Quest.title, Quest.description, Quest.task_type,
+                Quest.xp_reward, Quest.metric_name, Quest.threshold,
+                Quest.level_id, Quest.order, Quest.dataset_name,
+                Level.name.label("level_name"),
+                Level.description.label("level_description"),
+                Level.order.label("level_order"),
+                Level.required_xp.label("level_required_xp"),
+            )
+            .join(Level)
+        )
+        
+        if quest_id is not None:
+            query = query.filter(Quest.id == quest_id)
+        
+        return [
+            {
+                "id": row.id,
+                "title": row.title,
+                "description": row.description,
+                "task_type": row.task_type,
+                "xp_reward": row.xp_reward,
+                "metric_name": row.metric_name,
+                "threshold": row.threshold,
+                "level_id": row.level_id,
+                "order": row.order,
+                "dataset_name": row.dataset_name,
+                "level": {
+                    "id": row.level_id,
+                    "name": row.level_name,
+                    "description": row.level_description,
+                    "order": row.level_order,
+                    "required_xp": row.level_required_xp,
+                },
+            }
+            for row in query.order_by(Level.order, Quest.order).all()
+        ]
+    
+    def get_user_quest_overlay(self, user_id: int, quest_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Get completion status, best score and attempts for all of a user's quests
+        
+        Returns:
+            Dict keyed by quest ID; quests the user never attempted are absent
+        """
+        query = (
+            self.db.query(
+                BestSubmission.quest_id,
+                BestSubmission.passed,
+                BestSubmission.score,
+                BestSubmission.attempts,
+            )
+            .filter(BestSubmission.user_id == user_id)
+        )
+        
+        if quest_id is not None:
+            query = query.filter(BestSubmission.quest_id == quest_id)
+        
+        return {
+            row.quest_id: {
+                "completed": row.passed,
+                "best_score": row.score,
+                "attempts": row.attempts,
+            }
+            for row in query.all()
+        }
+    
     def get_user_quest_status(self, user_id: int, quest_id: int) -> Dict[str, Any]:
         """Check if user has completed a quest and get best score"""
-        submissions = (
-            self.db.query(Submission)
-            .filter(Submission.user_id == user_id, Submission.quest_id == quest_id)
+        status = self.get_user_quest_overlay(user_id, quest_id).get(quest_id)
+        return status or {"completed": False, "best_score": None, "attempts": 0}
+    
+    def get_quest_leaderboard(self, quest_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Rank users by their best score on a quest (earliest submission wins ties)
+        
+        Reads the top of the best_submission ranking index.
+        """
+        rows = (
+            self.db.query(
+                BestSubmission.user_id,
+                User.username,
+                BestSubmission.score,
+                BestSubmission.submitted_at,
+                BestSubmission.attempts,
+            )
+            .join(User, User.id == BestSubmission.user_id)
+            .filter(BestSubmission.quest_id == quest_id, BestSubmission.score.isnot(None))
+            .order_by(BestSubmission.score.desc(), BestSubmission.submitted_at, BestSubmission.user_id)
+            .limit(limit)
             .all()
         )
         
-        if not submissions:
-            return {"completed": False, "best_score": None, "attempts": 0}
+        return [{"rank": rank, **row._asdict()} for rank, row in enumerate(rows, start=1)]
+    
+    def get_user_quest_rank(self, user_id: int, quest_id: int) -> Optional[int]:
+        """
+        User's position on the quest leaderboard, or None without a scored attempt
         
-        passed_submissions = [s for s in submissions if s.passed]
-        best_score = max([s.score for s in submissions if s.score is not None], default=None)
+        Counts the entries sorting before the user's under the leaderboard's own
+        order (score desc, submitted_at, user_id), so tied users get distinct
+        ranks that match their positions in get_quest_leaderboard.
+        """
+        best = (
+            self.db.query(BestSubmission.score, BestSubmission.submitted_at)
+            .filter(BestSubmission.user_id == user_id, BestSubmission.quest_id == quest_id)
+            .first()
+        )
+        if best is None or best.score is None:
+            return None
         
-        return {
-            "completed": len(passed_submissions) > 0,
-            "best_score": best_score,
-            "attempts": len(submissions)
-        }
+        tied = BestSubmission.score == best.score
+        if best.submitted_at is None:
+            # Only rows without submission_date; sorted after dated ties, as on PostgreSQL
+            ahead_of_tie = or_(
+                BestSubmission.submitted_at.isnot(None),
+                BestSubmission.user_id < user_id,
+            )
+        else:
+            ahead_of_tie = or_(
+                BestSubmission.submitted_at < best.submitted_at,
+                and_(BestSubmission.submitted_at == best.submitted_at, BestSubmission.user_id < user_id),
+            )
+        
+        ranked_before_count = (
+            self.db.query(func.count())
+            .select_from(BestSubmission)
+            .filter(
+                BestSubmission.quest_id == quest_id,
+                BestSubmission.score >= best.score,
+                or_(BestSubmission.score > best.score, and_(tied, ahead_of_tie)),
+            )
+            .scalar()
+        )
+        
+        return ranked_before_count + 1
+    
+    def _record_best_submission(self, submission: Submission):
+        """Upsert the user's best attempt on the quest (atomic, in the caller's transaction)"""
+        insert = dialect_insert(self.db.get_bind())
+        statement = insert(BestSubmission).values(
+            user_id=submission.user_id,
+            quest_id=submission.quest_id,
+            score=submission.score,
+            submission_id=submission.id,
+            submitted_at=submission.submission_date,
+            passed=submission.passed,
+            attempts=1,
+        )
+        excluded = statement.excluded
+        improved = or_(
+            BestSubmission.score.is_(None),
+            and_(excluded.score.isnot(None), excluded.score > BestSubmission.score),
+        )
+        
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=["user_id", "quest_id"],
+            set_={
+                "score": case((improved, excluded.score), else_=BestSubmission.score),
+                "submission_id": case((improved, excluded.submission_id), else_=BestSubmission.submission_id),
+                "submitted_at": case((improved, excluded.submitted_at), else_=BestSubmission.submitted_at),
+                "passed": or_(BestSubmission.passed, excluded.passed),
+                "attempts": BestSubmission.attempts + 1,
+            }
+        ))
     
     def submit_quest(
         self, 
@@ -57,7 +372,7 @@ class QuestService:
             quest_id: Quest ID
             model_file: Uploaded model file
             upload_dir: Directory to save uploaded models
-            
+        
         Returns:
             Submission object with evaluation results
         """
@@ -80,15 +395,18 @@ class QuestService:
             shutil.copyfileobj(model_file.file, buffer)
         
         # Evaluate model
+        started = time.perf_counter()
         evaluation_result = self.evaluator.evaluate_model(
             model_path=model_path,
             dataset_name=quest.dataset_name,
             metric_name=quest.metric_name,
             config=quest.config or {}
         )
+        evaluation_ms = int((time.perf_counter() - started) * 1000)
         
         # Check if passed
         passed = False
+        first_pass = False
         xp_awarded = 0
         
         if evaluation_result["success"]:
@@ -97,22 +415,11 @@ class QuestService:
             
             if passed:
                 # Check if this is the first time passing
-                previous_passed = (
-                    self.db.query(Submission)
-                    .filter(
-                        Submission.user_id == user_id,
-                        Submission.quest_id == quest_id,
-                        Submission.passed == True
-                    )
-                    .first()
-                )
+                first_pass = not self.get_user_quest_status(user_id, quest_id)["completed"]
                 
-                if not previous_passed:
+                if first_pass:
                     # Award XP only on first completion
                     xp_awarded = quest.xp_reward
-                    user.add_xp(xp_awarded)
-                    user.update_streak()
-                    self.db.commit()
         
         # Create submission record
         submission = Submission(
@@ -121,11 +428,23 @@ class QuestService:
             model_path=model_path,
             score=evaluation_result.get("score", 0.0),
             passed=passed,
-            evaluation_logs=evaluation_result.get("logs", ""),
+            evaluation_logs=evaluation_result.get("logs"),
+            evaluation_ms=evaluation_ms,
+            metrics=evaluation_result.get("metrics"),
+            stage_timings=evaluation_result.get("stage_timings"),
             xp_awarded=xp_awarded
         )
         
         self.db.add(submission)
+        self.db.flush()
+        self._record_best_submission(submission)
+        ProgressService(self.db).record_submission(submission, first_pass)
+        
+        if xp_awarded:
+            # Same transaction as the submission, so the XP log never diverges from it
+            XPService(self.db).award_xp(user, xp_awarded, quest_id=quest_id, submission_id=submission.id)
+            user.update_streak()
+        
         self.db.commit()
         self.db.refresh(submission)
         
@@ -140,10 +459,41 @@ class QuestService:
         
         return query.order_by(Submission.submission_date.desc()).all()
     
+    def get_user_submission_rows(
+        self,
+        user_id: int,
+        quest_id: Optional[int] = None,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, int]] = None,
+        detail: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a page of user's submissions (newest first) as dicts shaped like
+        SubmissionSummary, or SubmissionResponse with `detail`
+        
+        Args:
+            user_id: User ID
+            quest_id: Only this quest's submissions
+            limit: Page size
+            after: (submission_date, id) of the last submission on the previous page
+            detail: Include logs, metrics and timings
+        """
+        columns = SUBMISSION_DETAIL_COLUMNS if detail else SUBMISSION_SUMMARY_COLUMNS
+        query = self.db.query(*columns).filter(Submission.user_id == user_id)
+        
+        if quest_id:
+            query = query.filter(Submission.quest_id == quest_id)
+        
+        if after is not None:
+            submission_date, submission_id = after
+            query = query.filter(or_(
+                Submission.submission_date < submission_date,
+                and_(Submission.submission_date == submission_date, Submission.id < submission_id),
+            ))
+        
+        query = query.order_by(Submission.submission_date.desc(), Submission.id.desc()).limit(limit)
+        return [row._asdict() for row in query.all()]
+    
     def get_quest_completion_count(self, user_id: int) -> int:
         """Get number of unique quests completed by user"""
-        return (
-            self.db.query(func.count(func.distinct(Submission.quest_id)))
-            .filter(Submission.user_id == user_id, Submission.passed == True)
-            .scalar()
-        )
\ No newline at end of file
+        return ProgressService(self.db).get_progress(user_id)["completed_quests"]
\ No newline at end of file
@@ -0,0 +1,246 @@
+from sqlalchemy import func, select, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import Select
+from app.models import User, Submission, SubmissionArchive, BestSubmission
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import os
+import time
+import zlib
+import orjson
+
+# Submissions kept per user and quest besides the best one
+RETENTION_KEEP_LATEST = int(os.getenv("RETENTION_KEEP_LATEST", "5"))
+
+# Submissions and upload files younger than this are never touched
+RETENTION_MIN_AGE_DAYS = float(os.getenv("RETENTION_MIN_AGE_DAYS", "30"))
+
+# Users whose submissions are archived per transaction
+RETENTION_BATCH_USERS = 500
+
+# Ids per DELETE ... WHERE id IN (...) statement
+DELETE_CHUNK_IDS = 1000
+
+UPLOAD_DIR = "./uploads"
+
+# Stored in the compressed archive payload rather than as columns
+PAYLOAD_COLUMNS = ("model_path", "evaluation_logs", "metrics", "stage_timings")
+
+
+def submission_history() -> Select:
+    """
+    Every submission, hot or archived, with the columns aggregates are computed from
+    
+    Use `.subquery()` wherever counts must include archived attempts
+    (rebuilding best_submission and user_progress, analytics). Migrations
+    cannot use it: it needs submission_archive (migration 10) and
+    evaluation_ms (migration 7).
+    """
+    return union_all(
+        select(
+            Submission.id, Submission.user_id, Submission.quest_id, Submission.submission_date,
+            Submission.score, Submission.passed, Submission.evaluation_ms,
+        ),
+        select(
+            SubmissionArchive.id, SubmissionArchive.user_id, SubmissionArchive.quest_id,
+            SubmissionArchive.submission_date, SubmissionArchive.score, SubmissionArchive.passed,
+            SubmissionArchive.evaluation_ms,
+        ),
+    )
+
+
+def pack_payload(row: Dict[str, Any]) -> bytes:
+    return zlib.compress(orjson.dumps({column: row[column] for column in PAYLOAD_COLUMNS}))
+
+
+def unpack_payload(payload: bytes) -> Dict[str, Any]:
+    """model_path, evaluation_logs, metrics and stage_timings of an archived submission"""
+    return orjson.loads(zlib.decompress(payload))
+
+
+def _archive_candidates(first_user_id: int, last_user_id: int, keep_latest: int, cutoff: datetime) -> Select:
+    """
+    Submissions of a user id range that the retention policy lets go
+    
+    Kept: each user's latest `keep_latest` per quest, the best submission
+    (referenced by best_submission), submissions that awarded XP (referenced
+    by xp_events) and anything submitted after `cutoff`.
+    """
+    recency = (
+        select(
+            Submission.id,
+            func.row_number().over(
+                partition_by=(Submission.user_id, Submission.quest_id),
+                order_by=(Submission.submission_date.desc(), Submission.id.desc()),
+            ).label("recency"),
+        )
+        .where(Submission.user_id.between(first_user_id, last_user_id))
+        .subquery()
+    )
+    
+    return (
+        select(*Submission.__table__.columns)
+        .join(recency, recency.c.id == Submission.id)
+        .outerjoin(BestSubmission, BestSubmission.submission_id == Submission.id)
+        .where(
+            recency.c.recency > keep_latest,
+            BestSubmission.submission_id.is_(None),
+            func.coalesce(Submission.xp_awarded, 0) == 0,
+            Submission.submission_date < cutoff,
+        )
+        .order_by(Submission.id)
+    )
+
+
+def archive_user_batch(
+    connection: Connection,
+    first_user_id: int,
+    last_user_id: int,
+    keep_latest: int,
+    cutoff: datetime,
+    dry_run: bool = False
+) -> Tuple[int, Set[str]]:
+    """
+    Move a user id range's expendable submissions to submission_archive
+    
+    Returns:
+        Number of submissions archived and the model paths they referenced
+    """
+    rows = [
+        dict(row._mapping)
+        for row in connection.execute(_archive_candidates(first_user_id, last_user_id, keep_latest, cutoff))
+    ]
+    if not rows or dry_run:
+        return len(rows), set()
+    
+    now = datetime.utcnow()
+    connection.execute(SubmissionArchive.__table__.insert(), [
+        {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "quest_id": row["quest_id"],
+            "submission_date": row["submission_date"],
+            "score": row["score"],
+            "passed": bool(row["passed"]),
+            "xp_awarded": row["xp_awarded"] or 0,
+            "evaluation_ms": row["evaluation_ms"],
+            "payload": pack_payload(row),
+            "archived_at": now,
+        }
+        for row in rows
+    ])
+    
+    ids = [row["id"] for row in rows]
+    for start in range(0, len(ids), DELETE_CHUNK_IDS):
+        connection.execute(Submission.__table__.delete().where(Submission.id.in_(ids[start:start + DELETE_CHUNK_IDS])))
+    
+    return len(rows), {row["model_path"] for row in rows if row["model_path"]}
+
+
+def delete_unreferenced_uploads(connection: Connection, paths: Iterable[str], cutoff: datetime) -> int:
+    """
+    Delete upload files no submission references any more
+    
+    Files modified after `cutoff` are left alone: their name may have just
+    been reused by a new upload of the same user, quest and file name.
+    
+    Returns:
+        Number of files deleted
+    """
+    paths = list(paths)
+    deleted = 0
+    for start in range(0, len(paths), DELETE_CHUNK_IDS):
+        chunk = paths[start:start + DELETE_CHUNK_IDS]
+        referenced = set(connection.execute(
+            select(Submission.model_path).where(Submission.model_path.in_(chunk)).distinct()
+        ).scalars())
+        
+        for path in chunk:
+            if path in referenced:
+                continue
+            try:
+                if datetime.utcfromtimestamp(os.stat(path).st_mtime) >= cutoff:
+                    continue
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    
+    return deleted
+
+
+def iter_upload_batches(upload_dir: str = UPLOAD_DIR, batch_size: int = DELETE_CHUNK_IDS) -> Iterable[List[str]]:
+    """Upload file paths, as stored in Submission.model_path, in batches"""
+    if not os.path.isdir(upload_dir):
+        return
+    
+    batch = []
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                batch.append(os.path.join(upload_dir, entry.name))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def run_retention(
+    engine: Engine,
+    keep_latest: int = RETENTION_KEEP_LATEST,
+    min_age_days: float = RETENTION_MIN_AGE_DAYS,
+    batch_users: int = RETENTION_BATCH_USERS,
+    pause_seconds: float = 0.0,
+    sweep_uploads: bool = True,
+    dry_run: bool = False,
+    max_batches: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Archive old submissions and delete unreferenced upload files
+    
+    Users are processed in id order, `batch_users` per transaction, so
+    locks are short and an interrupted run simply resumes on the next one.
+    Best submissions, XP-awarding submissions and each user's latest
+    `keep_latest` per quest stay in `submissions`; best_submission,
+    user_progress and XP are not changed.
+    
+    With `sweep_uploads`, also deletes files in the upload directory that
+    no submission references (e.g. from failed requests).
+    
+    Returns:
+        Counts of archived submissions and deleted files
+    """
+    cutoff = datetime.utcnow() - timedelta(days=min_age_days)
+    stats = {"batches": 0, "archived": 0, "files_deleted": 0, "dry_run": dry_run}
+    
+    last_user_id = 0
+    while max_batches is None or stats["batches"] < max_batches:
+        with engine.connect() as connection:
+            user_ids = connection.execute(
+                select(User.id).where(User.id > last_user_id).order_by(User.id).limit(batch_users)
+            ).scalars().all()
+        if not user_ids:
+            break
+        
+        with engine.begin() as connection:
+            archived, paths = archive_user_batch(
+                connection, user_ids[0], user_ids[-1], keep_latest, cutoff, dry_run=dry_run
+            )
+        if paths:
+            with engine.connect() as connection:
+                stats["files_deleted"] += delete_unreferenced_uploads(connection, paths, cutoff)
+        
+        stats["batches"] += 1
+        stats["archived"] += archived
+        last_user_id = user_ids[-1]
+        
+        if pause_seconds:
+            time.sleep(pause_seconds)
+    
+    if sweep_uploads and not dry_run:
+        for paths in iter_upload_batches():
+            with engine.connect() as connection:
+                stats["files_deleted"] += delete_unreferenced_uploads(connection, paths, cutoff)
+    
+    return stats
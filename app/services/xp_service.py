@@ -0,0 +1,236 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, delete, or_, and_
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from app.database import dialect_insert
+from app.models import User, XPEvent, PeriodXP, PeriodLeaderboardSnapshot
+from app.monitoring import trace_methods
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from datetime import datetime, date, timedelta
+
+PERIODS = ("daily", "weekly", "monthly")
+
+# Entries kept when a period's leaderboard is frozen (the maximum page size)
+PERIOD_SNAPSHOT_SIZE = 500
+
+
+def period_start(period: str, when: datetime) -> date:
+    """First day of the UTC period containing `when` (weeks start on Monday)"""
+    day = when.date() if isinstance(when, datetime) else when
+    if period == "daily":
+        return day
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())
+    if period == "monthly":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def shift_period(period: str, start: date, periods: int) -> date:
+    """Start of the period `periods` after (or, if negative, before) the one starting at `start`"""
+    if period == "daily":
+        return start + timedelta(days=periods)
+    if period == "weekly":
+        return start + timedelta(weeks=periods)
+    if period == "monthly":
+        month = start.year * 12 + start.month - 1 + periods
+        return date(month // 12, month % 12 + 1, 1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def period_totals(events: Iterable[Tuple[datetime, int]]) -> Dict[Tuple[str, date], int]:
+    """Bucket (created_at, amount) events into {(period, period_start): xp}"""
+    totals: Dict[Tuple[str, date], int] = {}
+    for created_at, amount in events:
+        for period in PERIODS:
+            key = (period, period_start(period, created_at))
+            totals[key] = totals.get(key, 0) + amount
+    return totals
+
+
+def rebuild_period_xp(connection: Connection, batch_size: int = 10000) -> int:
+    """
+    Recompute all per-period XP totals from the XP event log
+    
+    Events are streamed in user order, so memory holds one user's totals
+    plus one insert batch.
+    
+    Returns:
+        Number of period rows written
+    """
+    connection.execute(delete(PeriodXP))
+    
+    events = connection.execution_options(yield_per=batch_size).execute(
+        select(XPEvent.user_id, XPEvent.created_at, XPEvent.amount)
+        .order_by(XPEvent.user_id, XPEvent.created_at)
+    )
+    
+    batch: List[Dict[str, Any]] = []
+    written = 0
+    current_user, user_events = None, []
+    
+    def flush_user():
+        for (period, start), xp in period_totals(user_events).items():
+            batch.append({"period": period, "period_start": start, "user_id": current_user, "xp": xp})
+    
+    for user_id, created_at, amount in events:
+        if user_id != current_user:
+            flush_user()
+            current_user, user_events = user_id, []
+            if len(batch) >= batch_size:
+                connection.execute(PeriodXP.__table__.insert(), batch)
+                written += len(batch)
+                batch = []
+        user_events.append((created_at, amount))
+    flush_user()
+    
+    if batch:
+        connection.execute(PeriodXP.__table__.insert(), batch)
+        written += len(batch)
+    
+    return written
+
+
+@trace_methods
+class XPService:
+    """Service for XP awards and time-windowed leaderboards"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def award_xp(
+        self,
+        user: User,
+        amount: int,
+        quest_id: Optional[int] = None,
+        submission_id: Optional[int] = None,
+        when: Optional[datetime] = None
+    ) -> XPEvent:
+        """
+        Award XP: update the user, log the event and add it to the period totals
+        
+        Everything happens in the caller's transaction; commit to apply it.
+        """
+        when = when or datetime.utcnow()
+        user.add_xp(amount)
+        
+        event = XPEvent(
+            user_id=user.id,
+            quest_id=quest_id,
+            submission_id=submission_id,
+            amount=amount,
+            created_at=when
+        )
+        self.db.add(event)
+        
+        insert = dialect_insert(self.db.get_bind())
+        statement = insert(PeriodXP).values([
+            {"period": period, "period_start": period_start(period, when), "user_id": user.id, "xp": amount}
+            for period in PERIODS
+        ])
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=["period", "period_start", "user_id"],
+            set_={"xp": PeriodXP.xp + statement.excluded.xp}
+        ))
+        
+        return event
+    
+    def get_live_leaderboard(self, period: str, start: date, limit: int = 100) -> List[Dict[str, Any]]:
+        """Top users of a period from the running totals (index range scan on period_xp)"""
+        rows = (
+            self.db.query(PeriodXP.user_id, User.username, PeriodXP.xp)
+            .join(User, User.id == PeriodXP.user_id)
+            .filter(PeriodXP.period == period, PeriodXP.period_start == start)
+            .order_by(PeriodXP.xp.desc(), PeriodXP.user_id)
+            .limit(limit)
+            .all()
+        )
+        
+        return [
+            {"rank": rank, "user_id": row.user_id, "username": row.username, "xp": row.xp}
+            for rank, row in enumerate(rows, start=1)
+        ]
+    
+    def freeze_period(self, period: str, start: date) -> bool:
+        """
+        Store the final top PERIOD_SNAPSHOT_SIZE entries of an ended period
+        
+        Returns:
+            False if the period was already frozen (or is frozen concurrently)
+        """
+        if shift_period(period, start, 1) > datetime.utcnow().date():
+            raise ValueError("Period has not ended yet")
+        
+        already_frozen = (
+            self.db.query(PeriodLeaderboardSnapshot.rank)
+            .filter(PeriodLeaderboardSnapshot.period == period, PeriodLeaderboardSnapshot.period_start == start)
+            .first()
+        )
+        if already_frozen:
+            return False
+        
+        entries = self.get_live_leaderboard(period, start, limit=PERIOD_SNAPSHOT_SIZE)
+        if not entries:
+            return False
+        
+        try:
+            self.db.execute(PeriodLeaderboardSnapshot.__table__.insert(), [
+                {"period": period, "period_start": start, "rank": entry["rank"],
+                 "user_id": entry["user_id"], "xp": entry["xp"]}
+                for entry in entries
+            ])
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return False
+        
+        return True
+    
+    def get_frozen_leaderboard(self, period: str, start: date, limit: int = 100) -> List[Dict[str, Any]]:
+        """Top users of an ended period, freezing it on first access"""
+        query = (
+            self.db.query(
+                PeriodLeaderboardSnapshot.rank,
+                PeriodLeaderboardSnapshot.user_id,
+                User.username,
+                PeriodLeaderboardSnapshot.xp
+            )
+            .join(User, User.id == PeriodLeaderboardSnapshot.user_id)
+            .filter(PeriodLeaderboardSnapshot.period == period, PeriodLeaderboardSnapshot.period_start == start)
+            .order_by(PeriodLeaderboardSnapshot.rank)
+            .limit(limit)
+        )
+        
+        rows = query.all()
+        if not rows:
+            # Frozen by this request or a concurrent one
+            self.freeze_period(period, start)
+            rows = query.all()
+        
+        return [row._asdict() for row in rows]
+    
+    def get_user_standing(self, user_id: int, period: str, start: date) -> Dict[str, Any]:
+        """User's XP and rank in a period (rank is None without XP in that period)"""
+        xp = (
+            self.db.query(PeriodXP.xp)
+            .filter(PeriodXP.period == period, PeriodXP.period_start == start, PeriodXP.user_id == user_id)
+            .scalar()
+        ) or 0
+        
+        if not xp:
+            return {"user_xp": 0, "user_rank": None}
+        
+        # Same ordering as get_live_leaderboard: ties go to the lower user id
+        higher_ranked_count = (
+            self.db.query(func.count())
+            .select_from(PeriodXP)
+            .filter(
+                PeriodXP.period == period,
+                PeriodXP.period_start == start,
+                PeriodXP.xp >= xp,
+                or_(PeriodXP.xp > xp, and_(PeriodXP.xp == xp, PeriodXP.user_id < user_id))
+            )
+            .scalar()
+        )
+        
+        return {"user_xp": xp, "user_rank": higher_ranked_count + 1}
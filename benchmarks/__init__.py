@@ -0,0 +1,6 @@
+"""
+Performance benchmarks
+
+Run a suite with `python -m benchmarks.<suite>` and compare two result files
+with `python -m benchmarks.compare baseline.json current.json`.
+"""
@@ -0,0 +1,154 @@
+"""
+Micro-benchmarks for MLEvaluator
+
+Covers load_dataset, load_model for every sample model produced by
+train_sample_models.py, evaluate_model end to end and the metric functions,
+over datasets scaled from 1k rows upwards.
+
+Usage:
+    python generate_datasets.py && python train_sample_models.py
+    python -m benchmarks.bench_evaluator --sizes 1000,100000,10000000
+"""
+import argparse
+import os
+import numpy as np
+from app.ml_engine import MLEvaluator
+from benchmarks.harness import BenchmarkResults, measure
+from generate_datasets import write_dataset
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+
+# Dataset families with the quest configuration and sample models that use them
+FAMILIES = {
+    "housing": {
+        "config": {"target_column": "price", "test_size": 0.2, "random_state": 42},
+        "metric": "r2_score",
+        "models": ["housing_linear_regression", "housing_random_forest"],
+    },
+    "churn": {
+        "config": {"target_column": "churn", "test_size": 0.2, "random_state": 42},
+        "metric": "accuracy",
+        "models": ["churn_logistic_regression", "churn_random_forest"],
+    },
+    "iris": {
+        "config": {"target_column": "species", "test_size": 0.2, "random_state": 42},
+        "metric": "f1_score",
+        "models": ["iris_random_forest"],
+    },
+}
+
+CLASSIFICATION_METRICS = ["accuracy", "f1_score", "precision", "recall"]
+REGRESSION_METRICS = ["r2_score", "mse"]
+
+
+def ensure_dataset(work_dir: str, family: str, n_rows: int) -> str:
+    """Generate (once) a scaled copy of a dataset family and return its file name"""
+    dataset_name = f"{family}_{n_rows}.csv"
+    path = os.path.join(work_dir, dataset_name)
+    
+    if not os.path.exists(path):
+        print(f"  generating {dataset_name}...")
+        write_dataset(family, path, n_rows)
+    
+    return dataset_name
+
+
+def bench_load_model(results: BenchmarkResults, evaluator: MLEvaluator, models_dir: str, rounds: int):
+    print("\nload_model")
+    for family in FAMILIES.values():
+        for model_name in family["models"]:
+            model_path = os.path.join(models_dir, f"{model_name}.pkl")
+            stats = measure(lambda: evaluator.load_model(model_path), rounds=rounds)
+            results.add(f"load_model[{model_name}]", stats, bytes=os.path.getsize(model_path))
+
+
+def bench_load_dataset(results: BenchmarkResults, evaluator: MLEvaluator, sizes, rounds: int, max_seconds: float):
+    print("\nload_dataset")
+    for family_name, family in FAMILIES.items():
+        for n_rows in sizes:
+            dataset_name = ensure_dataset(evaluator.datasets_path, family_name, n_rows)
+            stats = measure(
+                lambda: evaluator.load_dataset(dataset_name, family["config"]),
+                rounds=rounds, max_seconds=max_seconds
+            )
+            results.add(f"load_dataset[{family_name}-{n_rows}]", stats, rows=n_rows)
+
+
+def bench_evaluate_model(results: BenchmarkResults, evaluator: MLEvaluator, models_dir: str, sizes, rounds: int, max_seconds: float):
+    print("\nevaluate_model")
+    for family_name, family in FAMILIES.items():
+        for model_name in family["models"]:
+            model_path = os.path.join(models_dir, f"{model_name}.pkl")
+            for n_rows in sizes:
+                dataset_name = ensure_dataset(evaluator.datasets_path, family_name, n_rows)
+                
+                def run():
+                    result = evaluator.evaluate_model(model_path, dataset_name, family["metric"], family["config"])
+                    if not result["success"]:
+                        raise RuntimeError(result["logs"])
+                
+                stats = measure(run, rounds=rounds, max_seconds=max_seconds)
+                results.add(f"evaluate_model[{model_name}-{n_rows}]", stats, rows=n_rows)
+
+
+def bench_metrics(results: BenchmarkResults, evaluator: MLEvaluator, sizes, rounds: int, max_seconds: float):
+    print("\nmetrics")
+    rng = np.random.default_rng(42)
+    
+    for n_rows in sizes:
+        # Metrics are computed on the test split
+        n_test = max(int(n_rows * 0.2), 1)
+        
+        y_true = rng.integers(0, 3, n_test)
+        y_pred = np.where(rng.random(n_test) < 0.9, y_true, rng.integers(0, 3, n_test))
+        for metric in CLASSIFICATION_METRICS:
+            stats = measure(lambda: evaluator._calculate_metric(y_true, y_pred, metric), rounds=rounds, max_seconds=max_seconds)
+            results.add(f"metric[{metric}-{n_test}]", stats, rows=n_test)
+        
+        stats = measure(lambda: evaluator._calculate_additional_metrics(y_true, y_pred, "accuracy"), rounds=rounds, max_seconds=max_seconds)
+        results.add(f"additional_metrics[classification-{n_test}]", stats, rows=n_test)
+        
+        y_true = rng.normal(size=n_test)
+        y_pred = y_true + rng.normal(scale=0.1, size=n_test)
+        for metric in REGRESSION_METRICS:
+            stats = measure(lambda: evaluator._calculate_metric(y_true, y_pred, metric), rounds=rounds, max_seconds=max_seconds)
+            results.add(f"metric[{metric}-{n_test}]", stats, rows=n_test)
+        
+        stats = measure(lambda: evaluator._calculate_additional_metrics(y_true, y_pred, "r2_score"), rounds=rounds, max_seconds=max_seconds)
+        results.add(f"additional_metrics[regression-{n_test}]", stats, rows=n_test)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MLEvaluator")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated dataset row counts (up to 10000000)")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="Time budget per benchmark before stopping early")
+    parser.add_argument("--models-dir", default="./sample_models", help="Directory with models from train_sample_models.py")
+    parser.add_argument("--work-dir", default="./benchmarks/data", help="Where scaled datasets are generated and cached")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/evaluator.json)")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(",")]
+    
+    missing = [
+        name for family in FAMILIES.values() for name in family["models"]
+        if not os.path.exists(os.path.join(args.models_dir, f"{name}.pkl"))
+    ]
+    if missing:
+        parser.error(f"Missing sample models {missing}; run `python train_sample_models.py` first")
+    
+    os.makedirs(args.work_dir, exist_ok=True)
+    evaluator = MLEvaluator(datasets_path=args.work_dir)
+    results = BenchmarkResults("evaluator")
+    results.metadata["sizes"] = sizes
+    
+    bench_load_model(results, evaluator, args.models_dir, args.rounds)
+    bench_load_dataset(results, evaluator, sizes, args.rounds, args.max_seconds)
+    bench_evaluate_model(results, evaluator, args.models_dir, sizes, args.rounds, args.max_seconds)
+    bench_metrics(results, evaluator, sizes, args.rounds, args.max_seconds)
+    
+    results.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
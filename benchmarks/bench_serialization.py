@@ -0,0 +1,95 @@
+"""
+Response serialization benchmark
+
+Compares per-request CPU time of the two ways a leaderboard response can be
+produced:
+
+- pydantic: build LeaderboardResponse, let FastAPI re-validate it against
+  response_model, run jsonable_encoder and render with json.dumps
+  (what the route did before)
+- orjson: render the prebuilt row dicts directly with ORJSONResponse
+
+Usage:
+    python -m benchmarks.bench_serialization --sizes 100,500
+"""
+import argparse
+import json
+import random
+import time
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.responses import ORJSONResponse
+from app.schemas import LeaderboardResponse
+from benchmarks.harness import BenchmarkResults, measure
+
+
+def make_entries(n: int):
+    rng = random.Random(42)
+    xp = sorted((rng.randint(0, 5000) for _ in range(n)), reverse=True)
+    return [
+        {
+            "rank": rank,
+            "user_id": rank,
+            "username": f"user_{rng.randint(0, 10**6)}",
+            "xp": value,
+            "level": int((value / 100) ** 0.5) + 1,
+            "completed_quests": rng.randint(0, 5),
+        }
+        for rank, value in enumerate(xp, start=1)
+    ]
+
+
+def pydantic_path(entries, adapter):
+    response = LeaderboardResponse(leaderboard=entries, user_rank=42)
+    # FastAPI dumps the returned model, then validates the dict against response_model
+    validated = adapter.validate_python(response.model_dump())
+    content = jsonable_encoder(validated)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def orjson_path(entries):
+    return ORJSONResponse({"leaderboard": entries, "user_rank": 42}).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark leaderboard response serialization")
+    parser.add_argument("--sizes", default="100,500", help="Comma-separated leaderboard sizes")
+    parser.add_argument("--requests", type=int, default=200, help="Responses rendered per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/serialization.json)")
+    args = parser.parse_args()
+    
+    adapter = TypeAdapter(LeaderboardResponse)
+    results = BenchmarkResults("serialization")
+    
+    for size in (int(size) for size in args.sizes.split(",")):
+        entries = make_entries(size)
+        assert json.loads(pydantic_path(entries, adapter)) == json.loads(orjson_path(entries))
+        
+        for name, render in (
+            ("pydantic", lambda: pydantic_path(entries, adapter)),
+            ("orjson", lambda: orjson_path(entries)),
+        ):
+            def batch():
+                for _ in range(args.requests):
+                    render()
+            
+            stats = measure(batch, rounds=args.rounds, timer=time.process_time)
+            # Report CPU seconds per request rather than per batch
+            per_request = {
+                key: value / args.requests if key != "rounds" else value
+                for key, value in stats.items()
+            }
+            results.add(f"leaderboard[{name}-{size}]", per_request, entries=size, cpu="process_time")
+        
+        speedup = (
+            results.benchmarks[f"leaderboard[pydantic-{size}]"]["median"]
+            / results.benchmarks[f"leaderboard[orjson-{size}]"]["median"]
+        )
+        print(f"  {size} entries: orjson path is {speedup:.1f}x cheaper per request")
+    
+    results.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
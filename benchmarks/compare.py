@@ -0,0 +1,76 @@
+"""
+Compare two benchmark result files and fail on regressions
+
+Usage:
+    python -m benchmarks.compare baseline.json current.json --threshold 0.10
+"""
+import argparse
+import re
+import sys
+from benchmarks.harness import load_results
+
+
+def compare(baseline: dict, current: dict, threshold: float, stat: str = "median", only: str = None) -> int:
+    """
+    Print a comparison table and return the number of tracked regressions
+    
+    A benchmark regresses when current/baseline - 1 exceeds the threshold.
+    """
+    pattern = re.compile(only) if only else None
+    regressions = 0
+    
+    print(f"{'benchmark':<55} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, base in sorted(baseline["benchmarks"].items()):
+        if pattern and not pattern.search(name):
+            continue
+        
+        cur = current["benchmarks"].get(name)
+        if cur is None:
+            print(f"{name:<55} {base[stat] * 1000:10.3f}ms {'missing':>12}")
+            continue
+        
+        change = cur[stat] / base[stat] - 1 if base[stat] > 0 else 0.0
+        tracked = base.get("tracked", True) and cur.get("tracked", True)
+        marker = ""
+        if change > threshold:
+            if tracked:
+                marker = "  REGRESSION"
+                regressions += 1
+            else:
+                marker = "  (untracked)"
+        
+        print(f"{name:<55} {base[stat] * 1000:10.3f}ms {cur[stat] * 1000:10.3f}ms {change:+8.1%}{marker}")
+    
+    for name in sorted(set(current["benchmarks"]) - set(baseline["benchmarks"])):
+        if pattern is None or pattern.search(name):
+            print(f"{name:<55} {'new':>12} {current['benchmarks'][name][stat] * 1000:10.3f}ms")
+    
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("baseline", help="Baseline results JSON")
+    parser.add_argument("current", help="Current results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    parser.add_argument("--stat", default="median", choices=["min", "median", "mean"], help="Statistic to compare")
+    parser.add_argument("--only", help="Regex selecting benchmarks to compare")
+    args = parser.parse_args()
+    
+    regressions = compare(
+        load_results(args.baseline),
+        load_results(args.current),
+        threshold=args.threshold,
+        stat=args.stat,
+        only=args.only
+    )
+    
+    if regressions:
+        print(f"\n❌ {regressions} tracked benchmark(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+    
+    print("\n✅ No tracked regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Shared timing and result-file helpers for the benchmark suites
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def measure(
+    func: Callable[[], Any],
+    rounds: int = 5,
+    warmup: int = 1,
+    max_seconds: Optional[float] = None,
+    timer: Callable[[], float] = time.perf_counter
+) -> Dict[str, float]:
+    """
+    Time repeated calls of `func`
+    
+    Args:
+        func: Zero-argument callable to benchmark
+        rounds: Number of timed calls
+        warmup: Untimed calls made first
+        max_seconds: Stop early (after at least one round) once this much time is spent
+        timer: Clock to use (perf_counter for wall time, process_time for CPU)
+    
+    Returns:
+        Dict with min, median, mean, max, stdev (seconds) and rounds
+    """
+    for _ in range(warmup):
+        func()
+    
+    times = []
+    budget_start = time.perf_counter()
+    for _ in range(rounds):
+        start = timer()
+        func()
+        times.append(timer() - start)
+        
+        if max_seconds is not None and time.perf_counter() - budget_start > max_seconds:
+            break
+    
+    return {
+        "rounds": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "max": max(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkResults:
+    """Collects benchmark timings for one suite and writes them as JSON"""
+    
+    def __init__(self, suite: str, verbose: bool = True):
+        self.suite = suite
+        self.verbose = verbose
+        self.benchmarks: Dict[str, Dict[str, Any]] = {}
+        self.metadata = {
+            "suite": suite,
+            "created_at": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        }
+    
+    def add(self, name: str, stats: Dict[str, float], tracked: bool = True, **extra):
+        """Record a benchmark; untracked entries are reported but never fail comparisons"""
+        self.benchmarks[name] = {**stats, "tracked": tracked, **extra}
+        if self.verbose:
+            print(f"  {name:<55} median {stats['median'] * 1000:10.3f} ms  ({stats['rounds']} rounds)")
+    
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or os.path.join(RESULTS_DIR, f"{self.suite}.json")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with open(path, "w") as f:
+            json.dump({"metadata": self.metadata, "benchmarks": self.benchmarks}, f, indent=2)
+        
+        print(f"\n✅ Results written to {path}")
+        return path
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """Load a results file written by BenchmarkResults.save"""
+    with open(path) as f:
+        return json.load(f)
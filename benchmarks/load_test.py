@@ -0,0 +1,251 @@
+"""
+End-to-end HTTP load test
+
+Registers and logs in a pool of synthetic users, then drives a weighted mix
+of quest browsing, model submissions and leaderboard polling against a
+running server. Reports throughput, p50/p95/p99 latency and error rate per
+route.
+
+Usage:
+    uvicorn app.main:app --workers 4 &
+    python train_sample_models.py
+    python -m benchmarks.load_test --users 2000 --concurrency 200 --duration 120
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+import httpx
+from benchmarks.harness import BenchmarkResults
+
+# route label -> weight
+DEFAULT_MIX = "quests=35,quest=10,leaderboard=30,progress=10,submissions=8,submit=7"
+
+# Sample model submitted for each dataset family (see train_sample_models.py)
+SAMPLE_MODELS = {
+    "housing": "housing_random_forest.pkl",
+    "churn": "churn_random_forest.pkl",
+    "iris": "iris_random_forest.pkl",
+}
+FAMILY_BY_METRIC = {"r2_score": "housing", "mse": "housing", "accuracy": "churn", "f1_score": "iris"}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class RouteStats:
+    """Latencies and outcomes recorded per route template"""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    
+    def record(self, route: str, seconds: float, status: Optional[int]):
+        self.latencies[route].append(seconds)
+        self.statuses[route][status or 0] += 1
+        if status is None or status >= 400:
+            self.errors[route] += 1
+    
+    def report(self, elapsed: float, results: Optional[BenchmarkResults] = None):
+        total = sum(len(values) for values in self.latencies.values())
+        total_errors = sum(self.errors.values())
+        
+        print(f"\n{'route':<40} {'count':>8} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            count = len(values)
+            p50, p95, p99 = (percentile(values, p) for p in (50, 95, 99))
+            error_rate = self.errors[route] / count
+            
+            print(
+                f"{route:<40} {count:>8} {count / elapsed:>8.1f} {p50 * 1000:>9.1f} "
+                f"{p95 * 1000:>9.1f} {p99 * 1000:>9.1f} {error_rate:>7.2%}"
+            )
+            
+            if results is not None:
+                results.add(
+                    route,
+                    {
+                        "rounds": count,
+                        "min": values[0],
+                        "median": p50,
+                        "mean": sum(values) / count,
+                        "max": values[-1],
+                        "stdev": 0.0,
+                    },
+                    p95=p95,
+                    p99=p99,
+                    throughput_rps=count / elapsed,
+                    error_rate=error_rate,
+                    statuses={str(k): v for k, v in self.statuses[route].items()},
+                )
+        
+        print(f"\nTotal: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+              f"{total_errors} errors ({total_errors / max(total, 1):.2%})")
+
+
+class LoadTest:
+    """Synthetic users driving a weighted request mix"""
+    
+    def __init__(self, args):
+        self.args = args
+        self.stats = RouteStats()
+        self.tokens: List[str] = []
+        self.quests: List[dict] = []
+        self.models: Dict[str, bytes] = {}
+        
+        mix = dict(item.split("=") for item in args.mix.split(","))
+        self.actions = list(mix)
+        self.weights = [float(weight) for weight in mix.values()]
+    
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(route, time.perf_counter() - start, None)
+            return None
+        self.stats.record(route, time.perf_counter() - start, response.status_code)
+        return response
+    
+    async def create_user(self, client: httpx.AsyncClient, run_id: str, index: int, semaphore: asyncio.Semaphore):
+        username = f"load_{run_id}_{index}"
+        credentials = {"username": username, "password": self.args.password}
+        
+        async with semaphore:
+            await self.request(
+                client, "POST /auth/register", "POST", "/auth/register",
+                json={**credentials, "email": f"{username}@example.com"}
+            )
+            response = await self.request(client, "POST /auth/login", "POST", "/auth/login", json=credentials)
+        
+        if response is not None and response.status_code == 200:
+            self.tokens.append(response.json()["access_token"])
+    
+    def load_models(self):
+        for family, filename in SAMPLE_MODELS.items():
+            path = os.path.join(self.args.models_dir, filename)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.models[family] = f.read()
+        
+        if not self.models:
+            print(f"⚠️  No sample models in {self.args.models_dir}; submissions are disabled")
+            self.weights = [0 if action == "submit" else w for action, w in zip(self.actions, self.weights)]
+    
+    def pick_submission(self):
+        candidates = []
+        for quest in self.quests:
+            dataset = quest.get("dataset_name") or ""
+            family = dataset.split("_")[0] if dataset else FAMILY_BY_METRIC.get(quest["metric_name"])
+            if family in self.models:
+                candidates.append((quest["id"], family))
+        return random.choice(candidates) if candidates else None
+    
+    async def run_action(self, client: httpx.AsyncClient, action: str, headers: dict):
+        if action == "quests":
+            await self.request(client, "GET /quests/", "GET", "/quests/", headers=headers)
+        elif action == "quest" and self.quests:
+            quest_id = random.choice(self.quests)["id"]
+            await self.request(client, "GET /quests/{quest_id}", "GET", f"/quests/{quest_id}", headers=headers)
+        elif action == "leaderboard":
+            await self.request(client, "GET /leaderboard/", "GET", "/leaderboard/", headers=headers)
+        elif action == "progress":
+            await self.request(client, "GET /user/progress", "GET", "/user/progress", headers=headers)
+        elif action == "submissions" and self.quests:
+            quest_id = random.choice(self.quests)["id"]
+            await self.request(
+                client, "GET /quests/{quest_id}/submissions", "GET",
+                f"/quests/{quest_id}/submissions", headers=headers
+            )
+        elif action == "submit":
+            picked = self.pick_submission()
+            if picked is None:
+                return
+            quest_id, family = picked
+            await self.request(
+                client, "POST /quests/{quest_id}/submit", "POST", f"/quests/{quest_id}/submit",
+                headers=headers,
+                files={"model_file": (SAMPLE_MODELS[family], self.models[family], "application/octet-stream")}
+            )
+    
+    async def virtual_user(self, client: httpx.AsyncClient, deadline: float):
+        while time.monotonic() < deadline:
+            headers = {"Authorization": f"Bearer {random.choice(self.tokens)}"}
+            action = random.choices(self.actions, weights=self.weights)[0]
+            await self.run_action(client, action, headers)
+            if self.args.think_time > 0:
+                await asyncio.sleep(random.expovariate(1 / self.args.think_time))
+    
+    async def run(self) -> float:
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        timeout = httpx.Timeout(self.args.timeout)
+        
+        async with httpx.AsyncClient(base_url=self.args.base_url, limits=limits, timeout=timeout) as client:
+            run_id = uuid.uuid4().hex[:8]
+            print(f"Creating {self.args.users} users (run {run_id})...")
+            setup_start = time.monotonic()
+            semaphore = asyncio.Semaphore(self.args.concurrency)
+            await asyncio.gather(*(
+                self.create_user(client, run_id, index, semaphore) for index in range(self.args.users)
+            ))
+            if not self.tokens:
+                raise SystemExit("❌ No users could log in; is the server running?")
+            
+            response = await client.get("/quests/", headers={"Authorization": f"Bearer {self.tokens[0]}"})
+            response.raise_for_status()
+            self.quests = response.json()
+            self.load_models()
+            
+            # Only the steady-state mix counts towards the final report
+            setup_stats, self.stats = self.stats, RouteStats()
+            setup_stats.report(time.monotonic() - setup_start)
+            
+            print(f"\nRunning mix {self.args.mix} with {self.args.concurrency} virtual users for {self.args.duration}s...")
+            start = time.monotonic()
+            deadline = start + self.args.duration
+            await asyncio.gather(*(self.virtual_user(client, deadline) for _ in range(self.args.concurrency)))
+            return time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test against a running API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic users to register")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60.0, help="Steady-state duration in seconds")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a user's requests (seconds)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated action=weight pairs")
+    parser.add_argument("--models-dir", default="./sample_models")
+    parser.add_argument("--password", default="loadtest123")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/load_test.json)")
+    args = parser.parse_args()
+    
+    load_test = LoadTest(args)
+    elapsed = asyncio.run(load_test.run())
+    
+    results = BenchmarkResults("load_test", verbose=False)
+    results.metadata.update({
+        "base_url": args.base_url,
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "duration": elapsed,
+        "mix": args.mix,
+    })
+    load_test.stats.report(elapsed, results)
+    results.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
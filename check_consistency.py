@@ -0,0 +1,50 @@
+"""
+Check the denormalized per-user progress counters against submissions
+
+Reports users whose user_progress row disagrees with the counts recomputed
+from submissions. With --fix, rebuilds every counter in bulk:
+
+    python check_consistency.py --fix
+"""
+import argparse
+import time
+from app.database import engine
+from app.services.progress_service import (
+    find_inconsistent_progress, rebuild_user_progress, sync_user_completed_quests
+)
+
+
+def main(fix=False, limit=20):
+    with engine.connect() as connection:
+        mismatches = find_inconsistent_progress(connection, limit=limit)
+    
+    if not mismatches:
+        print("✅ user_progress matches submissions")
+    else:
+        print(f"⚠️  Found inconsistent user_progress rows (showing up to {limit}):")
+        for row in mismatches:
+            print(
+                f"   user {row['user_id']}: "
+                f"completed {row['completed_quests']} != {row['expected_completed_quests']}, "
+                f"attempts {row['attempts']} != {row['expected_attempts']}, "
+                f"perfect {row['perfect_scores']} != {row['expected_perfect_scores']}, "
+                f"leaderboard completed {row['leaderboard_completed_quests']}"
+            )
+    
+    if fix:
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            rows = rebuild_user_progress(connection)
+            sync_user_completed_quests(connection)
+        print(f"✅ Rebuilt {rows} user_progress rows in {time.perf_counter() - started:.1f}s")
+    
+    return not mismatches or fix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check user_progress counters against submissions")
+    parser.add_argument("--fix", action="store_true", help="Rebuild all counters from submissions")
+    parser.add_argument("--limit", type=int, default=20, help="Mismatches to report")
+    args = parser.parse_args()
+    
+    raise SystemExit(0 if main(fix=args.fix, limit=args.limit) else 1)
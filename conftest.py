@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+# app.database reads DATABASE_URL at import, so point it at the test database first
+# (tables are emptied after each test: never reuse a real DATABASE_URL here)
+_database_dir = tempfile.mkdtemp(prefix="ml-game-tests-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+)
+
+import pytest
+
+# Reference data and migration bookkeeping, left in place between tests
+KEPT_TABLES = {"schema_version", "catalogue_version", "levels", "badges"}
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """The app's engine with the schema migrated to the latest version"""
+    from app.database import engine
+    from app.migrations import run_migrations
+    
+    run_migrations()
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    """A session on the test database; every table is emptied afterwards"""
+    from app.database import Base, SessionLocal
+    
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                if table.name not in KEPT_TABLES:
+                    connection.execute(table.delete())
+
+
+@pytest.fixture
+def sandbox(tmp_path, monkeypatch):
+    """
+    A SandboxedEvaluator over a small iris dataset, with a trained model at tmp_path/model.joblib
+    
+    The child keeps the test's own user, so it can import the installed
+    packages wherever they live.
+    """
+    import pwd
+    import joblib
+    from sklearn.datasets import load_iris
+    from sklearn.linear_model import LogisticRegression
+    from app.ml_engine import sandbox
+    
+    monkeypatch.setattr(sandbox, "EVALUATION_SANDBOX_USER", pwd.getpwuid(os.geteuid()).pw_name)
+    
+    frame = load_iris(as_frame=True).frame
+    frame.to_csv(tmp_path / "iris.csv", index=False)
+    model = LogisticRegression(max_iter=500).fit(frame.drop(columns="target"), frame["target"])
+    joblib.dump(model, tmp_path / "model.joblib")
+    
+    return sandbox.SandboxedEvaluator(datasets_path=str(tmp_path))
@@ -1,17 +1,59 @@
 """
 Generate sample datasets for ML quests
+
+By default these are the quest datasets the thresholds in init_db.py were
+tuned on (sklearn's make_regression / make_classification and the iris
+data), byte-for-byte the same on every run.
+
+With --chunked, datasets are instead produced in fixed-size chunks, each
+drawn from its own RNG seeded with (seed, family, chunk index), and appended
+to the output file as they are generated. Output depends only on the seed
+and chunk size, and memory use is bounded by the chunk size, so multi-GB
+evaluation sets can be built for stress tests. The data follows the same
+kind of distributions but is not the quest data, so scores differ from it:
+
+    python generate_datasets.py --chunked --rows 10000000 --format parquet
 """
-import pandas as pd
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
 from sklearn.datasets import make_regression, make_classification, load_iris
-import os
 
-def create_housing_dataset():
+CHUNK_ROWS = 100_000
+
+# Bump whenever generator logic changes so existing datasets are rebuilt
+DATASET_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+
+HOUSING_FEATURES = [
+    'square_feet', 'bedrooms', 'bathrooms', 'age',
+    'garage_size', 'lot_size', 'proximity_to_city', 'school_rating'
+]
+CHURN_FEATURES = [
+    'tenure', 'monthly_charges', 'total_charges', 'contract_length',
+    'payment_method', 'internet_service', 'tech_support', 'streaming_tv',
+    'online_security', 'paperless_billing'
+]
+
+# family -> output file stem, default rows, default feature count
+FAMILIES = {
+    "housing": {"stem": "housing_train", "rows": 1000, "features": len(HOUSING_FEATURES)},
+    "churn": {"stem": "churn_train", "rows": 2000, "features": len(CHURN_FEATURES)},
+    "iris": {"stem": "iris_train", "rows": 150, "features": 4},
+}
+FAMILY_IDS = {name: index for index, name in enumerate(FAMILIES)}
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet"}
+
+
+def create_housing_dataset(n_samples=1000):
     """Create synthetic housing price dataset"""
     np.random.seed(42)
     
     # Generate base features
-    n_samples = 1000
     
     X, y = make_regression(
         n_samples=n_samples,
@@ -22,10 +64,7 @@ def create_housing_dataset():
     )
     
     # Create meaningful feature names
-    df = pd.DataFrame(X, columns=[
-        'square_feet', 'bedrooms', 'bathrooms', 'age',
-        'garage_size', 'lot_size', 'proximity_to_city', 'school_rating'
-    ])
+    df = pd.DataFrame(X, columns=HOUSING_FEATURES)
     
     # Scale target to realistic house prices
     y = (y - y.min()) / (y.max() - y.min()) * 400000 + 100000
@@ -37,12 +76,10 @@ def create_housing_dataset():
     return df
 
 
-def create_churn_dataset():
+def create_churn_dataset(n_samples=2000):
     """Create synthetic customer churn dataset"""
     np.random.seed(42)
     
-    n_samples = 2000
-    
     X, y = make_classification(
         n_samples=n_samples,
         n_features=10,
@@ -53,12 +90,7 @@ def create_churn_dataset():
         random_state=42
     )
     
-    df = pd.DataFrame(X, columns=[
-        'tenure', 'monthly_charges', 'total_charges', 'contract_length',
-        'payment_method', 'internet_service', 'tech_support', 'streaming_tv',
-        'online_security', 'paperless_billing'
-    ])
-    
+    df = pd.DataFrame(X, columns=CHURN_FEATURES)
     df['churn'] = y
     
     return df
@@ -73,27 +105,309 @@ def create_iris_dataset():
     return df
 
 
-def generate_all_datasets(output_dir='./datasets'):
-    """Generate all sample datasets"""
+# The quest datasets (default output)
+QUEST_DATASETS = {
+    "housing": create_housing_dataset,
+    "churn": create_churn_dataset,
+    "iris": create_iris_dataset,
+}
+
+
+def _feature_names(base_names, n_features):
+    extra = [f"feature_{i}" for i in range(len(base_names), n_features)]
+    return (list(base_names) + extra)[:n_features]
+
+
+def _family_rng(seed, family):
+    """RNG for dataset-wide parameters (coefficients, centroids)"""
+    return np.random.default_rng([seed, FAMILY_IDS[family]])
+
+
+def _chunk_rng(seed, family, chunk_index):
+    """Independent RNG for one chunk of rows"""
+    return np.random.default_rng([seed, FAMILY_IDS[family], chunk_index + 1])
+
+
+def housing_params(seed, n_features):
+    """Fixed linear model shared by every chunk of the housing dataset"""
+    rng = _family_rng(seed, "housing")
+    n_informative = max(1, round(n_features * 0.75))
+    coef = np.zeros(n_features)
+    coef[:n_informative] = 100 * rng.uniform(size=n_informative)
+    return {"coef": coef, "noise": 10.0, "scale": 3 * np.linalg.norm(coef)}
+
+
+def create_housing_chunk(params, rng, n_rows, n_features):
+    """Create a chunk of the synthetic housing price dataset"""
+    X = rng.standard_normal((n_rows, n_features))
+    y = X @ params["coef"] + rng.normal(0, params["noise"], n_rows)
+    
+    df = pd.DataFrame(X, columns=_feature_names(HOUSING_FEATURES, n_features))
+    
+    # Scale target to realistic house prices (roughly 100k-500k)
+    df['price'] = 300000 + y / params["scale"] * 200000
+    
+    # Add some non-linear relationships
+    df['price'] = df['price'] + df.iloc[:, 0] * 50
+    if n_features > 1:
+        df['price'] = df['price'] + df.iloc[:, 1] * 10000
+    
+    return df
+
+
+def churn_params(seed, n_features):
+    """Cluster centroids and covariances shared by every chunk of the churn dataset"""
+    rng = _family_rng(seed, "churn")
+    n_informative = max(2, round(n_features * 0.7))
+    n_redundant = min(2, n_features - n_informative)
+    n_clusters = 4  # two clusters per class
+    
+    centroids = rng.choice([-1.0, 1.0], size=(n_clusters, n_informative))
+    transforms = 2 * rng.uniform(size=(n_clusters, n_informative, n_informative)) - 1
+    redundant = 2 * rng.uniform(size=(n_informative, n_redundant)) - 1
+    
+    return {
+        "n_informative": n_informative,
+        "centroids": centroids,
+        "transforms": transforms,
+        "redundant": redundant,
+        "weights": [0.7, 0.3],
+        "flip_y": 0.01,
+    }
+
+
+def create_churn_chunk(params, rng, n_rows, n_features):
+    """Create a chunk of the synthetic customer churn dataset"""
+    n_informative = params["n_informative"]
+    
+    y = (rng.uniform(size=n_rows) < params["weights"][1]).astype(int)
+    cluster = y * 2 + rng.integers(0, 2, n_rows)
+    
+    # Gaussian clusters with per-cluster covariance around hypercube vertices
+    X_informative = rng.standard_normal((n_rows, n_informative))
+    for c, (centroid, transform) in enumerate(zip(params["centroids"], params["transforms"])):
+        mask = cluster == c
+        X_informative[mask] = X_informative[mask] @ transform + centroid
+    X_redundant = X_informative @ params["redundant"]
+    n_noise = n_features - n_informative - X_redundant.shape[1]
+    X_noise = rng.standard_normal((n_rows, max(n_noise, 0)))
+    X = np.hstack([X_informative, X_redundant, X_noise])[:, :n_features]
+    
+    flip = rng.uniform(size=n_rows) < params["flip_y"]
+    y[flip] = rng.integers(0, 2, flip.sum())
+    
+    df = pd.DataFrame(X, columns=_feature_names(CHURN_FEATURES, n_features))
+    df['churn'] = y
+    
+    return df
+
+
+def iris_params(seed, n_features):
+    """The real iris data plus per-species Gaussians for rows beyond the first 150"""
+    iris = load_iris()
+    classes = np.unique(iris.target)
+    return {
+        "data": iris.data,
+        "target": iris.target,
+        "columns": iris.feature_names,
+        "means": [iris.data[iris.target == c].mean(axis=0) for c in classes],
+        "covs": [np.cov(iris.data[iris.target == c], rowvar=False) for c in classes],
+    }
+
+
+def create_iris_chunk(params, rng, n_rows, n_features, start=0):
+    """Create a chunk of the iris dataset (real rows first, then synthetic ones)"""
+    n_real = max(min(len(params["data"]) - start, n_rows), 0)
+    X = [params["data"][start:start + n_real]]
+    y = [params["target"][start:start + n_real]]
+    
+    n_synthetic = n_rows - n_real
+    if n_synthetic:
+        species = rng.integers(0, len(params["means"]), n_synthetic)
+        samples = np.empty((n_synthetic, len(params["columns"])))
+        for c, (mean, cov) in enumerate(zip(params["means"], params["covs"])):
+            mask = species == c
+            samples[mask] = rng.multivariate_normal(mean, cov, mask.sum())
+        X.append(samples)
+        y.append(species)
+    
+    df = pd.DataFrame(np.vstack(X), columns=params["columns"])
+    df['species'] = np.concatenate(y)
+    
+    return df
+
+
+GENERATORS = {
+    "housing": (housing_params, create_housing_chunk),
+    "churn": (churn_params, create_churn_chunk),
+    "iris": (iris_params, create_iris_chunk),
+}
+
+
+def iter_chunks(family, n_rows, n_features=None, seed=42, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrame chunks of a dataset family"""
+    n_features = n_features or FAMILIES[family]["features"]
+    make_params, create_chunk = GENERATORS[family]
+    params = make_params(seed, n_features)
+    
+    for chunk_index, start in enumerate(range(0, n_rows, chunk_rows)):
+        rng = _chunk_rng(seed, family, chunk_index)
+        size = min(chunk_rows, n_rows - start)
+        if family == "iris":
+            yield create_chunk(params, rng, size, n_features, start=start)
+        else:
+            yield create_chunk(params, rng, size, n_features)
+
+
+def write_dataset(family, path, n_rows, n_features=None, fmt="csv", seed=42, chunk_rows=CHUNK_ROWS):
+    """Generate a dataset chunk by chunk, appending each chunk to `path`"""
+    writer = None
+    tmp_path = f"{path}.tmp"
+    
+    if fmt == "parquet":
+        # Optional dependency, only needed for parquet output
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    
+    try:
+        for chunk_index, chunk in enumerate(iter_chunks(family, n_rows, n_features, seed, chunk_rows)):
+            if fmt == "parquet":
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(
+                    tmp_path,
+                    mode="w" if chunk_index == 0 else "a",
+                    header=chunk_index == 0,
+                    index=False,
+                    compression="gzip" if fmt == "csv.gz" else None
+                )
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    # Only replace the previous file once the new one is complete
+    os.replace(tmp_path, path)
+    return n_rows
+
+
+def write_quest_dataset(family, path, fmt="csv"):
+    """Write one of the quest datasets to `path`"""
+    df = QUEST_DATASETS[family]()
+    tmp_path = f"{path}.tmp"
+    
+    if fmt == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False, compression="gzip" if fmt == "csv.gz" else None)
+    
+    os.replace(tmp_path, path)
+    return len(df)
+
+
+def _generate_family(family, output_dir, n_rows, n_features, fmt, seed, chunk_rows, chunked):
+    filename = FAMILIES[family]["stem"] + FORMATS[fmt]
+    path = os.path.join(output_dir, filename)
+    started = time.perf_counter()
+    if chunked:
+        write_dataset(family, path, n_rows, n_features, fmt, seed, chunk_rows)
+    else:
+        n_rows = write_quest_dataset(family, path, fmt)
+    return filename, n_rows, time.perf_counter() - started
+
+
+def _dataset_manifest(rows, features, fmt, seed, chunk_rows, chunked):
+    """Everything that determines the generated files"""
+    return {
+        "version": DATASET_VERSION,
+        "chunked": chunked,
+        "rows": rows,
+        "features": features,
+        "format": fmt,
+        "seed": seed,
+        "chunk_rows": chunk_rows,
+        "files": [spec["stem"] + FORMATS[fmt] for spec in FAMILIES.values()],
+    }
+
+
+def datasets_up_to_date(output_dir, manifest):
+    """True if output_dir already holds datasets built from the same manifest"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        if json.load(f) != manifest:
+            return False
+    return all(os.path.exists(os.path.join(output_dir, name)) for name in manifest["files"])
+
+
+def generate_all_datasets(output_dir='./datasets', rows=None, features=None, fmt="csv", seed=42, chunk_rows=CHUNK_ROWS, workers=None, force=False, chunked=False):
+    """
+    Generate all sample datasets, one process per dataset family
+    
+    Without `chunked`, writes the quest datasets (rows, features, seed and
+    chunk_rows only apply to chunked generation). Skipped when the datasets
+    were already built with the same version and options.
+    
+    Returns:
+        True if datasets were (re)generated
+    """
+    if not chunked and (rows or features):
+        raise ValueError("rows and features need chunked generation; the quest datasets have a fixed size")
+    
     os.makedirs(output_dir, exist_ok=True)
     
-    # Housing dataset
-    housing_df = create_housing_dataset()
-    housing_df.to_csv(os.path.join(output_dir, 'housing_train.csv'), index=False)
-    print(f"✅ Created housing_train.csv ({len(housing_df)} samples)")
+    manifest = _dataset_manifest(rows, features, fmt, seed, chunk_rows, chunked)
+    if not force and datasets_up_to_date(output_dir, manifest):
+        print(f"⏭️  Datasets in {output_dir} are up to date (version {DATASET_VERSION})")
+        return False
+    
+    jobs = []
+    for family, spec in FAMILIES.items():
+        n_rows = rows or spec["rows"]
+        # iris has a fixed feature set
+        n_features = features if features and family != "iris" else spec["features"]
+        jobs.append((family, output_dir, n_rows, n_features, fmt, seed, chunk_rows, chunked))
+    
+    with ProcessPoolExecutor(max_workers=workers or len(jobs)) as executor:
+        futures = [executor.submit(_generate_family, *job) for job in jobs]
+        for future in futures:
+            filename, n_rows, seconds = future.result()
+            print(f"✅ Created {filename} ({n_rows} samples, {seconds:.1f}s)")
     
-    # Churn dataset
-    churn_df = create_churn_dataset()
-    churn_df.to_csv(os.path.join(output_dir, 'churn_train.csv'), index=False)
-    print(f"✅ Created churn_train.csv ({len(churn_df)} samples)")
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
     
-    # Iris dataset
-    iris_df = create_iris_dataset()
-    iris_df.to_csv(os.path.join(output_dir, 'iris_train.csv'), index=False)
-    print(f"✅ Created iris_train.csv ({len(iris_df)} samples)")
+    return True
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate quest datasets")
+    parser.add_argument("--chunked", action="store_true", help="Generate stress-test datasets in seeded chunks instead of the quest datasets")
+    parser.add_argument("--rows", type=int, help="Rows per dataset with --chunked (default: 1000 housing, 2000 churn, 150 iris)")
+    parser.add_argument("--features", type=int, help="Feature columns for housing and churn with --chunked (default: 8 and 10)")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv", help="Output format")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for --chunked")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows generated and written per chunk with --chunked")
+    parser.add_argument("--output-dir", default="./datasets")
+    parser.add_argument("--workers", type=int, help="Parallel processes (default: one per dataset)")
+    parser.add_argument("--force", action="store_true", help="Regenerate even if datasets are up to date")
+    args = parser.parse_args()
+    if (args.rows or args.features) and not args.chunked:
+        parser.error("--rows and --features need --chunked (the quest datasets have a fixed size)")
+    
     print("Generating sample datasets...")
-    generate_all_datasets()
-    print("\n✅ All datasets generated successfully!")
\ No newline at end of file
+    generate_all_datasets(
+        output_dir=args.output_dir,
+        rows=args.rows,
+        features=args.features,
+        fmt=args.format,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        force=args.force,
+        chunked=args.chunked
+    )
+    print("\n✅ All datasets are ready!")
@@ -1,8 +1,26 @@
 """
 Initialize database with sample levels, quests, and badges
+
+Optionally bulk-loads synthetic users, submission histories, badges and XP events so
+leaderboard and badge queries can be exercised at production-like sizes:
+
+    python init_db.py --synthetic-users 1000000 --seed 42
 """
+import argparse
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func
 from app.database import SessionLocal, init_db
-from app.models import Level, Quest, Badge
+from app.models import Level, Quest, Badge, User, Submission, UserBadge, XPEvent, PeriodXP
+from app.services.auth_service import AuthService
+from app.services.xp_service import period_totals
+from app.services.quest_service import rebuild_best_submissions
+from app.services.progress_service import rebuild_user_progress, sync_user_completed_quests
 
 
 def seed_database():
@@ -184,7 +202,7 @@ def seed_database():
         print(f"   - Created {db.query(Level).count()} levels")
         print(f"   - Created {db.query(Quest).count()} quests")
         print(f"   - Created {db.query(Badge).count()} badges")
-        
+    
     except Exception as e:
         print(f"❌ Error seeding database: {e}")
         db.rollback()
@@ -192,8 +210,249 @@ def seed_database():
         db.close()
 
 
+def _bulk_insert(db, table, columns, rows):
+    """
+    Insert rows (tuples in `columns` order) in one round trip
+    
+    Uses COPY on PostgreSQL and an executemany INSERT elsewhere. Dict
+    values are JSON columns.
+    """
+    if not rows:
+        return
+    
+    connection = db.connection()
+    if connection.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            [json.dumps(value) if isinstance(value, dict) else value for value in row] for row in rows
+        )
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def _reset_sequences(db, tables):
+    """Move PostgreSQL id sequences past explicitly inserted ids"""
+    connection = db.connection()
+    if connection.dialect.name != "postgresql":
+        return
+    
+    for table in tables:
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+        )
+
+
+def _current_streak(pass_days):
+    """Length of the run of consecutive days ending at the last pass day"""
+    days = sorted(set(pass_days))
+    streak = 1
+    for previous, current in zip(reversed(days[:-1]), reversed(days)):
+        if (current - previous).days != 1:
+            break
+        streak += 1
+    return streak
+
+
+USER_COLUMNS = [
+    "id", "username", "email", "hashed_password", "xp", "level", "current_streak",
+    "last_activity_date", "is_active", "created_at", "updated_at",
+]
+SUBMISSION_COLUMNS = [
+    "id", "user_id", "quest_id", "model_path", "submission_date",
+    "score", "passed", "metrics", "xp_awarded", "evaluation_ms",
+]
+USER_BADGE_COLUMNS = ["id", "user_id", "badge_id", "earned_at"]
+XP_EVENT_COLUMNS = ["id", "user_id", "quest_id", "submission_id", "amount", "created_at"]
+PERIOD_XP_COLUMNS = ["period", "period_start", "user_id", "xp"]
+
+
+def _generate_user(rng, index, user_id, next_submission_id, quests, badges, password_hash, now, days):
+    """
+    Generate one user with a submission history and matching XP/level/streak/badges/XP events
+    
+    Users work through quests in order; each quest gets a few attempts whose
+    scores centre on the quest threshold, shifted by the user's skill and
+    improving with every attempt.
+    """
+    skill = rng.beta(2, 2)
+    created_at = now - timedelta(days=float(rng.uniform(0, days)))
+    n_quests = min(int(rng.geometric(0.3)), len(quests))
+    
+    submissions = []
+    first_passes = []  # (date, xp_reward)
+    xp_events = []  # (quest_id, submission_id, amount, date)
+    perfect_dates = []
+    clock = created_at
+    
+    for quest in quests[:n_quests]:
+        n_attempts = min(int(rng.geometric(0.45)), 10)
+        passed_before = False
+        
+        for attempt in range(n_attempts):
+            clock = min(clock + timedelta(hours=float(rng.exponential(18))), now)
+            score = float(np.clip(
+                quest.threshold - 0.08 + 0.16 * skill + 0.02 * attempt + rng.normal(0, 0.04),
+                0.0, 1.0
+            ))
+            passed = score >= quest.threshold
+            xp_awarded = 0
+            
+            if passed and not passed_before:
+                xp_awarded = quest.xp_reward
+                first_passes.append((clock, quest.xp_reward))
+                xp_events.append((quest.id, next_submission_id + len(submissions), xp_awarded, clock))
+                passed_before = True
+            if passed and score >= 0.99:
+                perfect_dates.append(clock)
+            
+            submissions.append((
+                next_submission_id + len(submissions), user_id, quest.id,
+                f"./uploads/user_{user_id}_quest_{quest.id}_model.pkl", clock,
+                round(score, 4), passed, {quest.metric_name: round(score, 4)},
+                xp_awarded, int(rng.lognormal(6.0, 0.6)),
+            ))
+            
+            if passed and rng.random() < 0.7:
+                break
+    
+    xp = sum(reward for _, reward in first_passes)
+    level = math.floor(math.sqrt(xp / 100)) + 1
+    last_activity = first_passes[-1][0] if first_passes else None
+    streak = _current_streak([date.date() for date, _ in first_passes]) if first_passes else 0
+    
+    # Badges, earned at the moment their condition first held
+    cumulative_xp = np.cumsum([reward for _, reward in first_passes])
+    earned = []
+    for badge in badges:
+        earned_at = None
+        value = badge.condition_value
+        if badge.condition_type == "quest_completion" and len(first_passes) >= value:
+            earned_at = first_passes[value - 1][0]
+        elif badge.condition_type == "xp_threshold" and xp >= value:
+            earned_at = first_passes[int(np.argmax(cumulative_xp >= value))][0]
+        elif badge.condition_type == "streak" and streak >= value:
+            earned_at = last_activity
+        elif badge.condition_type == "perfect_score" and len(perfect_dates) >= value:
+            earned_at = perfect_dates[value - 1]
+        if earned_at is not None:
+            earned.append((badge.id, earned_at))
+    
+    username = f"synthetic_{index}"
+    user = (
+        user_id, username, f"{username}@example.com", password_hash, xp, level, streak,
+        last_activity, True, created_at, clock,
+    )
+    return user, submissions, earned, xp_events
+
+
+def seed_synthetic_data(n_users: int, seed: int = 42, chunk_size: int = 10000, days: int = 180):
+    """
+    Bulk-load synthetic users with submission histories and badges
+    
+    Generation is deterministic for a given seed: chunk k always draws from
+    the RNG seeded with (seed, k). Every synthetic user logs in with the
+    password "password123".
+    """
+    db = SessionLocal()
+    
+    try:
+        quests = db.query(Quest).join(Level).order_by(Level.order, Quest.order).all()
+        badges = db.query(Badge).all()
+        if not quests:
+            print("❌ Seed the reference data first (run without --synthetic-users)")
+            return
+        
+        if db.query(User).filter(User.username == "synthetic_0").first():
+            print("Synthetic data already seeded")
+            return
+        
+        next_user_id = (db.query(func.max(User.id)).scalar() or 0) + 1
+        next_submission_id = (db.query(func.max(Submission.id)).scalar() or 0) + 1
+        next_user_badge_id = (db.query(func.max(UserBadge.id)).scalar() or 0) + 1
+        next_xp_event_id = (db.query(func.max(XPEvent.id)).scalar() or 0) + 1
+        password_hash = AuthService.get_password_hash("password123")
+        now = datetime(2025, 1, 1)  # fixed so runs are reproducible
+        
+        started = time.perf_counter()
+        total_submissions = 0
+        
+        for chunk_index, chunk_start in enumerate(range(0, n_users, chunk_size)):
+            rng = np.random.default_rng([seed, chunk_index])
+            users, submissions, user_badges, xp_events, period_xp = [], [], [], [], []
+            
+            for index in range(chunk_start, min(chunk_start + chunk_size, n_users)):
+                user, user_submissions, earned, user_xp_events = _generate_user(
+                    rng, index, next_user_id, next_submission_id,
+                    quests, badges, password_hash, now, days
+                )
+                users.append(user)
+                submissions.extend(user_submissions)
+                for badge_id, earned_at in earned:
+                    user_badges.append((next_user_badge_id, next_user_id, badge_id, earned_at))
+                    next_user_badge_id += 1
+                for quest_id, submission_id, amount, created_at in user_xp_events:
+                    xp_events.append((next_xp_event_id, next_user_id, quest_id, submission_id, amount, created_at))
+                    next_xp_event_id += 1
+                totals = period_totals((created_at, amount) for _, _, amount, created_at in user_xp_events)
+                for (period, start), xp in totals.items():
+                    period_xp.append((period, start, next_user_id, xp))
+                
+                next_user_id += 1
+                next_submission_id += len(user_submissions)
+            
+            _bulk_insert(db, User.__table__, USER_COLUMNS, users)
+            _bulk_insert(db, Submission.__table__, SUBMISSION_COLUMNS, submissions)
+            _bulk_insert(db, UserBadge.__table__, USER_BADGE_COLUMNS, user_badges)
+            _bulk_insert(db, XPEvent.__table__, XP_EVENT_COLUMNS, xp_events)
+            _bulk_insert(db, PeriodXP.__table__, PERIOD_XP_COLUMNS, period_xp)
+            db.commit()
+            
+            total_submissions += len(submissions)
+            done = min(chunk_start + chunk_size, n_users)
+            print(f"   {done}/{n_users} users, {total_submissions} submissions "
+                  f"({time.perf_counter() - started:.1f}s)")
+        
+        _reset_sequences(db, [User.__table__, Submission.__table__, UserBadge.__table__, XPEvent.__table__])
+        db.commit()
+        
+        print("   Rebuilding best submissions and progress counters...")
+        rebuild_best_submissions(db.connection())
+        rebuild_user_progress(db.connection())
+        sync_user_completed_quests(db.connection())
+        db.commit()
+        
+        print(f"✅ Seeded {n_users} synthetic users and {total_submissions} submissions")
+    
+    except Exception as e:
+        print(f"❌ Error seeding synthetic data: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
-    print("Initializing database...")
+    parser = argparse.ArgumentParser(description="Initialize and seed the database")
+    parser.add_argument("--synthetic-users", type=int, default=0, help="Bulk-load this many synthetic users")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for synthetic data")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Users generated and inserted per batch")
+    args = parser.parse_args()
+    
+    print("Migrating database...")
     init_db()
     print("Seeding database...")
-    seed_database()
\ No newline at end of file
+    seed_database()
+    
+    if args.synthetic_users:
+        print(f"Seeding {args.synthetic_users} synthetic users...")
+        seed_synthetic_data(args.synthetic_users, seed=args.seed, chunk_size=args.chunk_size)
\ No newline at end of file
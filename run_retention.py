@@ -0,0 +1,62 @@
+"""
+Archive old submissions and delete model files nothing references
+
+Keeps each user's best submission, submissions that awarded XP and the
+latest N per quest in `submissions`; older attempts move to the compressed
+submission_archive table in batches of users, one transaction per batch.
+Also purges expired idempotency keys. Safe to interrupt and to run from cron:
+
+    python run_retention.py --dry-run       # count what would be archived
+    python run_retention.py --pause 0.5     # throttle between batches
+"""
+import argparse
+import time
+from app.database import engine, SessionLocal
+from app.services.idempotency_service import IdempotencyService
+from app.services.retention_service import (
+    RETENTION_KEEP_LATEST,
+    RETENTION_MIN_AGE_DAYS,
+    RETENTION_BATCH_USERS,
+    run_retention,
+)
+
+
+def main(keep_latest, min_age_days, batch_users, pause, dry_run, sweep_uploads):
+    started = time.perf_counter()
+    stats = run_retention(
+        engine,
+        keep_latest=keep_latest,
+        min_age_days=min_age_days,
+        batch_users=batch_users,
+        pause_seconds=pause,
+        sweep_uploads=sweep_uploads,
+        dry_run=dry_run,
+    )
+    
+    if dry_run:
+        print(f"🔎 Would archive {stats['archived']} submissions ({stats['batches']} batches)")
+        return
+    
+    with SessionLocal() as db:
+        purged = IdempotencyService(db).purge_expired()
+    
+    print(
+        f"✅ Archived {stats['archived']} submissions in {stats['batches']} batches, "
+        f"deleted {stats['files_deleted']} upload files and {purged} expired idempotency keys "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old submissions and garbage-collect uploads")
+    parser.add_argument("--keep-latest", type=int, default=RETENTION_KEEP_LATEST,
+                        help="Submissions kept per user and quest besides the best one")
+    parser.add_argument("--min-age-days", type=float, default=RETENTION_MIN_AGE_DAYS,
+                        help="Never archive submissions or delete files younger than this")
+    parser.add_argument("--batch-users", type=int, default=RETENTION_BATCH_USERS, help="Users per transaction")
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="Only count submissions that would be archived")
+    parser.add_argument("--no-sweep", action="store_true", help="Skip scanning the upload directory for orphans")
+    args = parser.parse_args()
+    
+    main(args.keep_latest, args.min_age_days, args.batch_users, args.pause, args.dry_run, not args.no_sweep)
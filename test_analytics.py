@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+
+from app.models import Submission
+from app.services import AnalyticsService, analytics_service
+from app.services.analytics_service import QuestAnalytics
+
+QUEST_ID = 1
+ATTEMPT_KEYS = ("attempts_to_pass", "mean_attempts_to_pass")
+
+
+@pytest.fixture(autouse=True)
+def fresh_analytics(monkeypatch):
+    """Per-worker aggregates are module state; start every test without any"""
+    monkeypatch.setattr(analytics_service, "_analytics", {})
+
+
+def _add(db, *rows):
+    """Insert (id, user_id, score, passed) submissions with explicit ids"""
+    db.add_all([
+        Submission(id=id, user_id=user_id, quest_id=QUEST_ID, model_path="model.pkl", score=score,
+                   passed=passed, evaluation_ms=250, submission_date=datetime(2024, 3, 1))
+        for id, user_id, score, passed in rows
+    ])
+    db.commit()
+
+
+def _from_scratch(db):
+    """Summary of a new aggregate that reads every row once"""
+    analytics = QuestAnalytics(QUEST_ID)
+    AnalyticsService(db)._catch_up(analytics)
+    return _comparable(analytics.summary())
+
+
+def _comparable(summary, ignore=()):
+    return {key: value for key, value in summary.items() if key not in {"refreshed_at", *ignore}}
+
+
+def test_summary_aggregates(db):
+    _add(db, (1, 1, 0.3, False), (2, 1, 0.95, True), (3, 2, 0.85, True), (4, 3, None, False), (5, 1, 0.99, True))
+    
+    summary = AnalyticsService(db).get_quest_analytics(QUEST_ID, refresh=True)
+    
+    assert summary["submissions"] == 5
+    assert summary["passed_submissions"] == 3
+    assert summary["pass_rate"] == 0.6
+    assert (summary["users"], summary["users_passed"]) == (3, 2)
+    assert summary["attempts_to_pass"]["1"] == 1
+    assert summary["attempts_to_pass"]["2"] == 1
+    assert summary["mean_attempts_to_pass"] == 1.5
+    assert sum(summary["score_histogram"]["counts"]) == 4  # the failed evaluation has no score
+    assert summary["evaluation_ms"]["samples"] == 5
+    assert 200 < summary["evaluation_ms"]["median"] < 300
+    assert summary["last_submission_id"] == 5
+
+
+def test_late_committed_rows_are_counted_once(db):
+    service = AnalyticsService(db)
+    _add(db, (1, 1, 0.2, False), (2, 2, 0.9, True), (5, 3, 0.5, False))
+    assert service.get_quest_analytics(QUEST_ID, refresh=True)["submissions"] == 3
+    
+    # Ids 3 and 4 commit after 5 was read, then 6 arrives
+    _add(db, (6, 1, 0.4, False))
+    assert service.get_quest_analytics(QUEST_ID, refresh=True)["submissions"] == 4
+    _add(db, (4, 1, 0.95, True), (3, 3, 0.1, False))
+    
+    summary = service.get_quest_analytics(QUEST_ID, refresh=True)
+    assert summary["submissions"] == 6
+    assert summary["passed_submissions"] == 2
+    assert summary["last_submission_id"] == 6
+    
+    # The late pass counts as user 1's latest attempt (the third), not the second
+    assert summary["attempts_to_pass"]["3"] == 1
+    expected = _from_scratch(db)
+    assert expected["attempts_to_pass"]["2"] == 1
+    assert _comparable(summary, ATTEMPT_KEYS) == _comparable(expected, ATTEMPT_KEYS)
+    
+    # Refreshing again re-reads the window without counting anything twice
+    assert _comparable(service.get_quest_analytics(QUEST_ID, refresh=True)) == _comparable(summary)
+
+
+def test_ids_outside_the_late_window_are_forgotten(db, monkeypatch):
+    monkeypatch.setattr(analytics_service, "ANALYTICS_LATE_WINDOW_IDS", 2)
+    service = AnalyticsService(db)
+    
+    _add(db, *[(id, id, 0.5, False) for id in (1, 2, 4, 5, 6)])
+    service.get_quest_analytics(QUEST_ID, refresh=True)
+    assert analytics_service._analytics[QUEST_ID].recent_ids == {4, 5, 6}
+    
+    # Id 3 commits too late to be seen; id 5 is within the window
+    _add(db, (3, 3, 0.5, False), (7, 7, 0.5, False))
+    summary = service.get_quest_analytics(QUEST_ID, refresh=True)
+    assert summary["submissions"] == 6
+    assert analytics_service._analytics[QUEST_ID].recent_ids == {5, 6, 7}
+
+
+def test_results_are_cached_between_refreshes(db, monkeypatch):
+    monkeypatch.setattr(analytics_service, "ANALYTICS_REFRESH_SECONDS", 60)
+    service = AnalyticsService(db)
+    
+    _add(db, (1, 1, 0.5, False))
+    assert service.get_quest_analytics(QUEST_ID)["submissions"] == 1
+    
+    _add(db, (2, 1, 0.9, True))
+    assert service.get_quest_analytics(QUEST_ID)["submissions"] == 1
+    assert service.get_quest_analytics(QUEST_ID, refresh=True)["submissions"] == 2
+    
+    # Quests without submissions
+    assert service.get_all_quest_analytics([QUEST_ID + 1])[0]["pass_rate"] is None
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import BestSubmission, Submission, User
+from app.services import QuestService
+from app.services.quest_service import rebuild_best_submissions
+
+QUEST_ID = 1
+START = datetime(2024, 3, 1, 12, 0)
+
+
+def _players(db, count):
+    users = [User(username=f"solver{n}", email=f"solver{n}@example.com", hashed_password="x") for n in range(count)]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _submit(db, user, score, minutes, quest_id=QUEST_ID):
+    """Record a submission the way QuestService.submit_quest does"""
+    submission = Submission(
+        user_id=user.id, quest_id=quest_id, model_path="model.pkl", score=score,
+        passed=score is not None and score >= 0.8, submission_date=START + timedelta(minutes=minutes),
+    )
+    db.add(submission)
+    db.flush()
+    QuestService(db)._record_best_submission(submission)
+    db.commit()
+    return submission
+
+
+def _best_rows(db):
+    return db.execute(
+        select(
+            BestSubmission.user_id, BestSubmission.quest_id, BestSubmission.score,
+            BestSubmission.submission_id, BestSubmission.submitted_at,
+            BestSubmission.passed, BestSubmission.attempts,
+        ).order_by(BestSubmission.user_id, BestSubmission.quest_id)
+    ).all()
+
+
+def test_upsert_keeps_the_earliest_best_attempt(db, engine):
+    alice, bob = _players(db, 2)
+    
+    failed = _submit(db, alice, None, 0)
+    assert _best_rows(db) == [(alice.id, QUEST_ID, None, failed.id, failed.submission_date, False, 1)]
+    
+    first_best = _submit(db, alice, 0.9, 1)
+    _submit(db, alice, 0.9, 2)  # ties do not replace the earlier attempt
+    _submit(db, alice, 0.7, 3)
+    _submit(db, alice, None, 4)
+    _submit(db, bob, 0.5, 5)
+    _submit(db, bob, 0.6, 6, quest_id=QUEST_ID + 1)
+    
+    upserted = _best_rows(db)
+    assert upserted[0] == (alice.id, QUEST_ID, 0.9, first_best.id, first_best.submission_date, True, 5)
+    assert [row.passed for row in upserted[1:]] == [False, False]
+    
+    # The upserts agree with a rebuild from the submission history
+    with engine.begin() as connection:
+        rebuild_best_submissions(connection)
+    db.expire_all()
+    assert _best_rows(db) == upserted
+
+
+def test_quest_leaderboard_ranks_ties_by_submission_time(db):
+    users = _players(db, 5)
+    # (score, minutes): users 1 and 3 tie on score, user 3 reached it first
+    for user, (score, minutes) in zip(users, [(0.7, 0), (0.9, 5), (0.95, 1), (0.9, 3), (None, 0)]):
+        _submit(db, user, score, minutes)
+    _submit(db, users[1], 0.9, 0)  # a repeated score keeps the first attempt's time
+    
+    service = QuestService(db)
+    leaderboard = service.get_quest_leaderboard(QUEST_ID)
+    
+    assert [entry["user_id"] for entry in leaderboard] == [users[2].id, users[3].id, users[1].id, users[0].id]
+    assert [entry["rank"] for entry in leaderboard] == [1, 2, 3, 4]
+    assert [entry["attempts"] for entry in leaderboard] == [1, 1, 2, 1]
+    for entry in leaderboard:
+        assert service.get_user_quest_rank(entry["user_id"], QUEST_ID) == entry["rank"]
+    
+    # Unscored attempts are not ranked
+    assert service.get_user_quest_rank(users[4].id, QUEST_ID) is None
+    assert service.get_user_quest_rank(users[0].id, QUEST_ID + 1) is None
+    assert len(service.get_quest_leaderboard(QUEST_ID, limit=2)) == 2
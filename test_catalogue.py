@@ -0,0 +1,108 @@
+import orjson
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import select
+
+from app.models import BestSubmission, CatalogueVersion, Level, Quest, User
+from app.routes import quests
+from app.services import quest_catalogue
+
+
+@pytest.fixture
+def catalogue(db):
+    """A level with two quests (levels are kept between tests, so it is removed afterwards)"""
+    quest_catalogue.invalidate()
+    level = Level(name="Catalogue Basics", order=1000, required_xp=0)
+    level.quests = [
+        Quest(title=f"Quest {n}", description="Fit a model", task_type="classification", order=n,
+              xp_reward=100, dataset_name="iris.csv", metric_name="accuracy", threshold=0.9)
+        for n in (1, 2)
+    ]
+    user = User(username="cataloguer", email="cataloguer@example.com", hashed_password="x")
+    db.add_all([level, user])
+    db.commit()
+    
+    yield user, level.quests
+    
+    db.rollback()
+    db.delete(level)
+    db.commit()
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/quests", "headers": headers})
+
+
+def _get_quests(db, user, if_none_match=None):
+    return quests.get_quests(request=_request(if_none_match), current_user=user, db=db)
+
+
+def test_matching_etag_returns_not_modified(db, catalogue):
+    user, _ = catalogue
+    
+    response = _get_quests(db, user)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == quests.CATALOGUE_CACHE_CONTROL
+    assert [quest["title"] for quest in orjson.loads(response.body)] == ["Quest 1", "Quest 2"]
+    
+    # Weak comparison, also against a list of candidates and "*"
+    for if_none_match in (etag, etag.removeprefix("W/"), f'W/"stale", {etag}', "*"):
+        not_modified = _get_quests(db, user, if_none_match)
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+        assert not_modified.headers["ETag"] == etag
+    
+    assert _get_quests(db, user, 'W/"stale"').status_code == 200
+
+
+def test_quest_edit_bumps_version_and_etag(db, catalogue):
+    user, (first, _) = catalogue
+    etag = _get_quests(db, user).headers["ETag"]
+    version = db.execute(select(CatalogueVersion.version)).scalar()
+    
+    first.title = "Renamed"
+    db.commit()
+    
+    assert db.execute(select(CatalogueVersion.version)).scalar() == version + 1
+    response = _get_quests(db, user, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert orjson.loads(response.body)[0]["title"] == "Renamed"
+
+
+def test_user_progress_changes_etag(db, catalogue):
+    user, (first, _) = catalogue
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db.add(other)
+    db.commit()
+    
+    etag = _get_quests(db, user).headers["ETag"]
+    assert _get_quests(db, other).headers["ETag"] != etag  # per-user overlay
+    
+    db.add(BestSubmission(user_id=user.id, quest_id=first.id, score=0.95, passed=True, attempts=1))
+    db.commit()
+    
+    response = _get_quests(db, user, etag)
+    assert response.status_code == 200
+    body = orjson.loads(response.body)
+    assert body[0]["user_completed"] is True
+    assert body[0]["best_score"] == 0.95
+    assert body[1]["user_completed"] is False
+
+
+def test_single_quest_etag(db, catalogue):
+    user, (first, second) = catalogue
+    
+    response = quests.get_quest(quest_id=first.id, request=_request(), current_user=user, db=db)
+    etag = response.headers["ETag"]
+    assert orjson.loads(response.body)["title"] == "Quest 1"
+    
+    assert quests.get_quest(quest_id=first.id, request=_request(etag), current_user=user, db=db).status_code == 304
+    assert quests.get_quest(quest_id=second.id, request=_request(etag), current_user=user, db=db).status_code == 200
+    
+    with pytest.raises(HTTPException) as error:
+        quests.get_quest(quest_id=second.id + 1, request=_request(), current_user=user, db=db)
+    assert error.value.status_code == 404
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from app.services.evaluation_scheduler import (
+    EvaluationScheduler,
+    QueueFullError,
+    PRIORITY_FIRST_ATTEMPT,
+    PRIORITY_RESUBMISSION,
+)
+
+GATE_USER_ID = 999
+TIMEOUT = 5
+
+
+class Gate:
+    """A job that occupies a worker until released, so the jobs behind it queue up"""
+    
+    def __init__(self, scheduler: EvaluationScheduler):
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.job = scheduler.submit(GATE_USER_ID, PRIORITY_FIRST_ATTEMPT, self._hold)
+        assert self.started.wait(TIMEOUT)
+    
+    def _hold(self):
+        self.started.set()
+        self.released.wait(TIMEOUT)
+    
+    def release(self):
+        self.released.set()
+        self.job.future.result(TIMEOUT)
+
+
+def _record(order, label):
+    order.append(label)
+    return label
+
+
+def test_users_are_served_round_robin():
+    scheduler = EvaluationScheduler(workers=1, user_concurrency=1, user_queue_limit=10)
+    order = []
+    
+    gate = Gate(scheduler)
+    jobs = [
+        scheduler.submit(user_id, PRIORITY_FIRST_ATTEMPT, _record, args=(order, f"{name}{n}"))
+        for user_id, name, count in ((1, "a", 3), (2, "b", 2), (3, "c", 1))
+        for n in range(1, count + 1)
+    ]
+    gate.release()
+    for job in jobs:
+        job.future.result(TIMEOUT)
+    
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_first_attempts_are_served_before_resubmissions():
+    scheduler = EvaluationScheduler(workers=1, user_concurrency=1, user_queue_limit=10)
+    order = []
+    
+    gate = Gate(scheduler)
+    jobs = [
+        scheduler.submit(1, PRIORITY_RESUBMISSION, _record, args=(order, "a-resubmission-1")),
+        scheduler.submit(1, PRIORITY_RESUBMISSION, _record, args=(order, "a-resubmission-2")),
+        scheduler.submit(2, PRIORITY_RESUBMISSION, _record, args=(order, "b-resubmission")),
+        scheduler.submit(1, PRIORITY_FIRST_ATTEMPT, _record, args=(order, "a-first")),
+        scheduler.submit(3, PRIORITY_FIRST_ATTEMPT, _record, args=(order, "c-first")),
+    ]
+    gate.release()
+    for job in jobs:
+        job.future.result(TIMEOUT)
+    
+    assert order == ["a-first", "c-first", "a-resubmission-1", "b-resubmission", "a-resubmission-2"]
+
+
+def test_user_queue_limit_rejects_with_retry_after():
+    scheduler = EvaluationScheduler(workers=1, user_concurrency=1, user_queue_limit=2)
+    
+    # One running and two waiting for the same user
+    started = threading.Event()
+    released = threading.Event()
+    running = scheduler.submit(1, PRIORITY_FIRST_ATTEMPT, lambda: (started.set(), released.wait(TIMEOUT)))
+    assert started.wait(TIMEOUT)
+    waiting = [scheduler.submit(1, PRIORITY_FIRST_ATTEMPT, lambda: None) for _ in range(2)]
+    
+    try:
+        with pytest.raises(QueueFullError) as error:
+            scheduler.submit(1, PRIORITY_FIRST_ATTEMPT, lambda: None)
+        
+        # Three jobs ahead at the initial 5 second estimate, one at a time
+        assert error.value.retry_after == 15
+        
+        # Other users are not affected
+        other = scheduler.submit(2, PRIORITY_FIRST_ATTEMPT, lambda: None)
+    finally:
+        released.set()
+    
+    for job in [running, *waiting, other]:
+        job.future.result(TIMEOUT)
+    
+    user = next(user for user in scheduler.stats()["users"] if user["user_id"] == 1)
+    assert user["submitted"] == 3
+    assert user["rejected"] == 1
+
+
+def test_global_queue_limit_rejects_with_retry_after():
+    scheduler = EvaluationScheduler(workers=1, user_concurrency=1, user_queue_limit=10, queue_limit=2)
+    
+    gate = Gate(scheduler)
+    try:
+        jobs = [scheduler.submit(user_id, PRIORITY_FIRST_ATTEMPT, lambda: None) for user_id in (1, 2)]
+        with pytest.raises(QueueFullError) as error:
+            scheduler.submit(3, PRIORITY_FIRST_ATTEMPT, lambda: None)
+        
+        assert error.value.retry_after == 10
+        assert scheduler.stats()["queued"] == 2
+    finally:
+        gate.release()
+    
+    for job in jobs:
+        job.future.result(TIMEOUT)
+
+
+def test_wait_time_is_recorded():
+    scheduler = EvaluationScheduler(workers=1, user_concurrency=1, user_queue_limit=10)
+    started_in_worker = []
+    
+    gate = Gate(scheduler)
+    job = scheduler.submit(
+        1, PRIORITY_FIRST_ATTEMPT, lambda: "done",
+        on_start=lambda: started_in_worker.append(threading.current_thread().name)
+    )
+    time.sleep(0.2)
+    
+    stats = scheduler.stats()
+    assert stats["queued"] == 1
+    assert stats["running"] == 1
+    assert stats["queued_by_priority"] == {"first_attempt": 1, "resubmission": 0}
+    
+    gate.release()
+    assert job.future.result(TIMEOUT) == "done"
+    assert job.wait_seconds >= 0.2
+    assert started_in_worker == ["evaluation-0"]
+    
+    user = next(user for user in scheduler.stats()["users"] if user["user_id"] == 1)
+    assert user["submitted"] == 1
+    assert user["rejected"] == 0
+    assert user["mean_wait_ms"] >= 200
+    assert user["max_wait_ms"] == user["mean_wait_ms"]
@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+
+from app import events
+from app.events import EventBroker, TooManyStreamsError, event_broker, format_sse
+from app.models import Submission, User
+from app.routes import quests
+from app.routes import user as user_routes
+
+TIMEOUT = 5
+
+
+def _drain(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_messages_reach_every_stream_of_the_user():
+    broker = EventBroker()
+    first, second = broker.subscribe(1), broker.subscribe(1)
+    other = broker.subscribe(2)
+    
+    broker.publish(1, "submission", {"state": "queued"})
+    # From a threadpool thread, as the submission flow does
+    await asyncio.to_thread(broker.publish, 1, "badge", {"id": 3})
+    assert await asyncio.wait_for(second.get(), TIMEOUT) == (1, "submission", {"state": "queued"})
+    assert await asyncio.wait_for(second.get(), TIMEOUT) == (2, "badge", {"id": 3})
+    
+    assert _drain(first) == [(1, "submission", {"state": "queued"}), (2, "badge", {"id": 3})]
+    assert other.empty()
+    
+    broker.unsubscribe(1, first)
+    broker.unsubscribe(1, second)
+    assert not broker.has_subscribers(1)
+    assert broker.stream_count() == 1
+    
+    # Nobody listening: dropped without using an id
+    broker.publish(1, "submission", {})
+    broker.publish(2, "submission", {})
+    assert other.get_nowait()[0] == 3
+
+
+@pytest.mark.asyncio
+async def test_slow_stream_drops_oldest_messages():
+    broker = EventBroker(queue_size=2)
+    queue = broker.subscribe(1)
+    
+    for n in range(4):
+        broker.publish(1, "tick", n)
+    
+    assert [data for _, _, data in _drain(queue)] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_streams_per_user_are_limited(monkeypatch):
+    monkeypatch.setattr(events, "SSE_MAX_STREAMS_PER_USER", 2)
+    broker = EventBroker()
+    queues = [broker.subscribe(1), broker.subscribe(1)]
+    
+    with pytest.raises(TooManyStreamsError):
+        broker.subscribe(1)
+    broker.subscribe(2)
+    
+    broker.unsubscribe(1, queues[0])
+    broker.subscribe(1)
+
+
+def test_format_sse():
+    assert format_sse((7, "rank", {"rank": 2, "xp": 150})) == b'id: 7\nevent: rank\ndata: {"rank":2,"xp":150}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_stream_route_sends_events_and_heartbeats(monkeypatch):
+    monkeypatch.setattr(user_routes, "SSE_HEARTBEAT_SECONDS", 0.05)
+    disconnected = asyncio.Event()
+    
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+    
+    request = Request({"type": "http", "method": "GET", "path": "/user/events", "headers": []}, receive)
+    response = await user_routes.stream_user_events(request=request, user_id=41)
+    body = response.body_iterator
+    
+    assert response.media_type == "text/event-stream"
+    assert response.headers["X-Accel-Buffering"] == "no"
+    assert await asyncio.wait_for(anext(body), TIMEOUT) == b"retry: 3000\n\n"
+    assert await asyncio.wait_for(anext(body), TIMEOUT) == b": keepalive\n\n"
+    
+    event_broker.publish(41, "submission", {"state": "evaluating"})
+    chunk = await asyncio.wait_for(anext(body), TIMEOUT)
+    assert chunk.endswith(b'event: submission\ndata: {"state":"evaluating"}\n\n')
+    
+    # The stream ends on disconnect and unsubscribes
+    disconnected.set()
+    with pytest.raises(StopAsyncIteration):
+        while True:
+            await asyncio.wait_for(anext(body), TIMEOUT)
+    assert not event_broker.has_subscribers(41)
+
+
+@pytest.mark.asyncio
+async def test_submission_result_badges_and_rank_are_published(db):
+    player = User(username="streamer", email="streamer@example.com", hashed_password="x", xp=150)
+    leader = User(username="leader", email="leader@example.com", hashed_password="x", xp=500)
+    db.add_all([player, leader])
+    db.commit()
+    submission = Submission(user_id=player.id, quest_id=1, model_path="model.pkl", score=0.97, passed=True, xp_awarded=100)
+    db.add(submission)
+    db.commit()
+    badge = SimpleNamespace(id=1, name="First Steps", description="Pass a quest", icon="🎯")
+    
+    queue = event_broker.subscribe(player.id)
+    try:
+        await asyncio.to_thread(quests._publish_submission_events, db, player, submission, [badge])
+        messages = [await asyncio.wait_for(queue.get(), TIMEOUT) for _ in range(3)]
+    finally:
+        event_broker.unsubscribe(player.id, queue)
+    
+    assert [(event, data) for _, event, data in messages] == [
+        ("submission", {"state": "evaluated", "id": submission.id, "quest_id": 1,
+                        "score": 0.97, "passed": True, "xp_awarded": 100}),
+        ("badge", {"id": 1, "name": "First Steps", "description": "Pass a quest", "icon": "🎯"}),
+        ("rank", {"rank": 2, "xp": 150, "level": player.level}),
+    ]
@@ -0,0 +1,107 @@
+import csv
+import gzip
+import io
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+from app.models import Submission, SubmissionArchive, User
+from app.routes import admin
+from app.services import export_service
+from app.services.export_service import (
+    SUBMISSION_EXPORT_COLUMNS,
+    encode_csv,
+    encode_ndjson,
+    gzip_chunks,
+    iter_leaderboard,
+    iter_submissions,
+)
+from app.services.retention_service import pack_payload
+
+START = datetime(2024, 3, 1)
+
+
+@pytest.fixture
+def history(db):
+    """Hot submissions 1, 3, 4 and archived submissions 2, 5 (quest 1 for even ids, quest 2 for odd ones)"""
+    db.add_all([
+        Submission(id=id, user_id=7, quest_id=id % 2 + 1, model_path="model.pkl", score=id / 10,
+                   passed=id >= 3, xp_awarded=0, evaluation_ms=100 * id, submission_date=START + timedelta(days=id))
+        for id in (1, 3, 4)
+    ])
+    db.add_all([
+        SubmissionArchive(id=id, user_id=7, quest_id=id % 2 + 1, score=id / 10, passed=id >= 3, xp_awarded=0,
+                          evaluation_ms=100 * id, submission_date=START + timedelta(days=id),
+                          payload=pack_payload({"model_path": "old.pkl", "evaluation_logs": None,
+                                                "metrics": None, "stage_timings": None}))
+        for id in (2, 5)
+    ])
+    db.commit()
+
+
+def test_submissions_stream_in_id_order_with_archived_rows(history):
+    rows = list(iter_submissions())
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert list(rows[0]) == SUBMISSION_EXPORT_COLUMNS
+    assert rows[1] == {
+        "id": 2, "user_id": 7, "quest_id": 1, "submission_date": START + timedelta(days=2),
+        "score": 0.2, "passed": False, "xp_awarded": 0, "evaluation_ms": 200,
+    }
+    
+    assert [row["id"] for row in iter_submissions(include_archived=False)] == [1, 3, 4]
+    assert [row["id"] for row in iter_submissions(quest_id=2)] == [1, 3, 5]
+    assert [row["id"] for row in iter_submissions(passed=True)] == [3, 4, 5]
+    since, until = START + timedelta(days=2), START + timedelta(days=4)
+    assert [row["id"] for row in iter_submissions(since=since, until=until)] == [2, 3]
+
+
+def test_leaderboard_streams_every_user_in_order(db):
+    db.add_all([
+        User(username=name, email=f"{name}@example.com", hashed_password="x", xp=xp, completed_quests=completed)
+        for name, xp, completed in (("low", 10, 0), ("top", 90, 1), ("tied", 90, 2))
+    ])
+    db.commit()
+    
+    assert [(row["rank"], row["username"]) for row in iter_leaderboard()] == [(1, "tied"), (2, "top"), (3, "low")]
+
+
+def test_encoders_flush_in_chunks(monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_CHUNK_BYTES", 64)
+    rows = [{"id": n, "name": f"row,{n}", "score": n / 3} for n in range(20)]
+    
+    chunks = list(encode_ndjson(iter(rows)))
+    assert len(chunks) > 1
+    assert [orjson.loads(line) for line in b"".join(chunks).splitlines()] == rows
+    
+    chunks = list(encode_csv(iter(rows), ["id", "name", "score"]))
+    assert len(chunks) > 1
+    parsed = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["name"] for row in parsed] == [row["name"] for row in rows]
+    assert float(parsed[-1]["score"]) == rows[-1]["score"]
+    
+    assert list(encode_ndjson([])) == []
+    assert b"".join(encode_csv([], ["id"])) == b"id\r\n"
+
+
+def test_gzip_chunks_round_trip():
+    chunks = [b"x" * 100_000, b"", b"tail\n"]
+    assert gzip.decompress(b"".join(gzip_chunks(iter(chunks)))) == b"".join(chunks)
+    assert gzip.decompress(b"".join(gzip_chunks([]))) == b""
+
+
+@pytest.mark.asyncio
+async def test_export_route_streams_gzipped_csv(history):
+    response = admin.export_submissions(
+        fmt="csv", gzip=True, quest_id=1, since=None, until=None, passed=None, include_archived=True, admin=None
+    )
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    
+    assert response.media_type == "application/gzip"
+    assert response.headers["Content-Disposition"].endswith('.csv.gz"')
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(body).decode())))
+    assert [row["id"] for row in rows] == ["2", "4"]
+    
+    response = admin.export_leaderboard(fmt="ndjson", gzip=False, admin=None)
+    assert response.media_type == "application/x-ndjson"
+    assert b"".join([chunk async for chunk in response.body_iterator]) == b""
@@ -0,0 +1,135 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.models import IdempotencyKey, User
+from app.routes import quests
+from app.services.idempotency_service import in_flight_requests
+
+QUEST_ID = 1
+
+# Deprecated status constants (e.g. HTTP_422_UNPROCESSABLE_ENTITY) fail the tests
+pytestmark = pytest.mark.filterwarnings("error:'HTTP_")
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="idempotent", email="idempotent@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+class FakeSubmissions:
+    """Stands in for _run_submission: counts evaluations and can hold or fail them"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.entered = asyncio.Event()
+        self.release = asyncio.Event()
+        self.release.set()
+        self.fail_next = False
+    
+    async def __call__(self, db, user, quest_id, model_file):
+        self.calls += 1
+        self.entered.set()
+        await self.release.wait()
+        if self.fail_next:
+            self.fail_next = False
+            raise HTTPException(status_code=500, detail="Submission failed: evaluator crashed")
+        return {"id": self.calls, "quest_id": quest_id, "score": 0.9, "passed": True, "xp_awarded": 100}, 0.0
+
+
+@pytest.fixture
+def submissions(monkeypatch):
+    fake = FakeSubmissions()
+    monkeypatch.setattr(quests, "_run_submission", fake)
+    return fake
+
+
+def _submit(db, user, key, content=b"model bytes"):
+    return quests.submit_quest(
+        quest_id=QUEST_ID,
+        model_file=UploadFile(file=io.BytesIO(content), filename="model.pkl"),
+        idempotency_key=key,
+        current_user=user,
+        db=db,
+    )
+
+
+@pytest.mark.asyncio
+async def test_replay_returns_stored_body(db, user, submissions):
+    first = await _submit(db, user, "replay")
+    replay = await _submit(db, user, "replay")
+    
+    assert submissions.calls == 1
+    assert replay.body == first.body
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    
+    row = db.get(IdempotencyKey, (user.id, "replay"))
+    assert row.submission_id == 1
+    assert row.response["score"] == 0.9
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_awaits_same_future(db, user, submissions):
+    submissions.release.clear()
+    first = asyncio.create_task(_submit(db, user, "concurrent"))
+    await asyncio.wait_for(submissions.entered.wait(), 5)
+    
+    duplicate = asyncio.create_task(_submit(db, user, "concurrent"))
+    await asyncio.sleep(0.2)
+    
+    # Still waiting on the first request (a stored-key lookup would have failed with 409)
+    assert not duplicate.done()
+    assert in_flight_requests.get(user.id, "concurrent") is not None
+    
+    submissions.release.set()
+    first, duplicate = await asyncio.wait_for(asyncio.gather(first, duplicate), 5)
+    
+    assert submissions.calls == 1
+    assert duplicate.body == first.body
+    assert duplicate.headers["Idempotent-Replayed"] == "true"
+    assert in_flight_requests.get(user.id, "concurrent") is None
+
+
+@pytest.mark.asyncio
+async def test_fingerprint_mismatch_is_rejected(db, user, submissions):
+    # While the first request is in flight
+    submissions.release.clear()
+    first = asyncio.create_task(_submit(db, user, "mismatch"))
+    await asyncio.wait_for(submissions.entered.wait(), 5)
+    
+    with pytest.raises(HTTPException) as error:
+        await _submit(db, user, "mismatch", content=b"another model")
+    assert error.value.status_code == 422
+    
+    submissions.release.set()
+    await asyncio.wait_for(first, 5)
+    
+    # And once it is stored
+    with pytest.raises(HTTPException) as error:
+        await _submit(db, user, "mismatch", content=b"another model")
+    assert error.value.status_code == 422
+    assert submissions.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_key_is_released_after_failed_evaluation(db, user, submissions):
+    submissions.fail_next = True
+    with pytest.raises(HTTPException) as error:
+        await _submit(db, user, "retry")
+    assert error.value.status_code == 500
+    
+    db.expire_all()
+    assert db.get(IdempotencyKey, (user.id, "retry")) is None
+    assert in_flight_requests.get(user.id, "retry") is None
+    
+    retried = await _submit(db, user, "retry")
+    
+    assert submissions.calls == 2
+    assert "Idempotent-Replayed" not in retried.headers
+    assert db.get(IdempotencyKey, (user.id, "retry")).submission_id == 2
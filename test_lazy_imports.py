@@ -0,0 +1,10 @@
+from benchmarks.bench_import import probe
+
+
+def test_api_workers_start_without_the_ml_stack():
+    assert probe("app.main")["heavy"] == []
+
+
+def test_evaluator_still_brings_the_ml_stack():
+    # Guards the check above against a probe that can no longer see the imports
+    assert {"numpy", "pandas", "sklearn", "joblib"} <= set(probe("app.ml_engine.evaluator")["heavy"])
@@ -0,0 +1,79 @@
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.models import User
+from app.routes import leaderboard as leaderboard_routes
+from app.services import LeaderboardService, leaderboard_cache
+
+# (xp, completed quests) per user, in id order: ties on xp and on both keys
+STATS = [(300, 2), (500, 1), (300, 3), (300, 2), (100, 0), (500, 1), (0, 0)]
+
+
+def _seed(db):
+    users = [
+        User(username=f"player{n}", email=f"player{n}@example.com", hashed_password="x", xp=xp, completed_quests=completed)
+        for n, (xp, completed) in enumerate(STATS)
+    ]
+    db.add_all(users)
+    db.commit()
+    leaderboard_cache.invalidate()
+    return users
+
+
+def _expected_order(users):
+    return [user.id for user in sorted(users, key=lambda user: (-user.xp, -user.completed_quests, user.id))]
+
+
+def test_keyset_pages_continue_order_and_ranks(db):
+    users = _seed(db)
+    service = LeaderboardService(db)
+    
+    entries, after = [], None
+    while True:
+        page = service.get_leaderboard(limit=2, after=after)
+        entries.extend(page)
+        if len(page) < 2:
+            break
+        last = page[-1]
+        after = (last["xp"], last["completed_quests"], last["user_id"], last["rank"])
+    
+    assert [entry["user_id"] for entry in entries] == _expected_order(users)
+    assert [entry["rank"] for entry in entries] == list(range(1, len(users) + 1))
+    assert entries == service.get_leaderboard(limit=100)
+
+
+def test_user_rank_matches_the_listed_rank(db):
+    users = _seed(db)
+    service = LeaderboardService(db)
+    
+    for entry in service.get_leaderboard(limit=100):
+        assert service.get_user_rank(entry["user_id"]) == entry["rank"]
+    assert service.get_user_rank(max(user.id for user in users) + 1) is None
+
+
+def test_route_cursor_round_trip(db):
+    users = _seed(db)
+    current_user = users[0]
+    
+    seen, cursor = [], None
+    while True:
+        response = leaderboard_routes.get_leaderboard(limit=3, cursor=cursor, current_user=current_user, db=db)
+        body = orjson.loads(response.body)
+        seen.extend(body["leaderboard"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    
+    assert [entry["user_id"] for entry in seen] == _expected_order(users)
+    assert [entry["rank"] for entry in seen] == list(range(1, len(users) + 1))
+    assert body["user_rank"] == next(entry["rank"] for entry in seen if entry["user_id"] == current_user.id)
+
+
+def test_malformed_cursor_is_rejected(db):
+    users = _seed(db)
+    
+    for cursor in ("not-a-cursor", "WzEsMiwzXQ"):  # garbage, and [1,2,3] with too few values
+        with pytest.raises(HTTPException) as error:
+            leaderboard_routes.get_leaderboard(limit=3, cursor=cursor, current_user=users[0], db=db)
+        assert error.value.status_code == 400
@@ -0,0 +1,147 @@
+import sys
+import threading
+
+import pytest
+from sqlalchemy import update
+
+from app.models import User
+from app.services.leaderboard_cache import LeaderboardCache, leaderboard_cache
+
+TIMEOUT = 5
+
+# The module, which app.services shadows with the cache instance of the same name
+cache_module = sys.modules[LeaderboardCache.__module__]
+
+
+class FakeLeaderboard:
+    """Stands in for LeaderboardService: counts computations and can hold them"""
+    
+    def __init__(self):
+        self.calls = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.version = 1
+    
+    def __call__(self, db):
+        return self
+    
+    def get_leaderboard(self, limit):
+        self.calls.append(limit)
+        version = self.version
+        self.entered.set()
+        assert self.release.wait(TIMEOUT)
+        return [{"user_id": n, "version": version} for n in range(1, 21)]
+
+
+@pytest.fixture
+def computations(monkeypatch):
+    fake = FakeLeaderboard()
+    monkeypatch.setattr(cache_module, "LeaderboardService", fake)
+    return fake
+
+
+def test_snapshots_are_shared_per_bucket(computations):
+    cache = LeaderboardCache(ttl=60)
+    
+    assert len(cache.get_leaderboard(None, limit=5)) == 5
+    assert len(cache.get_leaderboard(None, limit=10)) == 10
+    assert len(cache.get_leaderboard(None, limit=20)) == 20
+    
+    # 5 and 10 share the 10 bucket; 20 rounds up to 50
+    assert computations.calls == [10, 50]
+    assert LeaderboardCache.bucket_for(1000) == 1000
+
+
+def test_invalidate_and_ttl_force_recompute(computations):
+    cache = LeaderboardCache(ttl=60)
+    cache.get_leaderboard(None, limit=10)
+    
+    computations.version = 2
+    assert cache.get_leaderboard(None, limit=10)[0]["version"] == 1
+    cache.invalidate()
+    assert cache.get_leaderboard(None, limit=10)[0]["version"] == 2
+    
+    expiring = LeaderboardCache(ttl=0)
+    expiring.get_leaderboard(None, limit=10)
+    expiring.get_leaderboard(None, limit=10)
+    assert len(computations.calls) == 4
+
+
+def test_stale_snapshot_is_served_while_revalidating(computations):
+    cache = LeaderboardCache(ttl=60)
+    cache.get_leaderboard(None, limit=10)
+    cache.invalidate()
+    
+    computations.version = 2
+    computations.entered.clear()
+    computations.release.clear()
+    refreshed = []
+    refresh = threading.Thread(target=lambda: refreshed.extend(cache.get_leaderboard(None, limit=10)))
+    refresh.start()
+    assert computations.entered.wait(TIMEOUT)
+    
+    # Another request does not wait for, or repeat, the recomputation
+    assert cache.get_leaderboard(None, limit=10)[0]["version"] == 1
+    assert len(computations.calls) == 2
+    
+    computations.release.set()
+    refresh.join(TIMEOUT)
+    assert refreshed[0]["version"] == 2
+    assert cache.get_leaderboard(None, limit=10)[0]["version"] == 2
+    assert len(computations.calls) == 2
+
+
+def test_cold_miss_waits_for_the_inflight_computation(computations):
+    cache = LeaderboardCache(ttl=60)
+    computations.release.clear()
+    
+    results = [[], []]
+    threads = [
+        threading.Thread(target=lambda result=result: result.extend(cache.get_leaderboard(None, limit=10)))
+        for result in results
+    ]
+    threads[0].start()
+    assert computations.entered.wait(TIMEOUT)
+    threads[1].start()
+    
+    computations.release.set()
+    for thread in threads:
+        thread.join(TIMEOUT)
+    
+    assert len(computations.calls) == 1
+    assert results[0] == results[1] != []
+
+
+def test_committed_xp_change_invalidates_the_shared_cache(db):
+    player = User(username="climber", email="climber@example.com", hashed_password="x", xp=10)
+    rival = User(username="rival", email="rival@example.com", hashed_password="x", xp=50)
+    db.add_all([player, rival])
+    db.commit()
+    leaderboard_cache.invalidate()
+    
+    assert [entry["user_id"] for entry in leaderboard_cache.get_leaderboard(db, limit=10)] == [rival.id, player.id]
+    
+    # Writes that bypass the session events are not seen until the snapshot expires
+    db.execute(update(User).where(User.id == player.id).values(xp=60))
+    db.commit()
+    assert leaderboard_cache.get_leaderboard(db, limit=10)[0]["user_id"] == rival.id
+    
+    # A rolled back award leaves the snapshot fresh
+    db.expire_all()
+    player.xp = 100
+    db.flush()
+    db.rollback()
+    assert leaderboard_cache.get_leaderboard(db, limit=10)[0]["user_id"] == rival.id
+    
+    # A committed one invalidates it
+    player.xp = 100
+    db.commit()
+    top = leaderboard_cache.get_leaderboard(db, limit=10)[0]
+    assert (top["user_id"], top["xp"]) == (player.id, 100)
+    
+    # So does a new user
+    newcomer = User(username="newcomer", email="newcomer@example.com", hashed_password="x", xp=0)
+    db.add(newcomer)
+    db.commit()
+    assert newcomer.id in [entry["user_id"] for entry in leaderboard_cache.get_leaderboard(db, limit=10)]
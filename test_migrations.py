@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+from app import migrations
+from app.models import BestSubmission, Submission, User, UserProgress, XPEvent
+
+# The schema create_all produced before migrations existed
+BASELINE_SCHEMA = """
+CREATE TABLE levels (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, description TEXT,
+    "order" INTEGER NOT NULL UNIQUE, required_xp INTEGER
+);
+CREATE TABLE users (
+    id INTEGER NOT NULL PRIMARY KEY, username VARCHAR NOT NULL, email VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL, xp INTEGER, level INTEGER, current_streak INTEGER,
+    last_activity_date DATETIME, is_active BOOLEAN, created_at DATETIME, updated_at DATETIME
+);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE quests (
+    id INTEGER NOT NULL PRIMARY KEY, level_id INTEGER NOT NULL REFERENCES levels (id),
+    title VARCHAR NOT NULL, description TEXT NOT NULL, task_type VARCHAR NOT NULL,
+    "order" INTEGER NOT NULL, xp_reward INTEGER, dataset_name VARCHAR NOT NULL,
+    metric_name VARCHAR NOT NULL, threshold FLOAT NOT NULL, config JSON
+);
+CREATE TABLE badges (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, description TEXT NOT NULL,
+    icon VARCHAR, condition_type VARCHAR NOT NULL, condition_value INTEGER NOT NULL
+);
+CREATE TABLE user_badges (
+    id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    badge_id INTEGER NOT NULL REFERENCES badges (id), earned_at DATETIME
+);
+CREATE TABLE submissions (
+    id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id),
+    quest_id INTEGER NOT NULL REFERENCES quests (id), model_path VARCHAR NOT NULL,
+    submission_date DATETIME, score FLOAT, passed BOOLEAN, evaluation_logs TEXT, xp_awarded INTEGER
+);
+"""
+
+LEGACY_LOGS = (
+    "Metric: accuracy\n"
+    "Score: 0.9333\n"
+    "Additional metrics: {'accuracy': 0.9333333333333333, 'f1_score': np.float64(0.9326599326599326)}"
+)
+
+
+def test_baseline_database_upgrades_to_current_schema(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    monkeypatch.setattr(migrations, "engine", engine)
+    
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA.split(";"):
+            if statement.strip():
+                connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO users (id, username, email, hashed_password, xp, level) "
+            "VALUES (1, 'ada', 'ada@example.com', 'x', 100, 2), (2, 'bob', 'bob@example.com', 'x', 0, 1)"
+        )
+        connection.execute(text(
+            "INSERT INTO submissions (id, user_id, quest_id, model_path, submission_date, score, passed, evaluation_logs, xp_awarded) VALUES "
+            "(1, 1, 1, 'a.pkl', '2024-01-01 10:00:00', 0.5, 0, 'Metric: accuracy\nScore: 0.5000\nAdditional metrics: {}', 0), "
+            "(2, 1, 1, 'b.pkl', '2024-01-02 10:00:00', 0.9333, 1, :logs, 100), "
+            "(3, 2, 1, 'c.pkl', '2024-01-03 10:00:00', NULL, 0, 'Evaluation failed: bad pickle', 0)"
+        ), {"logs": LEGACY_LOGS})
+    
+    assert migrations.run_migrations() == migrations.SCHEMA_VERSION
+    
+    with engine.connect() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("submissions")}
+        assert {"evaluation_ms", "metrics", "stage_timings"} <= columns
+        
+        best = connection.execute(
+            select(BestSubmission.user_id, BestSubmission.score, BestSubmission.submission_id, BestSubmission.attempts)
+            .order_by(BestSubmission.user_id)
+        ).all()
+        assert best == [(1, 0.9333, 2, 2), (2, None, None, 1)]
+        
+        progress = connection.execute(
+            select(UserProgress.user_id, UserProgress.completed_quests, UserProgress.attempts)
+            .order_by(UserProgress.user_id)
+        ).all()
+        assert progress == [(1, 1, 2), (2, 0, 1)]
+        assert connection.execute(select(User.completed_quests).order_by(User.id)).scalars().all() == [1, 0]
+        
+        assert connection.execute(select(XPEvent.submission_id, XPEvent.amount)).all() == [(2, 100)]
+        
+        # Legacy logs become metrics, keeping the unrounded value; failure messages stay
+        submissions = {row.id: row for row in connection.execute(
+            select(Submission.id, Submission.metrics, Submission.evaluation_logs)
+        )}
+        assert submissions[2].metrics == {"accuracy": 0.9333333333333333, "f1_score": 0.9326599326599326}
+        assert submissions[2].evaluation_logs is None
+        assert submissions[3].metrics is None
+        assert submissions[3].evaluation_logs == "Evaluation failed: bad pickle"
+    
+    # Re-running is a no-op
+    assert migrations.run_migrations() == migrations.SCHEMA_VERSION
+    engine.dispose()
+
+
+def test_startup_check_requires_migrated_schema(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    monkeypatch.setattr(migrations, "engine", engine)
+    
+    with pytest.raises(RuntimeError, match=r"at version 0, code expects \d+\. Run `python init_db.py`"):
+        migrations.check_schema_version()
+    
+    migrations.run_migrations()
+    assert migrations.check_schema_version() == migrations.SCHEMA_VERSION
+    engine.dispose()
@@ -0,0 +1,132 @@
+from datetime import date, datetime, timedelta
+
+import orjson
+import pytest
+from sqlalchemy import select
+
+from app.models import PeriodLeaderboardSnapshot, PeriodXP, User
+from app.routes import leaderboard as leaderboard_routes
+from app.services import XPService, leaderboard_cache
+from app.services.xp_service import period_start, rebuild_period_xp, shift_period
+
+NOW = datetime.utcnow()
+LAST_WEEK = period_start("weekly", NOW) - timedelta(weeks=1)
+
+
+def _players(db, count):
+    users = [User(username=f"racer{n}", email=f"racer{n}@example.com", hashed_password="x") for n in range(count)]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def _period_rows(db):
+    return sorted(db.execute(select(PeriodXP.period, PeriodXP.period_start, PeriodXP.user_id, PeriodXP.xp)).all())
+
+
+def test_period_arithmetic():
+    assert period_start("daily", datetime(2024, 2, 29, 23, 59)) == date(2024, 2, 29)
+    assert period_start("weekly", datetime(2024, 2, 29)) == date(2024, 2, 26)
+    assert period_start("monthly", datetime(2024, 2, 29)) == date(2024, 2, 1)
+    assert shift_period("monthly", date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert shift_period("monthly", date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert shift_period("weekly", date(2024, 2, 26), 1) == date(2024, 3, 4)
+    with pytest.raises(ValueError):
+        period_start("yearly", NOW)
+
+
+def test_awards_accumulate_per_period_and_match_rebuild(db, engine):
+    alice, bob = _players(db, 2)
+    service = XPService(db)
+    
+    service.award_xp(alice, 100, when=LAST_WEEK + timedelta(days=1))
+    service.award_xp(alice, 50, when=LAST_WEEK + timedelta(days=2))
+    service.award_xp(bob, 120, when=LAST_WEEK + timedelta(days=2))
+    service.award_xp(alice, 10, when=NOW)
+    db.commit()
+    
+    assert alice.xp == 160
+    assert service.get_live_leaderboard("weekly", LAST_WEEK) == [
+        {"rank": 1, "user_id": alice.id, "username": "racer0", "xp": 150},
+        {"rank": 2, "user_id": bob.id, "username": "racer1", "xp": 120},
+    ]
+    assert [entry["xp"] for entry in service.get_live_leaderboard("daily", LAST_WEEK + timedelta(days=2))] == [120, 50]
+    
+    # Rebuilding from the event log gives the same totals
+    incremental = _period_rows(db)
+    with engine.begin() as connection:
+        rebuild_period_xp(connection, batch_size=2)
+    db.expire_all()
+    assert _period_rows(db) == incremental
+
+
+def test_standing_breaks_ties_like_the_leaderboard(db):
+    users = _players(db, 4)
+    service = XPService(db)
+    for user, amount in zip(users, (50, 80, 50, 50)):
+        service.award_xp(user, amount, when=NOW)
+    db.commit()
+    
+    start = period_start("weekly", NOW)
+    for entry in service.get_live_leaderboard("weekly", start):
+        assert service.get_user_standing(entry["user_id"], "weekly", start) == {
+            "user_xp": entry["xp"], "user_rank": entry["rank"]
+        }
+    
+    outsider = User(username="outsider", email="outsider@example.com", hashed_password="x")
+    db.add(outsider)
+    db.commit()
+    assert service.get_user_standing(outsider.id, "weekly", start) == {"user_xp": 0, "user_rank": None}
+
+
+def test_ended_period_is_frozen_on_first_access(db):
+    alice, bob = _players(db, 2)
+    service = XPService(db)
+    service.award_xp(alice, 100, when=LAST_WEEK)
+    service.award_xp(bob, 200, when=LAST_WEEK)
+    db.commit()
+    
+    with pytest.raises(ValueError):
+        service.freeze_period("weekly", period_start("weekly", NOW))
+    
+    frozen = service.get_frozen_leaderboard("weekly", LAST_WEEK)
+    assert frozen == [
+        {"rank": 1, "user_id": bob.id, "username": "racer1", "xp": 200},
+        {"rank": 2, "user_id": alice.id, "username": "racer0", "xp": 100},
+    ]
+    assert service.freeze_period("weekly", LAST_WEEK) is False
+    
+    # Late XP for the ended period does not change its snapshot
+    service.award_xp(alice, 500, when=LAST_WEEK)
+    db.commit()
+    assert service.get_frozen_leaderboard("weekly", LAST_WEEK) == frozen
+    assert db.execute(select(PeriodLeaderboardSnapshot.rank)).scalars().all() == [1, 2]
+    
+    # Nothing to freeze for a period without XP
+    assert service.freeze_period("weekly", LAST_WEEK - timedelta(weeks=1)) is False
+
+
+def test_period_route_serves_current_and_frozen_periods(db):
+    alice, bob = _players(db, 2)
+    service = XPService(db)
+    service.award_xp(alice, 30, when=NOW)
+    service.award_xp(bob, 70, when=LAST_WEEK)
+    db.commit()
+    leaderboard_cache.invalidate()
+    
+    current = orjson.loads(leaderboard_routes.get_period_leaderboard(
+        period="weekly", ago=0, limit=10, current_user=alice, db=db
+    ).body)
+    assert current["frozen"] is False
+    assert current["period_start"] == period_start("weekly", NOW).isoformat()
+    assert [entry["user_id"] for entry in current["leaderboard"]] == [alice.id]
+    assert (current["user_xp"], current["user_rank"]) == (30, 1)
+    
+    previous = orjson.loads(leaderboard_routes.get_period_leaderboard(
+        period="weekly", ago=1, limit=10, current_user=alice, db=db
+    ).body)
+    assert previous["frozen"] is True
+    assert previous["period_start"] == LAST_WEEK.isoformat()
+    assert previous["period_end"] == (LAST_WEEK + timedelta(days=6)).isoformat()
+    assert [entry["user_id"] for entry in previous["leaderboard"]] == [bob.id]
+    assert (previous["user_xp"], previous["user_rank"]) == (0, None)
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from app.monitoring.profiler import StackSampler, active_sampler
+
+CONFIG = {"target_column": "target"}
+
+
+def _busy_wait(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collects_thread_stacks_until_stopped():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_wait, args=(stop,), name="busy")
+    worker.start()
+    
+    sampler = StackSampler(duration=30, interval=0.005)
+    thread = threading.Thread(target=sampler.run)
+    started = time.monotonic()
+    thread.start()
+    time.sleep(0.2)
+    assert active_sampler() is sampler
+    
+    sampler.stop()
+    thread.join(5)
+    stop.set()
+    worker.join()
+    
+    assert time.monotonic() - started < 5
+    assert active_sampler() is None
+    assert sampler.samples > 0
+    assert any(line.startswith("busy;") and "_busy_wait" in line for line in sampler.collapsed().splitlines())
+
+
+def test_merge_nests_stacks_under_root():
+    sampler = StackSampler(duration=1)
+    sampler.merge({"MainThread;main (sandbox.py:1)": 3}, "evaluation-0;sandbox child")
+    
+    assert sampler.collapsed() == "evaluation-0;sandbox child;MainThread;main (sandbox.py:1) 3\n"
+
+
+def test_sandboxed_evaluation_is_sampled_in_the_child(sandbox, tmp_path):
+    sampler = StackSampler(duration=30, interval=0.005)
+    thread = threading.Thread(target=sampler.run)
+    thread.start()
+    try:
+        result = sandbox.evaluate_model(str(tmp_path / "model.joblib"), "iris.csv", "accuracy", CONFIG)
+    finally:
+        sampler.stop()
+        thread.join(5)
+    
+    assert result["success"] is True
+    assert "profile" not in result
+    child = [line for line in sampler.collapsed().splitlines() if ";sandbox child;" in line]
+    assert child
+    assert all(line.startswith(f"{threading.current_thread().name};sandbox child;") for line in child)
+    assert any("evaluate_model" in line for line in child)
+
+
+def test_unprofiled_evaluation_returns_no_profile(sandbox, tmp_path):
+    result = sandbox.evaluate_model(str(tmp_path / "model.joblib"), "iris.csv", "accuracy", CONFIG)
+    
+    assert result["success"] is True
+    assert "profile" not in result
@@ -0,0 +1,108 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select, update
+
+import check_consistency
+from app.models import Quest, User, UserProgress
+from app.services import ProgressService, QuestService
+from app.services.progress_service import EMPTY_PROGRESS, find_inconsistent_progress, rebuild_user_progress
+
+XP_REWARD = 100
+
+
+class FakeEvaluator:
+    """Returns a fixed score (None for a failed evaluation)"""
+    
+    def __init__(self, score):
+        self.score = score
+    
+    def evaluate_model(self, model_path, dataset_name, metric_name, config):
+        score = self.score
+        if score is None:
+            return {"success": False, "score": None, "logs": "Evaluation failed: bad pickle"}
+        return {"success": True, "score": score, "metrics": {metric_name: score}}
+
+
+@pytest.fixture
+def quest_ids(db):
+    quests = [
+        Quest(level_id=1, title=f"Progress {n}", description="Fit a model", task_type="classification", order=n,
+              xp_reward=XP_REWARD, dataset_name="iris.csv", metric_name="accuracy", threshold=0.8)
+        for n in (1, 2)
+    ]
+    db.add_all(quests)
+    db.commit()
+    return [quest.id for quest in quests]
+
+
+def _submit(db, user, quest_id, score, upload_dir):
+    service = QuestService(db)
+    service._evaluator = FakeEvaluator(score)
+    model_file = SimpleNamespace(filename="model.pkl", file=io.BytesIO(b"model"))
+    return service.submit_quest(user.id, quest_id, model_file, upload_dir=str(upload_dir))
+
+
+def _stored_progress(db):
+    return db.execute(
+        select(UserProgress.user_id, UserProgress.completed_quests, UserProgress.attempts,
+               UserProgress.perfect_scores, UserProgress.last_passed_at)
+        .order_by(UserProgress.user_id)
+    ).all()
+
+
+def test_counters_follow_submissions(db, engine, quest_ids, tmp_path):
+    first, second = quest_ids
+    alice = User(username="counter", email="counter@example.com", hashed_password="x")
+    bob = User(username="tally", email="tally@example.com", hashed_password="x")
+    db.add_all([alice, bob])
+    db.commit()
+    
+    assert ProgressService(db).get_progress(alice.id) == EMPTY_PROGRESS
+    
+    _submit(db, alice, first, 0.5, tmp_path)
+    passed = _submit(db, alice, first, 0.995, tmp_path)
+    assert passed.xp_awarded == XP_REWARD
+    repeat = _submit(db, alice, first, 0.9, tmp_path)
+    assert repeat.passed and repeat.xp_awarded == 0
+    _submit(db, alice, second, None, tmp_path)
+    last = _submit(db, alice, second, 0.85, tmp_path)
+    _submit(db, bob, first, 0.3, tmp_path)
+    
+    assert ProgressService(db).get_progress(alice.id) == {
+        "completed_quests": 2, "attempts": 5, "perfect_scores": 1, "last_passed_at": last.submission_date,
+    }
+    assert ProgressService(db).get_progress(bob.id)["last_passed_at"] is None
+    db.refresh(alice)
+    assert (alice.completed_quests, alice.xp) == (2, 2 * XP_REWARD)
+    
+    # The upserted counters agree with a rebuild from submissions
+    with engine.connect() as connection:
+        assert find_inconsistent_progress(connection) == []
+    upserted = _stored_progress(db)
+    with engine.begin() as connection:
+        rebuild_user_progress(connection)
+    db.expire_all()
+    assert _stored_progress(db) == upserted
+
+
+def test_consistency_check_reports_and_repairs_drift(db, quest_ids, tmp_path, capsys):
+    user = User(username="drifter", email="drifter@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    _submit(db, user, quest_ids[0], 0.9, tmp_path)
+    _submit(db, user, quest_ids[1], 0.4, tmp_path)
+    
+    db.execute(update(UserProgress).values(attempts=7))
+    db.execute(update(User).values(completed_quests=0))
+    db.commit()
+    
+    assert check_consistency.main(limit=5) is False
+    assert f"user {user.id}: completed 1 != 1, attempts 7 != 2" in capsys.readouterr().out
+    
+    assert check_consistency.main(fix=True) is True
+    db.expire_all()
+    assert ProgressService(db).get_progress(user.id)["attempts"] == 2
+    assert db.get(User, user.id).completed_quests == 1
+    assert check_consistency.main() is True
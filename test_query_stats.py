@@ -0,0 +1,78 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.monitoring import query_stats
+from app.monitoring.query_stats import (
+    QUERY_STATS_HEADER,
+    QueryStats,
+    QueryStatsMiddleware,
+    instrument_query_stats,
+    statement_shape,
+)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(query_stats, "QUERY_STATS_ENABLED", True)
+    monkeypatch.setattr(query_stats, "QUERY_STATS_MODE", "debug")
+    monkeypatch.setattr(query_stats, "N_PLUS_ONE_THRESHOLD", 3)
+
+
+def test_statement_shapes_ignore_values():
+    assert statement_shape("SELECT *\n  FROM users WHERE id = 42 AND name = 'o''brien'") == \
+        "SELECT * FROM users WHERE id = ? AND name = ?"
+    assert statement_shape("SELECT * FROM quests WHERE id IN (?, ?, ?)") == \
+        statement_shape("SELECT * FROM quests WHERE id IN (%(id_1)s, %(id_2)s)") == \
+        "SELECT * FROM quests WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM t WHERE id = :id") != statement_shape("SELECT * FROM u WHERE id = :id")
+
+
+def test_repeated_shapes_are_reported(enabled):
+    stats = QueryStats()
+    for user_id in range(5):
+        stats.record(f"SELECT * FROM badges WHERE user_id = {user_id}", 0.002)
+    stats.record("SELECT * FROM users", 0.010)
+    
+    assert stats.repeated == [("SELECT * FROM badges WHERE user_id = ?", 5)]
+    assert stats.header_value() == "count=6; time_ms=20.0; slow=0; n_plus_one=1; max_repeat=5"
+
+
+def test_slow_queries_are_logged_without_parameter_values(enabled, monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 0)
+    engine = create_engine("sqlite://")
+    instrument_query_stats(engine)
+    
+    with caplog.at_level(logging.WARNING, logger=query_stats.__name__), engine.connect() as connection:
+        connection.execute(text("SELECT :secret"), {"secret": "hunter2"})
+    
+    assert "Slow query" in caplog.text
+    assert "params: <1 parameters redacted>" in caplog.text  # sqlite's positional parameters
+    assert "hunter2" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_middleware_counts_the_request_statements(enabled, caplog):
+    engine = create_engine("sqlite://")
+    instrument_query_stats(engine)
+    
+    async def app(scope, receive, send):
+        with engine.connect() as connection:
+            for quest_id in range(4):
+                connection.execute(text(f"SELECT {quest_id}"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+    
+    sent = []
+    
+    async def send(message):
+        sent.append(message)
+    
+    with caplog.at_level(logging.WARNING, logger=query_stats.__name__):
+        await QueryStatsMiddleware(app)({"type": "http", "method": "GET", "path": "/user/badges"}, None, send)
+    
+    headers = dict(sent[0]["headers"])
+    assert headers[QUERY_STATS_HEADER.lower().encode()].startswith(b"count=4; ")
+    assert b"n_plus_one=1; max_repeat=4" in headers[QUERY_STATS_HEADER.lower().encode()]
+    assert "Possible N+1 on GET /user/badges: 4 statements" in caplog.text
+    assert query_stats._current_stats.get() is None
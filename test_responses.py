@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import orjson
+from fastapi import Request
+
+from app.models import Badge, BestSubmission, Level, Quest, Submission, User, UserBadge
+from app.responses import ORJSONResponse, make_etag
+from app.routes import leaderboard as leaderboard_routes
+from app.routes import quests
+from app.routes import user as user_routes
+from app.schemas import LeaderboardResponse, QuestDetailResponse, QuestLeaderboardResponse, SubmissionResponse, UserProgress
+from app.services import leaderboard_cache, quest_catalogue
+
+# The routes below skip response_model validation, so their bodies are checked against it here
+
+
+def test_orjson_response_renders_datetimes_and_int_keys():
+    body = ORJSONResponse({"at": datetime(2024, 3, 1, 12, 0, 0, 250000), "scores": {1: 0.5}}).body
+    assert orjson.loads(body) == {"at": "2024-03-01T12:00:00.250000", "scores": {"1": 0.5}}
+
+
+def test_etags_ignore_key_order():
+    assert make_etag({"a": 1, "b": 2}) == make_etag({"b": 2, "a": 1})
+    assert make_etag({"a": 1}) != make_etag({"a": 2})
+
+
+def test_list_endpoints_match_their_response_models(db):
+    quest_catalogue.invalidate()
+    level = Level(name="Serialization Basics", order=1001, required_xp=0)
+    level.quests = [
+        Quest(title=f"Quest {n}", description="Fit a model", task_type="classification", order=n,
+              xp_reward=100, dataset_name="iris.csv", metric_name="accuracy", threshold=0.9)
+        for n in (1, 2)
+    ]
+    user = User(username="serializer", email="serializer@example.com", hashed_password="x", xp=100, completed_quests=1)
+    badge = Badge(name="Serialized", description="Round-tripped", condition_type="xp_threshold", condition_value=100)
+    db.add_all([level, user, badge])
+    db.commit()
+    quest = level.quests[0]
+    
+    submission = Submission(user_id=user.id, quest_id=quest.id, model_path="model.pkl", score=0.95, passed=True,
+                            xp_awarded=100, metrics={"accuracy": 0.95}, submission_date=datetime(2024, 3, 1))
+    db.add(submission)
+    db.flush()
+    db.add(BestSubmission(user_id=user.id, quest_id=quest.id, score=0.95, submission_id=submission.id,
+                          submitted_at=submission.submission_date, passed=True, attempts=1))
+    db.add(UserBadge(user_id=user.id, badge_id=badge.id))
+    db.commit()
+    leaderboard_cache.invalidate()
+    
+    try:
+        request = Request({"type": "http", "method": "GET", "path": "/quests", "headers": []})
+        body = orjson.loads(quests.get_quests(request=request, current_user=user, db=db).body)
+        listed = [QuestDetailResponse.model_validate(entry) for entry in body]
+        assert [(entry.user_completed, entry.best_score) for entry in listed] == [(True, 0.95), (False, None)]
+        assert listed[0].level.name == "Serialization Basics"
+        
+        submissions = quests.get_quest_submissions(
+            quest_id=quest.id, limit=10, cursor=None, detail="full", current_user=user, db=db
+        )
+        assert SubmissionResponse.model_validate(orjson.loads(submissions.body)[0]).metrics == {"accuracy": 0.95}
+        
+        board = quests.get_quest_leaderboard(quest_id=quest.id, limit=10, current_user=user, db=db)
+        assert QuestLeaderboardResponse.model_validate_json(board.body).user_rank == 1
+        
+        board = leaderboard_routes.get_leaderboard(limit=10, cursor=None, current_user=user, db=db)
+        assert LeaderboardResponse.model_validate_json(board.body).leaderboard[0].username == "serializer"
+        
+        progress = UserProgress.model_validate_json(user_routes.get_user_progress(current_user=user, db=db).body)
+        assert progress.user.username == "serializer"
+        assert [earned.name for earned in progress.badges] == ["Serialized"]
+    finally:
+        db.rollback()
+        db.delete(level)
+        db.delete(badge)
+        db.commit()
@@ -0,0 +1,125 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import BestSubmission, Submission, SubmissionArchive, User, UserProgress
+from app.services.progress_service import rebuild_user_progress
+from app.services.quest_service import rebuild_best_submissions
+from app.services.retention_service import run_retention, unpack_payload
+
+KEEP_LATEST = 3
+MIN_AGE_DAYS = 30
+
+
+def _upload(name: str, age_days: float) -> str:
+    """Create an upload file with the given age, returning its path as stored in model_path"""
+    path = os.path.join("./uploads", name)
+    with open(path, "wb") as file:
+        file.write(b"model")
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def _aggregates(engine):
+    """best_submission and user_progress as rebuilt from the full history"""
+    with engine.begin() as connection:
+        rebuild_best_submissions(connection)
+        rebuild_user_progress(connection)
+    with engine.connect() as connection:
+        best = connection.execute(
+            select(
+                BestSubmission.user_id, BestSubmission.quest_id, BestSubmission.score,
+                BestSubmission.submission_id, BestSubmission.submitted_at,
+                BestSubmission.passed, BestSubmission.attempts,
+            ).order_by(BestSubmission.user_id, BestSubmission.quest_id)
+        ).all()
+        progress = connection.execute(
+            select(
+                UserProgress.user_id, UserProgress.completed_quests, UserProgress.attempts,
+                UserProgress.perfect_scores, UserProgress.last_passed_at,
+            ).order_by(UserProgress.user_id)
+        ).all()
+    return best, progress
+
+
+def test_retention_keeps_referenced_rows_and_aggregates(engine, db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the upload sweep scans ./uploads
+    os.makedirs("uploads")
+    now = datetime.utcnow()
+    
+    alice = User(username="alice", email="alice@example.com", hashed_password="x")
+    bob = User(username="bob", email="bob@example.com", hashed_password="x")
+    db.add_all([alice, bob])
+    db.commit()
+    
+    # Alice: eight old attempts at quest 1 and a recent one. Attempt 2 is the
+    # best, attempt 4 passed and awarded XP, attempt 5 reused attempt 8's file name.
+    scores = [0.5, 0.95, 0.6, 0.9, 0.4, 0.3, 0.45, 0.55]
+    old = [
+        Submission(
+            user_id=alice.id, quest_id=1, score=score, passed=score >= 0.9,
+            xp_awarded=100 if n == 4 else 0,
+            submission_date=now - timedelta(days=100 - n),
+            model_path=f"./uploads/user_{alice.id}_quest_1_attempt{8 if n == 5 else n}.pkl",
+        )
+        for n, score in enumerate(scores, start=1)
+    ]
+    recent = Submission(
+        user_id=alice.id, quest_id=1, score=0.7, passed=False,
+        submission_date=now - timedelta(days=1), model_path=f"./uploads/user_{alice.id}_quest_1_recent.pkl",
+    )
+    # Bob: only two attempts, both within the latest KEEP_LATEST
+    bobs = [
+        Submission(
+            user_id=bob.id, quest_id=2, score=score, passed=False,
+            submission_date=now - timedelta(days=200 - n), model_path=f"./uploads/user_{bob.id}_quest_2_{n}.pkl",
+        )
+        for n, score in enumerate([0.1, 0.2])
+    ]
+    db.add_all([*old, recent, *bobs])
+    db.commit()
+    
+    for submission in [*old, recent, *bobs]:
+        if not os.path.exists(submission.model_path):
+            _upload(os.path.basename(submission.model_path), age_days=60)
+    # Attempt 3's file name was just reused by a new upload
+    os.utime(old[2].model_path, None)
+    stray_old = _upload("user_1_quest_1_failed_request.pkl", age_days=60)
+    stray_new = _upload("user_1_quest_1_in_progress.pkl", age_days=0)
+    
+    # Plain values: archived rows are gone from the session afterwards
+    ids = [submission.id for submission in old]
+    paths = [submission.model_path for submission in old]
+    kept_ids = {ids[1], ids[3], ids[6], ids[7], recent.id, *(submission.id for submission in bobs)}
+    kept_paths = [paths[1], paths[3], paths[6], paths[7], recent.model_path, *(submission.model_path for submission in bobs)]
+    
+    before = _aggregates(engine)
+    stats = run_retention(engine, keep_latest=KEEP_LATEST, min_age_days=MIN_AGE_DAYS)
+    after = _aggregates(engine)
+    
+    # Best, XP-awarding and latest-N rows stay hot; attempts 1, 3, 5 and 6 are archived
+    db.expire_all()
+    assert set(db.execute(select(Submission.id)).scalars()) == kept_ids
+    
+    archive = {row.id: row for row in db.execute(select(SubmissionArchive)).scalars()}
+    assert set(archive) == {ids[0], ids[2], ids[4], ids[5]}
+    assert unpack_payload(archive[ids[0]].payload)["model_path"] == paths[0]
+    assert stats["archived"] == 4
+    
+    # The aggregates do not depend on where the rows live
+    assert after == before
+    assert before[0][0].submission_id == ids[1]
+    
+    # Only unreferenced files older than the cutoff are deleted
+    assert not os.path.exists(paths[0])
+    assert not os.path.exists(paths[5])
+    assert not os.path.exists(stray_old)
+    assert os.path.exists(paths[2])  # too new
+    assert os.path.exists(paths[4])  # still referenced by attempt 8
+    assert os.path.exists(stray_new)
+    for path in kept_paths:
+        assert os.path.exists(path)
+    assert stats["files_deleted"] == 3
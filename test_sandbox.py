@@ -0,0 +1,136 @@
+import os
+import socket
+import time
+
+import joblib
+import pytest
+
+from app.ml_engine import sandbox as sandbox_module
+from app.ml_engine.sandbox import MAX_LOG_CHARS, SandboxedEvaluator, _parse_result
+
+CONFIG = {"target_column": "target"}
+
+
+class Payload:
+    """Pickles as a call to `function(*args)`, run by the child when it loads the model"""
+    
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+    
+    def __reduce__(self):
+        return self.function, self.args
+
+
+def _evaluate(evaluator, tmp_path, model):
+    path = tmp_path / "submitted.joblib"
+    joblib.dump(model, path)
+    return evaluator.evaluate_model(str(path), "iris.csv", "accuracy", CONFIG)
+
+
+def _limited(sandbox, **limits):
+    return SandboxedEvaluator(datasets_path=sandbox.datasets_path, **limits)
+
+
+def test_trained_model_is_scored(sandbox, tmp_path):
+    result = sandbox.evaluate_model(str(tmp_path / "model.joblib"), "iris.csv", "accuracy", CONFIG)
+    
+    assert result["success"] is True
+    assert result["score"] > 0.9
+    assert result["metrics"]["accuracy"] == result["score"]
+    assert {"load_model", "load_dataset", "predict", "metrics"} <= set(result["stage_timings"])
+    assert result["logs"] is None
+
+
+def test_missing_inputs_fail_without_a_child(sandbox, tmp_path):
+    result = sandbox.evaluate_model(str(tmp_path / "absent.joblib"), "iris.csv", "accuracy", CONFIG)
+    assert result["success"] is False
+    assert result["logs"] == f"Evaluation failed: Model not found at {tmp_path / 'absent.joblib'}"
+    
+    result = sandbox.evaluate_model(str(tmp_path / "model.joblib"), "absent.csv", "accuracy", CONFIG)
+    assert result["logs"] == f"Evaluation failed: Dataset absent.csv not found at {tmp_path / 'absent.csv'}"
+
+
+def test_unloadable_model_is_reported(sandbox, tmp_path):
+    path = tmp_path / "garbage.pkl"
+    path.write_bytes(b"not a pickle")
+    
+    result = sandbox.evaluate_model(str(path), "iris.csv", "accuracy", CONFIG)
+    
+    assert result["success"] is False
+    assert result["logs"].startswith("Evaluation failed: ")
+    assert result["score"] == 0.0
+
+
+def test_model_exiting_the_child_is_reported(sandbox, tmp_path):
+    result = _evaluate(sandbox, tmp_path, Payload(os._exit, 3))
+    
+    assert result["success"] is False
+    assert result["logs"] == "Evaluation failed: process exited with code 3"
+
+
+def test_network_access_is_blocked(sandbox, tmp_path):
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        result = _evaluate(sandbox, tmp_path, Payload(socket.create_connection, server.getsockname()))
+    
+    assert result["success"] is False
+    assert "Network access is disabled during evaluation" in result["logs"]
+
+
+def test_wall_clock_limit(sandbox, tmp_path):
+    started = time.monotonic()
+    result = _evaluate(_limited(sandbox, timeout_seconds=2), tmp_path, Payload(time.sleep, 60))
+    
+    assert result["logs"] == "Evaluation failed: exceeded the time limit of 2 s"
+    assert time.monotonic() - started < 30
+
+
+def test_cpu_limit(sandbox, tmp_path):
+    result = _evaluate(_limited(sandbox, cpu_seconds=2), tmp_path, Payload(sum, range(10 ** 15)))
+    
+    assert result["success"] is False
+    assert result["logs"] == "Evaluation failed: exceeded the CPU time limit of 2 s"
+
+
+def test_memory_limit(sandbox, tmp_path):
+    result = _evaluate(_limited(sandbox, memory_mb=1024), tmp_path, Payload(bytearray, 2 * 1024 ** 3))
+    
+    assert result["success"] is False
+    assert result["logs"] == "Evaluation failed: out of memory"
+
+
+@pytest.mark.parametrize("raw", [
+    b"",
+    b"not json\n",
+    b'{"score": 1.0}\n',
+    b'{"score": "high", "logs": null, "success": true}\n',
+    b'["score"]\n',
+])
+def test_malformed_results_are_rejected(raw):
+    assert _parse_result(raw) is None
+
+
+def test_results_are_sanitized():
+    result = _parse_result(
+        b'{"score": 0.5, "logs": "' + b"x" * (MAX_LOG_CHARS + 10) + b'", "success": 1, '
+        b'"metrics": {"accuracy": 0.5, "r2": NaN, "mse": Infinity}, "profile": {"a;b": 2, "c": true, "d": -1}}\n'
+        b"trailing output\n"
+    )
+    
+    assert len(result["logs"]) == MAX_LOG_CHARS
+    assert result["success"] is False  # only a literal true counts
+    assert result["metrics"] == {"accuracy": 0.5, "r2": None, "mse": None}
+    assert result["profile"] == {"a;b": 2}
+    assert result["stage_timings"] is None
+
+
+def test_child_environment_is_minimal(sandbox, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://secret@db/app")
+    monkeypatch.setenv("SECRET_KEY", "secret")
+    
+    env = sandbox._child_env("/tmp/work")
+    
+    assert "DATABASE_URL" not in env and "SECRET_KEY" not in env
+    assert env["HOME"] == env["TMPDIR"] == "/tmp/work"
+    assert env["PYTHONPATH"].split(os.pathsep)[0] == sandbox_module.PROJECT_ROOT
+    assert env["OMP_NUM_THREADS"] == "1"
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+from app.models import Submission, User
+from app.routes import quests
+
+QUEST_ID = 1
+START = datetime(2024, 3, 1, 12, 0, 0, 250000)
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="historian", email="historian@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _seed(db, user):
+    """Seven submissions on four distinct times (ties broken by id), plus rows that must not be listed"""
+    minutes = [0, 1, 1, 2, 2, 2, 3]
+    submissions = [
+        Submission(user_id=user.id, quest_id=QUEST_ID, model_path="model.pkl", score=n / 10,
+                   submission_date=START + timedelta(minutes=minute))
+        for n, minute in enumerate(minutes)
+    ]
+    db.add_all(submissions)
+    db.add(Submission(user_id=user.id, quest_id=QUEST_ID + 1, model_path="model.pkl", submission_date=START))
+    db.add(Submission(user_id=user.id + 1, quest_id=QUEST_ID, model_path="model.pkl", submission_date=START))
+    db.commit()
+    return sorted(submissions, key=lambda submission: (submission.submission_date, submission.id), reverse=True)
+
+
+def _page(db, user, cursor=None, limit=2, detail="summary"):
+    return quests.get_quest_submissions(
+        quest_id=QUEST_ID, limit=limit, cursor=cursor, detail=detail, current_user=user, db=db
+    )
+
+
+def test_cursor_pages_walk_the_history_newest_first(db, user):
+    expected = [submission.id for submission in _seed(db, user)]
+    
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = _page(db, user, cursor)
+        seen.extend(row["id"] for row in orjson.loads(response.body))
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    
+    assert seen == expected
+    assert pages == 4
+    
+    # A full last page still gets a cursor, which leads to an empty page
+    response = _page(db, user, limit=7)
+    assert orjson.loads(_page(db, user, response.headers["X-Next-Cursor"], limit=7).body) == []
+
+
+def test_detail_levels(db, user):
+    _seed(db, user)
+    
+    summary = orjson.loads(_page(db, user).body)[0]
+    full = orjson.loads(_page(db, user, detail="full").body)[0]
+    
+    assert "metrics" not in summary and "evaluation_logs" not in summary
+    assert {"evaluation_logs", "evaluation_ms", "metrics", "stage_timings"} <= set(full)
+    assert full["id"] == summary["id"]
+
+
+def test_malformed_cursor_is_rejected(db, user):
+    for cursor in ("%%%", "WzEsMiwzXQ", "WyJub3QgYSBkYXRlIiwgMV0"):  # garbage, 3 values, ["not a date", 1]
+        with pytest.raises(HTTPException) as error:
+            _page(db, user, cursor)
+        assert error.value.status_code == 400
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Submission
+from app.services import QuestService
+from app.services.quest_service import backfill_submission_metrics, parse_legacy_logs
+
+
+def _legacy(metric, score, additional):
+    return f"Metric: {metric}\nScore: {score}\nAdditional metrics: {additional}"
+
+
+@pytest.mark.parametrize("logs, expected", [
+    # Additional metrics keep full precision, numpy wrappers or not
+    (_legacy("accuracy", "0.9333", "{'accuracy': 0.9333333333333333, 'f1_score': np.float64(0.9326599326599326)}"),
+     {"accuracy": 0.9333333333333333, "f1_score": 0.9326599326599326}),
+    # The primary metric falls back to the rounded score
+    (_legacy("r2_score", "0.8123", "{'mse': 12.5}"), {"mse": 12.5, "r2_score": 0.8123}),
+    (_legacy("mse", "1.5e-05", "{}"), {"mse": 1.5e-05}),
+    # Non-finite values become None
+    (_legacy("r2_score", "nan", "{'mse': np.float64(inf)}"), {"mse": None, "r2_score": None}),
+    ("Evaluation failed: could not load model", None),
+    ("Metric: accuracy\n", None),
+])
+def test_parse_legacy_logs(logs, expected):
+    assert parse_legacy_logs(logs) == expected
+
+
+def test_backfill_converts_legacy_logs_in_batches(db, engine):
+    logs = {
+        1: _legacy("accuracy", "0.5000", "{'accuracy': 0.5}"),
+        2: "Evaluation failed: bad pickle",
+        3: _legacy("accuracy", "0.9000", "{'accuracy': np.float64(0.9), 'precision': 0.875}"),
+        4: "Metric: accuracy\nno score recorded",
+        5: _legacy("accuracy", "0.7000", "{'accuracy': 0.7}"),
+        6: None,
+    }
+    db.add_all([
+        Submission(id=id, user_id=1, quest_id=1, model_path="model.pkl", evaluation_logs=text,
+                   submission_date=datetime(2024, 3, id))
+        for id, text in logs.items()
+    ])
+    # Already structured: left alone
+    db.add(Submission(id=7, user_id=1, quest_id=1, model_path="model.pkl", metrics={"accuracy": 1.0},
+                      evaluation_logs=_legacy("accuracy", "0.1000", "{}")))
+    db.commit()
+    
+    with engine.begin() as connection:
+        assert backfill_submission_metrics(connection, batch_size=2) == 3
+    
+    db.expire_all()
+    rows = {row.id: row for row in db.execute(select(Submission.id, Submission.metrics, Submission.evaluation_logs))}
+    assert rows[1].metrics == {"accuracy": 0.5}
+    assert rows[3].metrics == {"accuracy": 0.9, "precision": 0.875}
+    assert rows[5].metrics == {"accuracy": 0.7}
+    assert all(rows[id].evaluation_logs is None for id in (1, 3, 5))
+    for id in (2, 4, 6):
+        assert (rows[id].metrics, rows[id].evaluation_logs) == (None, logs[id])
+    assert rows[7].metrics == {"accuracy": 1.0}
+    
+    with engine.begin() as connection:
+        assert backfill_submission_metrics(connection) == 0
+
+
+def test_submission_detail_rows_include_structured_results(db):
+    db.add(Submission(
+        user_id=5, quest_id=2, model_path="model.pkl", score=0.8, passed=True, evaluation_ms=420,
+        metrics={"accuracy": 0.8, "f1_score": 0.79}, stage_timings={"load_model": 12.5, "predict": 3.0},
+        submission_date=datetime(2024, 3, 1),
+    ))
+    db.commit()
+    
+    service = QuestService(db)
+    summary, = service.get_user_submission_rows(5)
+    detail, = service.get_user_submission_rows(5, detail=True)
+    
+    assert "metrics" not in summary
+    assert detail["metrics"] == {"accuracy": 0.8, "f1_score": 0.79}
+    assert detail["stage_timings"] == {"load_model": 12.5, "predict": 3.0}
+    assert (detail["evaluation_ms"], detail["evaluation_logs"]) == (420, None)
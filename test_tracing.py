@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.monitoring import tracing
+from app.monitoring.tracing import (
+    STATUS_ERROR,
+    TracingMiddleware,
+    instrument_engine,
+    start_span,
+    to_otlp_payload,
+    trace_methods,
+    traced,
+)
+
+
+class FakeExporter:
+    """Collects finished traces instead of exporting them"""
+    
+    def __init__(self):
+        self.traces = []
+    
+    def submit(self, trace):
+        self.traces.append(trace)
+
+
+@pytest.fixture
+def exported(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    exporter = FakeExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    return exporter.traces
+
+
+def _spans(trace):
+    return {span.name: span for span in trace.spans}
+
+
+def test_disabled_tracing_records_nothing(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", False)
+    exporter = FakeExporter()
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+    
+    with start_span("request") as span:
+        span.set_attribute("ignored", 1)
+        assert tracing.current_span() is None
+    
+    assert exporter.traces == []
+
+
+def test_nested_spans_form_one_trace(exported):
+    with start_span("request", kind="server") as root:
+        with start_span("child", step=1) as child:
+            assert tracing.current_span() is child
+        with pytest.raises(ValueError):
+            with start_span("failing"):
+                raise ValueError("bad input")
+        assert tracing.current_span() is root
+    
+    trace, = exported
+    spans = _spans(trace)
+    assert set(spans) == {"request", "child", "failing"}
+    assert spans["child"].parent_id == spans["failing"].parent_id == root.span_id
+    assert spans["failing"].status == STATUS_ERROR
+    assert spans["failing"].status_message == "ValueError: bad input"
+    
+    payload = to_otlp_payload(trace)
+    otlp = {span["name"]: span for span in payload["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert otlp["request"]["kind"] == 2 and "parentSpanId" not in otlp["request"]
+    assert otlp["child"]["attributes"] == [{"key": "step", "value": {"intValue": "1"}}]
+    assert {span["traceId"] for span in otlp.values()} == {trace.trace_id}
+
+
+@pytest.mark.asyncio
+async def test_spans_propagate_to_threads_and_decorated_functions(exported):
+    @traced()
+    def in_thread():
+        return tracing.current_span().parent_id
+    
+    @traced("async.step")
+    async def in_coroutine():
+        return tracing.current_span().name
+    
+    with start_span("request") as root:
+        assert await asyncio.to_thread(in_thread) == root.span_id
+        assert await in_coroutine() == "async.step"
+    
+    trace, = exported
+    assert {span.name for span in trace.spans} == {
+        "request", "async.step",
+        "test_spans_propagate_to_threads_and_decorated_functions.<locals>.in_thread",
+    }
+
+
+def test_trace_methods_names_spans_after_the_class(exported):
+    @trace_methods
+    class Service:
+        def lookup(self):
+            return "found"
+        
+        @staticmethod
+        def helper():
+            return "helped"
+    
+    with start_span("request"):
+        assert Service().lookup() == "found"
+        assert Service.helper() == "helped"
+    
+    assert set(_spans(exported[0])) == {"request", "Service.lookup", "Service.helper"}
+
+
+def test_statements_are_recorded_as_client_spans(exported):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))  # outside a trace: not recorded
+        with start_span("request"):
+            connection.execute(text("SELECT 2"))
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+    
+    spans = [span for span in exported[0].spans if span.name == "db.query"]
+    assert [span.attributes["db.statement"] for span in spans] == ["SELECT 2", "SELECT * FROM missing"]
+    assert spans[0].attributes["db.system"] == "sqlite"
+    assert spans[0].kind == "client"
+    assert spans[1].status == STATUS_ERROR
+
+
+@pytest.mark.asyncio
+async def test_middleware_opens_the_root_span(exported):
+    class Route:
+        path = "/quests/{quest_id}"
+    
+    async def app(scope, receive, send):
+        scope["route"] = Route()
+        with start_span("handler"):
+            await send({"type": "http.response.start", "status": 503, "headers": []})
+    
+    sent = []
+    
+    async def send(message):
+        sent.append(message)
+    
+    await TracingMiddleware(app)({"type": "http", "method": "GET", "path": "/quests/7"}, None, send)
+    
+    spans = _spans(exported[0])
+    root = spans["GET /quests/{quest_id}"]
+    assert root.kind == "server"
+    assert root.attributes["http.target"] == "/quests/7"
+    assert root.attributes["http.route"] == "/quests/{quest_id}"
+    assert root.attributes["http.status_code"] == 503
+    assert root.status == STATUS_ERROR
+    assert spans["handler"].parent_id == root.span_id
+    assert sent[0]["status"] == 503
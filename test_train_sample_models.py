@@ -0,0 +1,37 @@
+import joblib
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+import train_sample_models
+
+
+def test_models_are_saved_without_the_training_n_jobs(tmp_path):
+    frame = pd.DataFrame({"x": range(40), "y": [n % 2 for n in range(40)]})
+    split = train_test_split(frame[["x"]], frame["y"], **train_sample_models.SPLIT)
+    spec = {
+        "name": "parallel_forest",
+        "estimator": "sklearn.ensemble.RandomForestClassifier",
+        "params": {"n_estimators": 5, "random_state": 42},
+        "metrics": ["accuracy"],
+    }
+    
+    result = train_sample_models.train_model(spec, split, 4, str(tmp_path))
+    
+    assert result["n_jobs"] == 4
+    assert joblib.load(result["path"]).get_params()["n_jobs"] is None
+
+
+def test_estimators_without_n_jobs_report_one(tmp_path):
+    frame = pd.DataFrame({"x": range(40), "y": [2.0 * n for n in range(40)]})
+    split = train_test_split(frame[["x"]], frame["y"], **train_sample_models.SPLIT)
+    spec = {
+        "name": "ridge",
+        "estimator": "sklearn.linear_model.Ridge",
+        "params": {},
+        "metrics": ["r2_score"],
+    }
+    
+    result = train_sample_models.train_model(spec, split, 4, str(tmp_path))
+    
+    assert result["n_jobs"] == 1
+    assert result["scores"]["r2_score"] > 0.99
@@ -1,113 +1,238 @@
 """
 Train sample ML models for testing quest submissions
+
+Models are declared in MODEL_REGISTRY. Each run trains only the models whose
+dataset contents or hyperparameters changed since the last run (tracked in
+sample_models/manifest.json), in parallel across models and cores.
 """
-import pandas as pd
-import joblib
+import argparse
+import hashlib
+import importlib
+import json
 import os
-from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+import time
+from datetime import datetime
+import joblib
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, accuracy_score, f1_score
 
+DATASETS_DIR = './datasets'
+MODELS_DIR = './sample_models'
+MANIFEST_NAME = 'manifest.json'
 
-def train_housing_model():
-    """Train a model for housing price prediction"""
-    df = pd.read_csv('./datasets/housing_train.csv')
-    
-    X = df.drop(columns=['price'])
-    y = df['price']
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-    
-    # Train simple linear regression (should pass Quest 1)
-    model_lr = LinearRegression()
-    model_lr.fit(X_train, y_train)
-    y_pred = model_lr.predict(X_test)
-    r2 = r2_score(y_test, y_pred)
-    
-    joblib.dump(model_lr, './sample_models/housing_linear_regression.pkl')
-    print(f"✅ Linear Regression - R² Score: {r2:.4f}")
-    
-    # Train random forest (should pass Quest 2)
-    model_rf = RandomForestRegressor(n_estimators=100, random_state=42)
-    model_rf.fit(X_train, y_train)
-    y_pred_rf = model_rf.predict(X_test)
-    r2_rf = r2_score(y_test, y_pred_rf)
-    
-    joblib.dump(model_rf, './sample_models/housing_random_forest.pkl')
-    print(f"✅ Random Forest - R² Score: {r2_rf:.4f}")
+SPLIT = {"test_size": 0.2, "random_state": 42}
 
+# Bumped when saved models change without their inputs changing
+# (2: n_jobs is reset before saving)
+MODEL_FORMAT = 2
 
-def train_churn_model():
-    """Train a model for customer churn prediction"""
-    df = pd.read_csv('./datasets/churn_train.csv')
-    
-    X = df.drop(columns=['churn'])
-    y = df['churn']
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
-    
-    # Train logistic regression
-    model_lr = LogisticRegression(max_iter=1000, random_state=42)
-    model_lr.fit(X_train, y_train)
-    y_pred = model_lr.predict(X_test)
-    acc = accuracy_score(y_test, y_pred)
-    
-    joblib.dump(model_lr, './sample_models/churn_logistic_regression.pkl')
-    print(f"✅ Logistic Regression - Accuracy: {acc:.4f}")
-    
-    # Train random forest
-    model_rf = RandomForestClassifier(n_estimators=100, random_state=42)
-    model_rf.fit(X_train, y_train)
-    y_pred_rf = model_rf.predict(X_test)
-    acc_rf = accuracy_score(y_test, y_pred_rf)
-    
-    joblib.dump(model_rf, './sample_models/churn_random_forest.pkl')
-    print(f"✅ Random Forest - Accuracy: {acc_rf:.4f}")
+METRICS = {
+    "r2_score": r2_score,
+    "accuracy": accuracy_score,
+    "f1_score": lambda y_t, y_p: f1_score(y_t, y_p, average='weighted'),
+}
 
+# Sample model zoo; reference scores should clear the thresholds of the quests noted
+MODEL_REGISTRY = [
+    {
+        "name": "housing_linear_regression",  # Quest 1
+        "dataset": "housing_train.csv",
+        "target": "price",
+        "estimator": "sklearn.linear_model.LinearRegression",
+        "params": {},
+        "metrics": ["r2_score"],
+    },
+    {
+        "name": "housing_random_forest",  # Quest 2
+        "dataset": "housing_train.csv",
+        "target": "price",
+        "estimator": "sklearn.ensemble.RandomForestRegressor",
+        "params": {"n_estimators": 100, "random_state": 42},
+        "metrics": ["r2_score"],
+    },
+    {
+        "name": "churn_logistic_regression",  # Quest 3
+        "dataset": "churn_train.csv",
+        "target": "churn",
+        "estimator": "sklearn.linear_model.LogisticRegression",
+        "params": {"max_iter": 1000, "random_state": 42},
+        "metrics": ["accuracy"],
+    },
+    {
+        "name": "churn_random_forest",  # Quests 3 and 5
+        "dataset": "churn_train.csv",
+        "target": "churn",
+        "estimator": "sklearn.ensemble.RandomForestClassifier",
+        "params": {"n_estimators": 100, "random_state": 42},
+        "metrics": ["accuracy"],
+    },
+    {
+        "name": "iris_random_forest",  # Quest 4
+        "dataset": "iris_train.csv",
+        "target": "species",
+        "estimator": "sklearn.ensemble.RandomForestClassifier",
+        "params": {"n_estimators": 100, "random_state": 42},
+        "metrics": ["accuracy", "f1_score"],
+    },
+]
 
-def train_iris_model():
-    """Train a model for iris classification"""
-    df = pd.read_csv('./datasets/iris_train.csv')
-    
-    X = df.drop(columns=['species'])
-    y = df['species']
-    
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+
+def file_sha256(path, block_size=1 << 20):
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(spec, dataset_hash):
+    """Everything that affects a trained model's contents"""
+    payload = {
+        "dataset_sha256": dataset_hash,
+        "target": spec["target"],
+        "estimator": spec["estimator"],
+        "params": spec["params"],
+        "split": SPLIT,
+        "sklearn": sklearn.__version__,
+        "format": MODEL_FORMAT,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def load_manifest(models_dir):
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(models_dir, manifest):
+    path = os.path.join(models_dir, MANIFEST_NAME)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def build_estimator(spec, n_jobs):
+    module_name, class_name = spec["estimator"].rsplit(".", 1)
+    estimator = getattr(importlib.import_module(module_name), class_name)(**spec["params"])
+    if "n_jobs" in estimator.get_params():
+        estimator.set_params(n_jobs=n_jobs)
+    return estimator
+
+
+def train_model(spec, split, n_jobs, models_dir):
+    """Fit, score and save one registry entry (runs in a worker process)"""
+    X_train, X_test, y_train, y_test = split
+    model = build_estimator(spec, n_jobs)
     
-    # Train random forest
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    started = time.perf_counter()
     model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
+    fit_seconds = time.perf_counter() - started
     
-    acc = accuracy_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred, average='weighted')
-    
-    joblib.dump(model, './sample_models/iris_random_forest.pkl')
-    print(f"✅ Iris RF - Accuracy: {acc:.4f}, F1-Score: {f1:.4f}")
+    y_pred = model.predict(X_test)
+    scores = {metric: float(METRICS[metric](y_test, y_pred)) for metric in spec["metrics"]}
+    
+    # Saved with the registry's n_jobs, not the training one: the model is
+    # evaluated in a CPU- and memory-limited sandbox and must not fork workers there
+    parallel = "n_jobs" in model.get_params()
+    if parallel:
+        model.set_params(n_jobs=spec["params"].get("n_jobs"))
+    
+    path = os.path.join(models_dir, f"{spec['name']}.pkl")
+    joblib.dump(model, path)
+    
+    return {
+        "path": path,
+        "fit_seconds": round(fit_seconds, 4),
+        "scores": scores,
+        "n_jobs": n_jobs if parallel else 1,  # used for training only
+    }
 
 
-def main():
-    """Train all sample models"""
-    os.makedirs('./sample_models', exist_ok=True)
-    
-    print("Training housing models...")
-    train_housing_model()
-    
-    print("\nTraining churn models...")
-    train_churn_model()
-    
-    print("\nTraining iris models...")
-    train_iris_model()
+def main(force=False, only=None, workers=None, datasets_dir=DATASETS_DIR, models_dir=MODELS_DIR):
+    """Train all stale sample models"""
+    os.makedirs(models_dir, exist_ok=True)
+    manifest = load_manifest(models_dir)
+    registry = [spec for spec in MODEL_REGISTRY if not only or spec["name"] in only]
+    
+    # Hash each dataset once and find models whose inputs changed
+    dataset_hashes = {}
+    stale = []
+    for spec in registry:
+        dataset_path = os.path.join(datasets_dir, spec["dataset"])
+        if spec["dataset"] not in dataset_hashes:
+            dataset_hashes[spec["dataset"]] = file_sha256(dataset_path)
+        
+        key = cache_key(spec, dataset_hashes[spec["dataset"]])
+        entry = manifest.get(spec["name"])
+        if not force and entry and entry["cache_key"] == key and os.path.exists(entry["path"]):
+            print(f"⏭️  {spec['name']} unchanged, skipping")
+            continue
+        stale.append((spec, key))
+    
+    if not stale:
+        print("\n✅ All sample models are up to date!")
+        return
+    
+    # Load and split each dataset once
+    splits = {}
+    for spec, _ in stale:
+        split_id = (spec["dataset"], spec["target"])
+        if split_id not in splits:
+            df = pd.read_csv(os.path.join(datasets_dir, spec["dataset"]))
+            X = df.drop(columns=[spec["target"]])
+            y = df[spec["target"]]
+            splits[split_id] = train_test_split(X, y, **SPLIT)
+    
+    # Share cores between concurrently trained models
+    cpu_count = os.cpu_count() or 1
+    workers = min(workers or cpu_count, len(stale))
+    n_jobs = max(1, cpu_count // workers)
+    
+    print(f"Training {len(stale)} model(s) with {workers} worker(s), n_jobs={n_jobs}...")
+    started = time.perf_counter()
+    results = Parallel(n_jobs=workers)(
+        delayed(train_model)(spec, splits[(spec["dataset"], spec["target"])], n_jobs, models_dir)
+        for spec, _ in stale
+    )
     
-    print("\n✅ All sample models trained successfully!")
+    for (spec, key), result in zip(stale, results):
+        manifest[spec["name"]] = {
+            **result,
+            "cache_key": key,
+            "dataset": spec["dataset"],
+            "dataset_sha256": dataset_hashes[spec["dataset"]],
+            "estimator": spec["estimator"],
+            "params": spec["params"],
+            "sklearn": sklearn.__version__,
+            "trained_at": datetime.utcnow().isoformat(),
+        }
+        scores = ", ".join(f"{metric}: {score:.4f}" for metric, score in result["scores"].items())
+        print(f"✅ {spec['name']} - {scores} ({result['fit_seconds']:.2f}s)")
+    
+    save_manifest(models_dir, manifest)
+    print(f"\n✅ Trained {len(stale)} sample model(s) in {time.perf_counter() - started:.1f}s")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the sample model zoo")
+    parser.add_argument("--force", action="store_true", help="Retrain even if inputs are unchanged")
+    parser.add_argument("--only", nargs="+", help="Train only these registry entries")
+    parser.add_argument("--workers", type=int, help="Models trained concurrently (default: all cores)")
+    parser.add_argument("--datasets-dir", default=DATASETS_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    args = parser.parse_args()
+    
+    main(
+        force=args.force,
+        only=args.only,
+        workers=args.workers,
+        datasets_dir=args.datasets_dir,
+        models_dir=args.models_dir
+    )